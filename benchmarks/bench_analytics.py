@@ -0,0 +1,77 @@
+"""
+Line item analytics from the normalized OrderLineItem table, computed with
+pandas, against the same answers from decoding every order payload in
+Python. Also reports ingest throughput, which now includes writing the
+line item rows.
+
+    python benchmarks/bench_analytics.py --orders 50000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from common import make_order_payload, setup_django
+
+
+def timed(func, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - started) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--orders', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    setup_django(test_db_file=os.path.join(tempfile.mkdtemp(), 'bench_analytics.sqlite3'))
+    from shopifywebhook.analytics import basket_stats, revenue_by_product, sku_velocity
+    from shopifywebhook.models import OrderLineItem, OrderPayload
+    from shopifywebhook.processing import save_orders, validate_order_data
+
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    for start in range(1, args.orders + 1, 500):
+        save_orders([
+            validate_order_data(make_order_payload(order_id, line_items=rng.randint(1, 5), rng=rng))
+            for order_id in range(start, min(start + 500, args.orders + 1))
+        ])
+    load_seconds = time.perf_counter() - started
+    print(f"loaded {args.orders} orders ({OrderLineItem.objects.count()} line items) in {load_seconds:.1f}s "
+          f"({args.orders / load_seconds:.0f}/s)")
+
+    # Synthetic orders are all placed on 2025-01-01
+    now = datetime(2025, 1, 2, tzinfo=timezone.utc)
+
+    def payload_scan():
+        units = Counter()
+        revenue = defaultdict(Decimal)
+        for payload in OrderPayload.objects.iterator(chunk_size=2000):
+            for item in payload.decode().get('line_items', ()):
+                units[item.get('sku')] += item.get('quantity', 0)
+                revenue[item.get('product_id')] += Decimal(item.get('price', '0')) * item.get('quantity', 0)
+        return units.most_common(50), sorted(revenue.items(), key=lambda pair: -pair[1])[:50]
+
+    print(f"{'report':<28} {'ms':>9}")
+    seconds, skus = timed(lambda: sku_velocity(days=2, now=now), args.repeat)
+    print(f"{'sku velocity (pandas)':<28} {seconds * 1000:>9.1f}")
+    seconds, _ = timed(revenue_by_product, args.repeat)
+    print(f"{'revenue by product (pandas)':<28} {seconds * 1000:>9.1f}")
+    seconds, _ = timed(basket_stats, args.repeat)
+    print(f"{'basket stats (pandas)':<28} {seconds * 1000:>9.1f}")
+    seconds, (scan_units, _) = timed(payload_scan, 1)
+    print(f"{'sku + product payload scan':<28} {seconds * 1000:>9.1f}")
+    if [(row['sku'], row['units']) for row in skus[:10]] != scan_units[:10]:
+        raise SystemExit("FAIL: SKU units differ between the line item table and the payloads")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Archive throughput (orders/s) per chunk size, and webhook write latency while
+the archiver runs: a writer thread keeps saving new orders, so the longest
+save shows how long a chunk holds the database.
+
+The run fails if an order is lost: every old order must be in an archive
+file with a tombstone, every recent one still in the table, and redelivering
+an archived order must be skipped as stale.
+
+    python benchmarks/bench_archive.py --orders 20000 --chunk-sizes 100,500,2000
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+
+from common import make_order_payload, percentile, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--orders', type=int, default=20000, help="Old orders to archive per chunk size")
+    parser.add_argument('--chunk-sizes', default='100,500,2000')
+    parser.add_argument('--pause', type=float, default=0.1,
+                        help="Seconds between chunks (0 lets the archiver starve SQLite writers)")
+    args = parser.parse_args()
+
+    setup_django(test_db_file=os.path.join(tempfile.mkdtemp(), 'bench_archive.sqlite3'))
+    from django.test.utils import override_settings
+    from django.utils import timezone
+    from shopifywebhook.archive import archive_orders, iter_archive
+    from shopifywebhook.models import ArchivedOrder, ShopifyWebhookOrder
+    from shopifywebhook.processing import save_orders, validate_order_data
+
+    archive_dir = tempfile.mkdtemp()
+    print(f"{args.orders} old orders per run, archive files in {archive_dir}")
+    print(f"{'chunk':>6} {'orders/s':>9} {'MB out':>7} {'saves':>6} {'save p50 ms':>12} {'p99 ms':>8} {'max ms':>8}")
+    failed = False
+    next_id = 1
+    for chunk_size in (int(size) for size in args.chunk_sizes.split(',')):
+        first = next_id
+        boundary = ShopifyWebhookOrder.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        for start in range(first, first + args.orders, 500):
+            save_orders([
+                validate_order_data(make_order_payload(order_id, line_items=3))
+                for order_id in range(start, min(start + 500, first + args.orders))
+            ])
+        next_id += args.orders
+        ShopifyWebhookOrder.objects.filter(id__gt=boundary).update(created_at=timezone.now() - timedelta(days=120))
+
+        stop = threading.Event()
+        latencies = []
+        written = []
+
+        def write():
+            order_id = next_id + 10_000_000 + chunk_size * 100_000
+            while not stop.is_set():
+                started = time.perf_counter()
+                save_orders([validate_order_data(make_order_payload(order_id, line_items=3))])
+                latencies.append(time.perf_counter() - started)
+                written.append(str(order_id))
+                order_id += 1
+                time.sleep(0.002)
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        with override_settings(SHOPIFY_ARCHIVE_DIR=archive_dir):
+            result = archive_orders(timedelta(days=90), chunk_size=chunk_size, pause=args.pause)
+        stop.set()
+        writer.join()
+
+        rate = result.orders / result.seconds if result.seconds else 0.0
+        print(f"{chunk_size:>6} {rate:>9.0f} {result.bytes_written / 1e6:>7.1f} {len(latencies):>6} "
+              f"{percentile(latencies, 50) * 1000:>12.1f} {percentile(latencies, 99) * 1000:>8.1f} "
+              f"{max(latencies, default=0) * 1000:>8.1f}")
+
+        expected = {str(order_id) for order_id in range(first, first + args.orders)}
+        tombstones = set(ArchivedOrder.objects.filter(order_id__in=expected).values_list('order_id', flat=True))
+        if result.orders != args.orders or tombstones != expected:
+            print(f"FAIL: archived {result.orders}, {len(tombstones)} tombstones, expected {args.orders}")
+            failed = True
+        if ShopifyWebhookOrder.objects.filter(order_id__in=written).count() != len(written):
+            print("FAIL: orders saved during the run are missing from the table")
+            failed = True
+        archived = set()
+        for name in result.files:
+            archived.update(record['order_id'] for record in iter_archive(name, archive_dir))
+        if not expected <= archived:
+            print(f"FAIL: {len(expected - archived)} archived orders are not in the archive files")
+            failed = True
+        redelivered = save_orders([validate_order_data(make_order_payload(first, line_items=3))])[0]
+        if not redelivered.stale or ShopifyWebhookOrder.objects.filter(order_id=str(first)).exists():
+            print("FAIL: redelivering an archived order stored it again")
+            failed = True
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+Webhook throughput and tail latency: sync view under WSGI vs async view under
+ASGI, with many deliveries in flight at once.
+
+    python benchmarks/bench_asgi.py --requests 2000 --concurrency 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import make_order_payload, setup_django, sign, summarize
+
+SECRET = 'bench-secret'
+WEBHOOK_PATH = '/webhooks/shopify/order/create/'
+
+
+def make_requests(count, first_id):
+    requests = []
+    for order_id in range(first_id, first_id + count):
+        body = json.dumps(make_order_payload(order_id)).encode()
+        requests.append((body, sign(body, SECRET)))
+    return requests
+
+
+def run_wsgi(requests, concurrency):
+    from django.test import Client
+    local = threading.local()
+
+    def send(request):
+        body, signature = request
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = Client()
+        started = time.perf_counter()
+        response = client.post(WEBHOOK_PATH, body, content_type='application/json',
+                               headers={'X-Shopify-Hmac-Sha256': signature})
+        return time.perf_counter() - started, response.status_code
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        return list(pool.map(send, requests))
+
+
+def run_asgi(requests, concurrency):
+    from django.test import AsyncClient
+
+    async def main():
+        client = AsyncClient()
+        limit = asyncio.Semaphore(concurrency)
+
+        async def send(request):
+            body, signature = request
+            async with limit:
+                started = time.perf_counter()
+                response = await client.post(WEBHOOK_PATH, body, content_type='application/json',
+                                             headers={'X-Shopify-Hmac-Sha256': signature})
+                return time.perf_counter() - started, response.status_code
+
+        return await asyncio.gather(*(send(request) for request in requests))
+
+    return asyncio.run(main())
+
+
+def report(label, results, elapsed):
+    latencies = [seconds for seconds, _ in results]
+    errors = sum(1 for _, status in results if status != 200)
+    stats = summarize(latencies)
+    print(f"{label:<6} {len(results) / elapsed:>9.0f} {stats['p50_ms']:>8.1f} "
+          f"{stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f} {errors:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=200)
+    args = parser.parse_args()
+
+    os.environ['SHOPIFY_WEBHOOK_SECRET'] = SECRET
+    db_file = os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')
+    setup_django(test_db_file=db_file)
+
+    from django.test.utils import override_settings
+    from django.urls import clear_url_caches
+    import importlib
+    import shopifywebhook.urls
+    import shopifywebhook.webhook_urls
+
+    print(f"{'mode':<6} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for label, use_async, runner in (('wsgi', False, run_wsgi), ('asgi', True, run_asgi)):
+        with override_settings(SHOPIFY_WEBHOOK_ASYNC=use_async):
+            importlib.reload(shopifywebhook.webhook_urls)
+            importlib.reload(shopifywebhook.urls)
+            clear_url_caches()
+            requests = make_requests(args.requests, first_id=1 if not use_async else args.requests + 1)
+            started = time.perf_counter()
+            results = runner(requests, args.concurrency)
+            report(label, results, time.perf_counter() - started)
+
+
+if __name__ == '__main__':
+    main()
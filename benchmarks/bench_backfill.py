@@ -0,0 +1,48 @@
+"""
+backfill_orders throughput and peak memory against the local Admin API stub,
+for growing shop sizes. Peak memory is bounded by the page queue: it grows
+only until pages are full (250 orders) and then stays flat.
+
+    python benchmarks/bench_backfill.py --orders 1000 5000 20000
+"""
+import argparse
+import os
+import tempfile
+import tracemalloc
+
+from common import setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--orders', type=int, nargs='+', default=[1000, 5000, 20000])
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--windows', type=int, default=8)
+    args = parser.parse_args()
+
+    setup_django(test_db_file=os.path.join(tempfile.mkdtemp(), 'bench_backfill.sqlite3'))
+    from shopifywebhook.tests.admin_api_stub import AdminApiStub
+    from shopifywebhook.backfill import AdminApiClient, Checkpoint, backfill_from_api
+    from shopifywebhook.models import ShopifyWebhookOrder
+
+    print(f"{'orders':>8} {'pages':>6} {'seconds':>8} {'orders/s':>9} {'peak MB':>8}")
+    for count in args.orders:
+        ShopifyWebhookOrder.objects.all().delete()
+        with AdminApiStub(orders=count) as stub:
+            client = AdminApiClient(
+                'stub', 'token', '2024-07', base_url=stub.url,
+                rate=1000, burst=1000, pool_size=args.concurrency,
+            )
+            tracemalloc.start()
+            result = backfill_from_api(
+                client, stub.start, stub.start + stub.spacing * count, Checkpoint(None),
+                windows=args.windows, concurrency=args.concurrency,
+            )
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        assert ShopifyWebhookOrder.objects.count() == count
+        print(f"{count:>8} {result.pages:>6} {result.seconds:>8.2f} {result.throughput:>9.0f} {peak / 2**20:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Dashboard requests per second with the fragment cache on and off
+(SHOPIFY_DASHBOARD_CACHE_TTL), for concurrent viewers while orders keep
+arriving.
+
+With the cache on, viewers share one render of the order cards and summary
+per data change; --write-every sets how many dashboard requests are served
+per saved order (0 for a read-only run).
+
+    python benchmarks/bench_dashboard_cache.py --orders 5000 --viewers 8 --requests 2000
+"""
+import argparse
+import itertools
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import make_order_payload, setup_django, summarize
+
+
+def run(args, ttl, order_ids):
+    from django.db import connections
+    from django.test import Client
+    from django.test.utils import override_settings
+    from shopifywebhook.processing import save_orders, validate_order_data
+
+    lock = threading.Lock()
+    local = threading.local()
+
+    def request(index):
+        if args.write_every and index % args.write_every == 0:
+            with lock:
+                order_id = next(order_ids)
+            save_orders([validate_order_data(make_order_payload(order_id, line_items=2))])
+        if not hasattr(local, 'client'):
+            local.client = Client()
+        started = time.perf_counter()
+        response = local.client.get('/')
+        elapsed = time.perf_counter() - started
+        connections.close_all()
+        return response.status_code, elapsed
+
+    with override_settings(SHOPIFY_DASHBOARD_CACHE_TTL=ttl):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.viewers) as pool:
+            results = list(pool.map(request, range(1, args.requests + 1)))
+        seconds = time.perf_counter() - started
+    failures = sum(1 for status, _ in results if status != 200)
+    return args.requests / seconds, summarize([elapsed for _, elapsed in results]), failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--orders', type=int, default=5000)
+    parser.add_argument('--viewers', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--write-every', type=int, default=50,
+                        help="Save one new order every N dashboard requests (0: never)")
+    args = parser.parse_args()
+
+    setup_django(test_db_file=os.path.join(tempfile.mkdtemp(), 'bench_dashboard_cache.sqlite3'))
+    from shopifywebhook.processing import save_orders, validate_order_data
+
+    for start in range(1, args.orders + 1, 500):
+        save_orders([
+            validate_order_data(make_order_payload(order_id, line_items=2))
+            for order_id in range(start, min(start + 500, args.orders + 1))
+        ])
+
+    writes = f"one new order per {args.write_every} requests" if args.write_every else "no writes"
+    print(f"{args.orders} orders, {args.viewers} viewers, {args.requests} requests, {writes}")
+    print(f"{'cache':<6} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'non-200':>8}")
+    order_ids = itertools.count(args.orders + 1)
+    for label, ttl in (('off', 0), ('on', 30)):
+        throughput, latency, failures = run(args, ttl, order_ids)
+        print(f"{label:<6} {throughput:>8.0f} {latency['p50_ms']:>8.1f} {latency['p99_ms']:>8.1f} {failures:>8}")
+
+
+if __name__ == '__main__':
+    main()
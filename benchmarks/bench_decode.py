@@ -0,0 +1,96 @@
+"""
+Webhook body decoding and order validation: the original json.loads plus
+nested try/except validator versus each available decoder backend with the
+single-pass validator.
+
+    python benchmarks/bench_decode.py --iterations 2000
+"""
+import argparse
+import json
+import time
+from decimal import Decimal, InvalidOperation
+
+from common import make_order_payload, setup_django
+
+SIZES = (('small', 1), ('medium', 20), ('large', 500))
+
+
+def legacy_validate(data):
+    """The validator as it was before the single-pass rewrite, minus logging."""
+    from shopifywebhook.payloads import extract_order_columns
+
+    if not isinstance(data, dict):
+        raise ValueError(f"Expected dictionary, got {type(data)}")
+    required_fields = ['id', 'order_number', 'total_price']
+    missing_fields = [field for field in required_fields if not data.get(field)]
+    if missing_fields:
+        raise ValueError(f"Missing required fields: {', '.join(missing_fields)}")
+    try:
+        try:
+            order_id = str(data['id']).strip()
+            if not order_id:
+                raise ValueError("Order ID cannot be empty")
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Invalid order ID: {str(e)}")
+        try:
+            order_number = str(data['order_number']).strip()
+            if not order_number:
+                raise ValueError("Order number cannot be empty")
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Invalid order number: {str(e)}")
+        try:
+            total_price = Decimal(str(data['total_price']))
+            if total_price < 0:
+                raise ValueError("Total price cannot be negative")
+        except (TypeError, ValueError, InvalidOperation) as e:
+            raise ValueError(f"Invalid total price: {str(e)}")
+        email = data.get('email')
+        if email:
+            email = str(email).strip()
+            if '@' not in email:
+                raise ValueError("Invalid email format")
+        return {
+            'order_id': order_id,
+            'order_number': order_number,
+            'email': email or None,
+            'total_price': total_price,
+            **extract_order_columns(data),
+            'raw_data': data,
+        }
+    except Exception as e:
+        raise ValueError(f"Data validation failed: {str(e)}")
+
+
+def per_call_us(func, body, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func(body)
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    setup_django()
+    from shopifywebhook.decoding import available_backends, get_decoder
+    from shopifywebhook.processing import validate_order_data
+
+    paths = {'legacy': lambda body: legacy_validate(json.loads(body))}
+    for name in available_backends():
+        paths[name] = lambda body, loads=get_decoder(name): validate_order_data(loads(body))
+
+    print(f"{'payload':<8} {'bytes':>8} " + ' '.join(f"{name + ' us':>12}" for name in paths)
+          + f" {'speedup':>8}")
+    for label, line_items in SIZES:
+        body = json.dumps(make_order_payload(1, line_items=line_items)).encode()
+        iterations = max(10, args.iterations // max(1, line_items // 20))
+        timings = {name: per_call_us(path, body, iterations) for name, path in paths.items()}
+        best = min(t for name, t in timings.items() if name != 'legacy')
+        print(f"{label:<8} {len(body):>8} " + ' '.join(f"{t:>12.1f}" for t in timings.values())
+              + f" {timings['legacy'] / best:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
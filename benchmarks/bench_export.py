@@ -0,0 +1,56 @@
+"""
+Streaming export throughput (orders/s) and peak Python memory as the number of
+orders grows. Peak memory should stay roughly flat: rows are fetched
+chunk_size orders at a time and written out as they are encoded.
+
+    python benchmarks/bench_export.py --orders 5000,20000,50000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from common import make_order_payload, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--orders', default='5000,20000,50000', help="Comma-separated store sizes")
+    parser.add_argument('--chunk-size', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    setup_django(test_db_file=os.path.join(tempfile.mkdtemp(), 'bench_export.sqlite3'))
+    from shopifywebhook.export import ExportSpec, iter_export
+    from shopifywebhook.processing import save_orders, validate_order_data
+
+    specs = {
+        'csv': dict(fmt='csv'),
+        'csv+fields': dict(fmt='csv', raw_fields=['customer.first_name', 'shipping_address.country_code']),
+        'ndjson+items+gz': dict(fmt='ndjson', line_items=True, compress=True),
+    }
+    rng = random.Random(args.seed)
+    loaded = 0
+    print(f"{'orders':>8} {'export':<16} {'orders/s':>9} {'MB out':>8} {'peak MB':>8}")
+    for target in sorted(int(count) for count in args.orders.split(',')):
+        for start in range(loaded + 1, target + 1, 500):
+            save_orders([
+                validate_order_data(make_order_payload(order_id, line_items=rng.randint(1, 5), rng=rng))
+                for order_id in range(start, min(start + 500, target + 1))
+            ])
+        loaded = target
+        for name, options in specs.items():
+            spec = ExportSpec(chunk_size=args.chunk_size, **options)
+            tracemalloc.start()
+            started = time.perf_counter()
+            size = sum(len(chunk) for chunk in iter_export(spec))
+            seconds = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{target:>8} {name:<16} {target / seconds:>9.0f} {size / 1e6:>8.1f} {peak / 1e6:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Webhook signature verification cost across body sizes: the original
+verify_webhook (encode the secret, key the HMAC and base64 the digest per
+call, compare text) versus pre-keyed HMAC states compared as raw digests,
+including the rotation case where the current key misses and the previous
+one matches. The fixed per-call saving matters most for small bodies.
+
+    python benchmarks/bench_hmac.py --iterations 20000
+"""
+import argparse
+import base64
+import hashlib
+import hmac
+import os
+import time
+
+from common import setup_django
+
+SIZES = (('1 KB', 1024), ('10 KB', 10 * 1024), ('100 KB', 100 * 1024), ('1 MB', 1024 * 1024))
+
+
+def legacy_verify(data, hmac_header, webhook_secret):
+    """verify_webhook as it was before the shop secret registry, minus logging."""
+    try:
+        if not webhook_secret or not hmac_header:
+            return False
+        digest = hmac.new(webhook_secret.encode('utf-8'), data, hashlib.sha256).digest()
+        computed_hmac = base64.b64encode(digest).decode('utf-8')
+        return hmac.compare_digest(computed_hmac, hmac_header)
+    except Exception:
+        return False
+
+
+def per_call_us(func, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=20000)
+    args = parser.parse_args()
+
+    setup_django()
+    from shopifywebhook.shop_secrets import ShopSecretRegistry, verify_hmac
+
+    secret, previous = 'current-secret', 'previous-secret'
+    registry = ShopSecretRegistry()
+    registry.load({
+        'shop.myshopify.com': secret,
+        'rotating.myshopify.com': {
+            'secret': 'brand-new-secret', 'previous': previous,
+            'previous_expires': '2099-01-01T00:00:00Z',
+        },
+    })
+
+    print(f"{'body':<8} {'legacy us':>10} {'registry us':>12} {'rotation us':>12} {'speedup':>8}")
+    for label, size in SIZES:
+        body = os.urandom(size)
+        header = base64.b64encode(hmac.new(secret.encode(), body, hashlib.sha256).digest()).decode()
+        old_header = base64.b64encode(hmac.new(previous.encode(), body, hashlib.sha256).digest()).decode()
+        iterations = max(100, args.iterations * 1024 // max(size, 1024 * 4))
+
+        assert legacy_verify(body, header, secret)
+        assert verify_hmac(body, header, registry.keys_for('shop.myshopify.com'))
+        assert verify_hmac(body, old_header, registry.keys_for('rotating.myshopify.com'))
+
+        legacy = per_call_us(lambda: legacy_verify(body, header, secret), iterations)
+        current = per_call_us(
+            lambda: verify_hmac(body, header, registry.keys_for('shop.myshopify.com')), iterations,
+        )
+        rotation = per_call_us(
+            lambda: verify_hmac(body, old_header, registry.keys_for('rotating.myshopify.com')), iterations,
+        )
+        print(f"{label:<8} {legacy:>10.2f} {current:>12.2f} {rotation:>12.2f} {legacy / current:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""
+Cold start and per-request overhead of the webhook-only entry point
+(webhooktest.wsgi_ingest) against the full site (webhooktest.wsgi).
+
+Each run starts a fresh Python process per entry point that loads the WSGI
+application, answers one webhook (the first request also imports the URLconf
+and views), then times rejected deliveries (bad signature: routing, middleware
+and the HMAC check only) and saved ones (a new order upserted) by calling the
+application directly, without a server in between.
+
+    python benchmarks/bench_ingest_profile.py --runs 5
+"""
+import argparse
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+START = time.perf_counter()
+
+ENTRY_POINTS = ('webhooktest.wsgi', 'webhooktest.wsgi_ingest')
+SECRET = 'bench-ingest-secret'
+WEBHOOK_PATH = '/webhooks/shopify/'
+
+
+def child(module, db_file, requests):
+    """Runs in the measured process: load module's application and time requests."""
+    from common import ROOT, make_order_payload, sign
+    sys.path.insert(0, str(ROOT))
+    __import__(module)
+    application = sys.modules[module].application
+    loaded = time.perf_counter()
+    # Not connected yet: connections open on first use
+    from django.db import connection
+    connection.settings_dict['NAME'] = db_file
+
+    def call(body, signature):
+        environ = {
+            'REQUEST_METHOD': 'POST', 'PATH_INFO': WEBHOOK_PATH, 'SCRIPT_NAME': '', 'QUERY_STRING': '',
+            'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_HOST': 'localhost', 'CONTENT_TYPE': 'application/json', 'CONTENT_LENGTH': str(len(body)),
+            'HTTP_X_SHOPIFY_TOPIC': 'orders/create', 'HTTP_X_SHOPIFY_HMAC_SHA256': signature,
+            'HTTP_X_SHOPIFY_WEBHOOK_ID': str(uuid.uuid4()),
+            'wsgi.input': io.BytesIO(body), 'wsgi.errors': sys.stderr, 'wsgi.url_scheme': 'http',
+            'wsgi.version': (1, 0), 'wsgi.multithread': False, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+        }
+        statuses = []
+        result = application(environ, lambda status, headers, exc_info=None: statuses.append(status))
+        try:
+            for _ in result:
+                pass
+        finally:
+            result.close()
+        return int(statuses[0].split()[0])
+
+    order_ids = iter(range(1, sys.maxsize))
+
+    def saved_body():
+        body = json.dumps(make_order_payload(next(order_ids) + os.getpid() * 1_000_000, line_items=3)).encode()
+        return body, sign(body, SECRET)
+
+    body, signature = saved_body()
+    started = time.perf_counter()
+    status = call(body, signature)
+    first_request = time.perf_counter() - started
+    if status != 200:
+        raise SystemExit(f"{module}: first webhook answered {status}")
+
+    timings = {'rejected': [], 'saved': []}
+    rejected = json.dumps(make_order_payload(1, line_items=3)).encode()
+    for _ in range(requests):
+        started = time.perf_counter()
+        call(rejected, 'bad-signature')
+        timings['rejected'].append(time.perf_counter() - started)
+    for _ in range(requests):
+        body, signature = saved_body()
+        started = time.perf_counter()
+        call(body, signature)
+        timings['saved'].append(time.perf_counter() - started)
+
+    print(json.dumps({
+        'startup_ms': (loaded - START) * 1000,
+        'first_request_ms': first_request * 1000,
+        'modules': len(sys.modules),
+        'rejected_us': statistics.median(timings['rejected']) * 1e6,
+        'saved_us': statistics.median(timings['saved']) * 1e6,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help="Fresh processes per entry point")
+    parser.add_argument('--requests', type=int, default=300, help="Timed requests of each kind per process")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--db', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.db, args.requests)
+        return
+
+    from common import setup_django
+    db_file = os.path.join(tempfile.mkdtemp(), 'bench_ingest_profile.sqlite3')
+    setup_django(test_db_file=db_file)
+
+    env = {
+        key: value for key, value in os.environ.items()
+        if key not in ('DJANGO_SETTINGS_MODULE', 'SHOPIFY_WEBHOOK_ASYNC')
+    }
+    env.update(DJANGO_DEBUG='False', SHOPIFY_WEBHOOK_SECRET=SECRET, SHOPIFY_WEBHOOK_LOG_LEVEL='ERROR',
+               SHOPIFY_OUTBOX_DESTINATIONS='{}', SHOPIFY_WEBHOOK_INGEST_MODE='sync')
+    results = {module: [] for module in ENTRY_POINTS}
+    for _ in range(args.runs):
+        # Alternate so drift on a shared machine hits both entry points alike
+        for module in ENTRY_POINTS:
+            output = subprocess.run(
+                [sys.executable, __file__, '--child', module, '--db', db_file, '--requests', str(args.requests)],
+                env=env, cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True,
+            ).stdout
+            results[module].append(json.loads(output.strip().splitlines()[-1]))
+
+    columns = ('startup_ms', 'first_request_ms', 'modules', 'rejected_us', 'saved_us')
+    print(f"{args.runs} processes per entry point, medians; {args.requests} timed requests of each kind per process")
+    print(f"{'entry point':<26} {'startup ms':>11} {'1st req ms':>11} {'modules':>8} {'401 us':>8} {'200 us':>8}")
+    medians = {}
+    for module, runs in results.items():
+        medians[module] = {name: statistics.median(run[name] for run in runs) for name in columns}
+        row = medians[module]
+        print(f"{module:<26} {row['startup_ms']:>11.0f} {row['first_request_ms']:>11.1f} {row['modules']:>8.0f} "
+              f"{row['rejected_us']:>8.0f} {row['saved_us']:>8.0f}")
+    full, lean = (medians[module] for module in ENTRY_POINTS)
+    cold = full['startup_ms'] + full['first_request_ms']
+    lean_cold = lean['startup_ms'] + lean['first_request_ms']
+    print(f"\nCold start to first response: {cold:.0f} ms -> {lean_cold:.0f} ms ({1 - lean_cold / cold:.0%} less); "
+          f"per request: {full['rejected_us'] - lean['rejected_us']:.0f} us less overhead")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Live order feed fan-out: database queries and delivery latency per new order
+as the number of connected viewers grows.
+
+    python benchmarks/bench_live_feed.py --viewers 1 10 100 1000 --orders 50
+"""
+import argparse
+import asyncio
+import threading
+import time
+
+from common import make_order_payload, setup_django, summarize
+
+
+def run(viewers, orders):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from shopifywebhook.processing import save_orders, validate_order_data
+    from shopifywebhook.pubsub import order_events
+
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+
+    arrivals = {'count': 0}
+    delivered = threading.Event()
+
+    async def consume(subscription):
+        while True:
+            await subscription.get()
+            arrivals['count'] += 1
+            if arrivals['count'] == viewers:
+                delivered.set()
+
+    async def connect():
+        subscriptions = [order_events.subscribe() for _ in range(viewers)]
+        tasks = [asyncio.ensure_future(consume(s)) for s in subscriptions]
+        return subscriptions, tasks
+
+    subscriptions, tasks = asyncio.run_coroutine_threadsafe(connect(), loop).result()
+
+    queries = []
+    latencies = []
+    for i in range(orders):
+        order_data = validate_order_data(make_order_payload(run.next_id))
+        run.next_id += 1
+        arrivals['count'] = 0
+        delivered.clear()
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as captured:
+            save_orders([order_data])
+        delivered.wait(10)
+        latencies.append(time.perf_counter() - started)
+        queries.append(len(captured))
+
+    async def disconnect():
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for subscription in subscriptions:
+            subscription.close()
+
+    asyncio.run_coroutine_threadsafe(disconnect(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+
+    stats = summarize(latencies)
+    return {
+        'viewers': viewers,
+        'queries_per_order': sum(queries) / len(queries),
+        'p50_ms': stats['p50_ms'],
+        'p99_ms': stats['p99_ms'],
+    }
+
+
+run.next_id = 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--viewers', type=int, nargs='+', default=[1, 10, 100, 1000])
+    parser.add_argument('--orders', type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django()
+    print(f"{'viewers':>8} {'queries/order':>14} {'p50 ms':>8} {'p99 ms':>8}")
+    for viewers in args.viewers:
+        result = run(viewers, args.orders)
+        print(f"{result['viewers']:>8} {result['queries_per_order']:>14.1f} "
+              f"{result['p50_ms']:>8.2f} {result['p99_ms']:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""
+Outbound event delivery through the outbox against a local stub server:
+events per second and connections opened, pooled and batched versus one
+event per request, and a check that nothing is lost.
+
+The stub serves three destinations: 'erp' accepts everything, 'fulfilment'
+answers 503 to a share of requests (retried with backoff) and 'email'
+rejects everything with 400 (dead-lettered). The run fails if an event for
+erp or fulfilment is never delivered or an email event is not dead-lettered.
+
+    python benchmarks/bench_outbox.py --orders 2000 --latency-ms 5
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from common import make_order_payload, setup_django
+
+
+class StubServer(ThreadingHTTPServer):
+    """Keep-alive HTTP server that records every event id it accepts, per path."""
+
+    daemon_threads = True
+
+    def __init__(self, latency, failure_rate):
+        super().__init__(('127.0.0.1', 0), StubHandler)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.received = defaultdict(set)
+        self.requests = 0
+        self.connections = 0
+
+    def process_request(self, request, client_address):
+        with self.lock:
+            self.connections += 1
+        super().process_request(request, client_address)
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server_address[1]}{path}"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        server = self.server
+        time.sleep(server.latency)
+        with server.lock:
+            server.requests += 1
+        if self.path == '/email':
+            status = 400
+        elif self.path == '/fulfilment' and random.random() < server.failure_rate:
+            status = 503
+        else:
+            status = 200
+            with server.lock:
+                server.received[self.path].update(event['id'] for event in json.loads(body)['events'])
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--orders', type=int, default=2000)
+    parser.add_argument('--latency-ms', type=float, default=5.0, help="Stub server time per request")
+    parser.add_argument('--failure-rate', type=float, default=0.2, help="Share of fulfilment requests answered 503")
+    parser.add_argument('--batch-size', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=4)
+    args = parser.parse_args()
+
+    setup_django(test_db_file=os.path.join(tempfile.mkdtemp(), 'bench_outbox.sqlite3'))
+    from django.test.utils import override_settings
+    from shopifywebhook.models import DeadLetterEvent, OutboxEvent
+    from shopifywebhook.outbox import Destination, run_dispatcher
+    from shopifywebhook.processing import save_orders, validate_order_data
+
+    server = StubServer(args.latency_ms / 1000, args.failure_rate)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def destinations(batch_size):
+        return [
+            Destination(name=name, url=server.url(f"/{name}"), secret='bench',
+                        batch_size=batch_size, concurrency=args.concurrency, timeout=5)
+            for name in ('erp', 'fulfilment', 'email')
+        ]
+
+    outbox = {name: {} for name in ('erp', 'fulfilment', 'email')}
+    print(f"{args.orders} orders, stub latency {args.latency_ms:.0f} ms, "
+          f"{args.failure_rate:.0%} fulfilment 503s, concurrency {args.concurrency}")
+    print(f"{'mode':<22} {'events/s':>9} {'requests':>9} {'connections':>12} {'dead':>6}")
+    failed = False
+    modes = ((f"pooled, batches of {args.batch_size}", args.batch_size), ('one event per request', 1))
+    for run, (label, batch_size) in enumerate(modes):
+        OutboxEvent.objects.all().delete()
+        DeadLetterEvent.objects.all().delete()
+        server.reset()
+        with override_settings(SHOPIFY_OUTBOX_DESTINATIONS=outbox):
+            # Fresh order ids per mode: re-saving the same versions would be skipped as stale
+            first = run * args.orders + 1
+            for start in range(first, first + args.orders, 500):
+                save_orders([
+                    validate_order_data(make_order_payload(order_id, line_items=2))
+                    for order_id in range(start, min(start + 500, first + args.orders))
+                ])
+        expected = {
+            name: set(OutboxEvent.objects.filter(destination=name).values_list('id', flat=True))
+            for name in outbox
+        }
+        total = sum(len(ids) for name, ids in expected.items() if name != 'email')
+
+        stop = threading.Event()
+        with override_settings(SHOPIFY_OUTBOX_BACKOFF_SECONDS=0.01, SHOPIFY_OUTBOX_MAX_BACKOFF_SECONDS=0.1,
+                               SHOPIFY_OUTBOX_MAX_ATTEMPTS=20):
+            started = time.perf_counter()
+            runner = threading.Thread(target=run_dispatcher, kwargs=dict(
+                stop=stop, destinations=destinations(batch_size), poll_interval=0.01,
+            ))
+            runner.start()
+            while OutboxEvent.objects.filter(status=OutboxEvent.STATUS_PENDING).exists():
+                time.sleep(0.05)
+            seconds = time.perf_counter() - started
+            stop.set()
+            runner.join()
+
+        dead = DeadLetterEvent.objects.count()
+        print(f"{label:<22} {total / seconds:>9.0f} {server.requests:>9} {server.connections:>12} {dead:>6}")
+        for name in ('erp', 'fulfilment'):
+            missing = expected[name] - server.received[f"/{name}"]
+            if missing:
+                print(f"FAIL: {len(missing)} {name} events never delivered")
+                failed = True
+        if dead != len(expected['email']) or DeadLetterEvent.objects.exclude(destination='email').exists():
+            print("FAIL: dead letters should be exactly the email events")
+            failed = True
+    server.shutdown()
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
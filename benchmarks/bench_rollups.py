@@ -0,0 +1,135 @@
+"""
+Compare dashboard sales stats read from the rollup tables with the same
+figures aggregated over every order, and check that rollups maintained by
+concurrent upserts match a full recomputation.
+
+Exits non-zero if the incrementally maintained rollups drift:
+
+    python benchmarks/bench_rollups.py --orders 50000 --days 30 --threads 4
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+
+from common import make_order_payload, setup_django
+
+
+def snapshot(models):
+    """Every non-empty rollup row, for comparing two ways of computing them."""
+    return {
+        model.__name__: sorted(
+            (row[:-1], round(row[-1], 2))
+            for row in model.objects.filter(order_count__gt=0)
+            .values_list(*model.KEY_FIELDS, 'order_count', 'revenue')
+        )
+        for model in models
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--orders', type=int, default=20000)
+    parser.add_argument('--days', type=int, default=30, help="Spread order creation times over this many days")
+    parser.add_argument('--updates', type=int, default=2000, help="orders/updated deliveries replayed concurrently")
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=20, help="Dashboard reads timed per method")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    db_file = os.path.join(tempfile.mkdtemp(), 'bench_rollups.sqlite3')
+    setup_django(test_db_file=db_file)
+    from django.db import connection
+    from django.db.models import Count, Sum
+    from django.utils.timezone import now
+    from shopifywebhook.models import CustomerRollup, SalesRollup, ShopifyWebhookOrder
+    from shopifywebhook.processing import save_orders, validate_order_data
+    from shopifywebhook.rollups import dashboard_stats, rebuild_rollups
+    from shopifywebhook.topics import get_handler
+
+    rng = random.Random(args.seed)
+    end = now()
+    shops = ('one.myshopify.com', 'two.myshopify.com')
+
+    def payload(order_id, version):
+        data = make_order_payload(order_id, line_items=2, rng=rng)
+        placed = end - timedelta(seconds=(order_id * 7919) % (args.days * 86400))
+        data['created_at'] = placed.isoformat()
+        data['updated_at'] = (placed + timedelta(minutes=version)).isoformat()
+        data['email'] = f"customer{rng.randint(1, 500)}@example.com"
+        return data
+
+    started = time.perf_counter()
+    for start in range(1, args.orders + 1, 500):
+        batch = []
+        for order_id in range(start, min(start + 500, args.orders + 1)):
+            order_data = validate_order_data(payload(order_id, 0))
+            order_data['shop_domain'] = shops[order_id % len(shops)]
+            batch.append(order_data)
+        save_orders(batch)
+    load_seconds = time.perf_counter() - started
+
+    # Price and email changes from several writers at once, shuffled so some arrive stale
+    updates = [payload(rng.randint(1, args.orders), rng.randint(1, 5)) for _ in range(args.updates)]
+    handler = get_handler('orders/updated')
+    errors = []
+
+    def replay(share):
+        try:
+            for data in share:
+                headers = {'X-Shopify-Shop-Domain': shops[int(data['id']) % len(shops)]}
+                handler.save_many([handler.clean(data, headers)])
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=replay, args=(updates[i::args.threads],)) for i in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    update_seconds = time.perf_counter() - started
+
+    incremental = snapshot((SalesRollup, CustomerRollup))
+    rebuild_started = time.perf_counter()
+    rebuild_rollups()
+    rebuild_seconds = time.perf_counter() - rebuild_started
+    rebuilt = snapshot((SalesRollup, CustomerRollup))
+
+    def full_scan():
+        since = now() - timedelta(hours=24)
+        recent = ShopifyWebhookOrder.objects.filter(placed_at__gte=since)
+        totals = recent.aggregate(order_count=Count('id'), revenue=Sum('total_price'))
+        top = list(
+            ShopifyWebhookOrder.objects.exclude(email=None).values('shop_domain', 'email')
+            .annotate(order_count=Count('id'), revenue=Sum('total_price')).order_by('-revenue')[:5]
+        )
+        return totals, top
+
+    timings = {}
+    for name, read in (('rollups', dashboard_stats), ('full scan', full_scan)):
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            read()
+        timings[name] = (time.perf_counter() - started) / args.repeat
+
+    print(f"loaded {args.orders} orders in {load_seconds:.2f}s ({args.orders / load_seconds:.0f}/s), "
+          f"{SalesRollup.objects.count()} hourly rows, {CustomerRollup.objects.count()} customer rows")
+    print(f"{args.updates} updates on {args.threads} threads in {update_seconds:.2f}s, errors {len(errors)}")
+    print(f"rebuild_rollups {rebuild_seconds * 1000:.0f} ms")
+    for name, seconds in timings.items():
+        print(f"dashboard stats via {name:<9} {seconds * 1000:8.2f} ms")
+    drift = incremental != rebuilt
+    print(f"incremental rollups match recomputation: {not drift}")
+    if drift or errors:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Order search latency from the token index, against the admin's old
+icontains scan and a scan of every stored payload.
+
+    python benchmarks/bench_search.py --orders 50000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from common import make_order_payload, setup_django
+
+FIRST_NAMES = ('ann', 'bob', 'carla', 'dev', 'erin', 'farid', 'gia', 'hugo')
+LAST_NAMES = ('smith', 'jones', 'nguyen', 'garcia', 'kowalski', 'okafor', 'silva', 'tanaka')
+TAGS = ('vip', 'wholesale', 'gift', 'subscription', 'first-order', 'review-requested')
+
+
+def make_payload(order_id, rng):
+    payload = make_order_payload(order_id, line_items=rng.randint(1, 5), rng=rng)
+    payload['customer'].update(first_name=rng.choice(FIRST_NAMES).title(), last_name=rng.choice(LAST_NAMES).title())
+    payload['tags'] = ', '.join(rng.sample(TAGS, rng.randint(0, 2)))
+    if rng.random() < 0.1:
+        payload['discount_codes'] = [{'code': f"SAVE{rng.randint(1, 50)}"}]
+    return payload
+
+
+def timed(func, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - started) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--orders', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    setup_django(test_db_file=os.path.join(tempfile.mkdtemp(), 'bench_search.sqlite3'))
+    from shopifywebhook.models import OrderPayload, OrderSearchToken, ShopifyWebhookOrder
+    from shopifywebhook.processing import save_orders, validate_order_data
+    from shopifywebhook.search import search_orders
+
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    for start in range(1, args.orders + 1, 500):
+        save_orders([
+            validate_order_data(make_payload(order_id, rng))
+            for order_id in range(start, min(start + 500, args.orders + 1))
+        ])
+    load_seconds = time.perf_counter() - started
+    tokens = OrderSearchToken.objects.count()
+    print(f"loaded {args.orders} orders in {load_seconds:.1f}s ({args.orders / load_seconds:.0f}/s), "
+          f"{tokens / args.orders:.1f} tokens per order")
+
+    queries = ('sku:SKU-0042', 'smith', 'tanaka tag:vip', 'gar*', 'discount:save7', 'customer17@example.com')
+    print(f"{'query':<24} {'ms':>8} {'first page':>11}")
+    for query in queries:
+        seconds, (orders, _) = timed(lambda: search_orders(query), args.repeat)
+        print(f"{query:<24} {seconds * 1000:>8.2f} {len(orders):>11}")
+
+    seconds, _ = timed(lambda: list(ShopifyWebhookOrder.objects.filter(email__icontains='customer17@')[:50]), args.repeat)
+    print(f"{'email icontains (old)':<24} {seconds * 1000:>8.2f}")
+
+    def payload_scan():
+        return [
+            payload.order_id for payload in OrderPayload.objects.iterator(chunk_size=2000)
+            if any(item.get('sku') == 'SKU-0042' for item in payload.decode().get('line_items', ()))
+        ]
+    seconds, found = timed(payload_scan, 1)
+    print(f"{'sku payload scan':<24} {seconds * 1000:>8.2f} {len(found):>11} (all matches)")
+
+
+if __name__ == '__main__':
+    main()
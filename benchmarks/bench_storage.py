@@ -0,0 +1,96 @@
+"""
+Order row size and scan speed with the raw payload stored inline (the old
+layout) versus compressed in the OrderPayload side table.
+
+    python benchmarks/bench_storage.py --orders 5000 --line-items 20
+"""
+import argparse
+import json
+import random
+import time
+
+from common import make_order_payload, setup_django
+
+LEGACY_TABLE = 'bench_legacy_order'
+
+
+def time_scan(cursor, sql, repeat=5):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        cursor.execute(sql)
+        result = cursor.fetchall()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def table_bytes(cursor, table):
+    """Bytes used by a table and its indexes, via SQLite's dbstat if compiled in."""
+    try:
+        cursor.execute(
+            "SELECT SUM(pgsize) FROM dbstat WHERE name = %s OR name IN "
+            "(SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = %s)",
+            [table, table],
+        )
+        return cursor.fetchone()[0]
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--orders', type=int, default=5000)
+    parser.add_argument('--line-items', type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+    from shopifywebhook.models import OrderPayload, ShopifyWebhookOrder
+    from shopifywebhook.processing import save_orders, validate_order_data
+
+    rng = random.Random(42)
+    payloads = [
+        make_order_payload(i, line_items=rng.randint(1, args.line_items * 2), rng=rng)
+        for i in range(1, args.orders + 1)
+    ]
+    for start in range(0, len(payloads), 500):
+        save_orders(validate_order_data(p) for p in payloads[start:start + 500])
+
+    order_table = ShopifyWebhookOrder._meta.db_table
+    payload_table = OrderPayload._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TABLE {LEGACY_TABLE} AS SELECT id, order_id, order_number, email, "
+            f"total_price, created_at, '' AS raw_data FROM {order_table}"
+        )
+        cursor.executemany(
+            f"UPDATE {LEGACY_TABLE} SET raw_data = %s WHERE order_id = %s",
+            [(json.dumps(p), str(p['id'])) for p in payloads],
+        )
+
+        inline_bytes = sum(len(json.dumps(p)) for p in payloads)
+        cursor.execute(f"SELECT SUM(size) FROM {payload_table}")
+        compressed_bytes = cursor.fetchone()[0]
+
+        # A filter no index can serve, so every row of the table is visited
+        scan = "SELECT COUNT(*), SUM(total_price) FROM {} WHERE email LIKE '%%7%%'"
+        legacy_scan, _ = time_scan(cursor, scan.format(LEGACY_TABLE))
+        hot_scan, _ = time_scan(cursor, scan.format(order_table))
+        rows = len(payloads)
+        legacy_size = table_bytes(cursor, LEGACY_TABLE)
+        hot_size = table_bytes(cursor, order_table)
+
+    print(f"orders:                    {rows}")
+    print(f"avg payload inline:        {inline_bytes / rows:,.0f} bytes")
+    print(f"avg payload compressed:    {compressed_bytes / rows:,.0f} bytes "
+          f"({inline_bytes / compressed_bytes:.1f}x smaller)")
+    if legacy_size and hot_size:
+        print(f"order table, inline:       {legacy_size / rows:,.0f} bytes/row")
+        print(f"order table, split:        {hot_size / rows:,.0f} bytes/row (incl. indexes)")
+    print(f"full scan, inline:         {legacy_scan * 1000:.1f} ms")
+    print(f"full scan, split:          {hot_scan * 1000:.1f} ms ({legacy_scan / hot_scan:.1f}x faster)")
+
+
+if __name__ == '__main__':
+    main()
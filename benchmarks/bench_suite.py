@@ -0,0 +1,369 @@
+"""
+Request-path benchmark suite and regression gate for the webhook pipeline.
+
+Times each stage of an orders/create delivery on its own (signature check,
+JSON decode, validation, ORM upsert) and the whole request through the test
+client, for small, medium and large payloads, then the dashboard at several
+stored-order counts. Every case records per-call latency, database queries
+per call and peak Python allocation per call (tracemalloc).
+
+Write results as JSON, then gate later runs against them:
+
+    python benchmarks/bench_suite.py --output baseline.json
+    python benchmarks/bench_suite.py --compare baseline.json --threshold 0.25
+
+With --compare the run exits 1 if a case got slower or allocated more than
+the threshold allows, or makes more queries, than in the baseline.
+"""
+import argparse
+import gc
+import hashlib
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timezone
+
+from common import make_order_payload, percentile, setup_django, sign
+
+SECRET = 'bench-suite-secret'
+WEBHOOK_PATH = '/webhooks/shopify/order/create/'
+
+# name: (line items, note bytes)
+FIXTURES = {
+    'small': (1, 0),
+    'medium': (10, 1024),
+    'large': (100, 16 * 1024),
+}
+
+
+class Case:
+    """
+    One benchmarked operation.
+
+    call(i) runs the operation for the i-th iteration; inputs that must be
+    unique per call (order ids, webhook ids) are prepared by prepare(count)
+    beforehand so they are not timed.
+    """
+
+    def __init__(self, name, call, prepare=None, iterations=None):
+        self.name = name
+        self.call = call
+        self.prepare = prepare
+        self.iterations = iterations
+
+
+def calibrate(rounds=5, calls=100):
+    """
+    Time a fixed CPU-bound workload (hashing and JSON), in microseconds per call.
+
+    Sampled before every case and stored as the median of the samples, so it
+    reflects the machine's speed over the whole run. Comparisons divide by
+    the ratio between two runs' calibrations, so a machine that is uniformly
+    slower today (noisy neighbour, power saving) does not read as a
+    regression everywhere.
+    """
+    data = json.dumps(make_order_payload(1, line_items=10)).encode()
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(calls):
+            hashlib.sha256(data).digest()
+            json.loads(data)
+        samples.append((time.perf_counter() - started) / calls * 1e6)
+    return statistics.median(samples)
+
+
+def measure(case, iterations, warmup, repeat=1):
+    """
+    Run a case and collect latency, queries and allocations per call.
+
+    Timing, query counting and tracemalloc run in separate passes so the
+    tracing overhead never shows up in the latencies. With repeat > 1 the
+    timed pass runs that many times and the fastest pass is reported, as
+    timeit does: slower passes measure interference, not the code.
+    """
+    from django.db import connection
+
+    iterations = case.iterations or iterations
+    total = warmup + repeat * iterations + 2 * min(iterations, 20)
+    if case.prepare:
+        case.prepare(total)
+    index = 0
+
+    def next_call():
+        nonlocal index
+        case.call(index)
+        index += 1
+
+    for _ in range(warmup):
+        next_call()
+
+    # As timeit does: a collection triggered by whatever the heap held
+    # before would be billed to whichever call happened to cross the threshold
+    passes = []
+    for _ in range(repeat):
+        timings = []
+        gc.collect()
+        gc.disable()
+        try:
+            for _ in range(iterations):
+                started = time.perf_counter()
+                next_call()
+                timings.append(time.perf_counter() - started)
+        finally:
+            gc.enable()
+        passes.append(timings)
+    seconds = min(passes, key=statistics.median)
+
+    # An execute wrapper rather than CaptureQueriesContext: the test client's
+    # request_started signal clears connection.queries mid-request
+    queries = 0
+
+    def count_query(execute, sql, params, many, context):
+        nonlocal queries
+        queries += 1
+        return execute(sql, params, many, context)
+
+    samples = min(iterations, 20)
+    with connection.execute_wrapper(count_query):
+        for _ in range(samples):
+            next_call()
+
+    peaks = []
+    tracemalloc.start()
+    try:
+        for _ in range(samples):
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            next_call()
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'calls': iterations,
+        'median_us': statistics.median(seconds) * 1e6,
+        'p95_us': percentile(seconds, 95) * 1e6,
+        'mean_us': statistics.fmean(seconds) * 1e6,
+        'queries': queries / samples,
+        'alloc_peak_kb': statistics.median(peaks) / 1024,
+    }
+
+
+def stage_cases(fixture, line_items, note_bytes, next_order_id):
+    """Cases for each stage of webhook_order_created with one payload size."""
+    from django.test import Client
+    from shopifywebhook.decoding import loads
+    from shopifywebhook.processing import save_orders, validate_order_data
+    from shopifywebhook.webhooks import verify_webhook
+
+    payload = make_order_payload(1, line_items=line_items, note_bytes=note_bytes)
+    body = json.dumps(payload).encode()
+    signature = sign(body, SECRET)
+
+    fresh = {}
+
+    def prepare_orders(count):
+        fresh['orders'] = [
+            validate_order_data(make_order_payload(next_order_id(), line_items=line_items, note_bytes=note_bytes))
+            for _ in range(count)
+        ]
+
+    def prepare_requests(count):
+        fresh['requests'] = []
+        for _ in range(count):
+            request_body = json.dumps(
+                make_order_payload(next_order_id(), line_items=line_items, note_bytes=note_bytes)
+            ).encode()
+            fresh['requests'].append((request_body, {
+                'X-Shopify-Hmac-Sha256': sign(request_body, SECRET),
+                'X-Shopify-Webhook-Id': str(uuid.uuid4()),
+                'X-Shopify-Topic': 'orders/create',
+            }))
+
+    client = Client()
+
+    def post(i):
+        request_body, headers = fresh['requests'][i]
+        response = client.post(WEBHOOK_PATH, request_body, content_type='application/json', headers=headers)
+        if response.status_code != 200:
+            raise RuntimeError(f"{WEBHOOK_PATH} answered {response.status_code}: {response.content[:200]!r}")
+
+    size = f"{fixture} ({len(body) // 1024} KB)" if len(body) >= 1024 else f"{fixture} ({len(body)} B)"
+    return [
+        Case(f"verify_webhook/{fixture}", lambda i: verify_webhook(body, signature, SECRET)),
+        Case(f"decode/{fixture}", lambda i: loads(body)),
+        Case(f"validate_order_data/{fixture}", lambda i: validate_order_data(loads(body))),
+        Case(f"upsert/{fixture}", lambda i: save_orders([fresh['orders'][i]]), prepare=prepare_orders),
+        Case(f"request/{fixture}", post, prepare=prepare_requests),
+    ], size
+
+
+def index_cases(count):
+    """Dashboard cases once count orders are stored: cold render and cached."""
+    from django.test import Client
+    from django.test.utils import override_settings
+
+    client = Client()
+
+    def get(i):
+        response = client.get('/')
+        if response.status_code != 200:
+            raise RuntimeError(f"/ answered {response.status_code}")
+
+    def uncached(i):
+        with override_settings(SHOPIFY_DASHBOARD_CACHE_TTL=0):
+            get(i)
+
+    label = f"{count // 1000}k" if count >= 1000 else str(count)
+    return [
+        Case(f"index/{label}", uncached, iterations=50),
+        Case(f"index/{label}/cached", get),
+    ]
+
+
+def compare(results, baseline, threshold, speed=1.0):
+    """
+    Print each case against the baseline.
+
+    Args:
+        results (dict): This run's results by case name
+        baseline (dict): The baseline's results by case name
+        threshold (float): Allowed relative slowdown or allocation growth
+        speed (float): This machine's calibration time over the baseline's;
+            latencies are divided by it before comparing
+
+    Returns:
+        list: Names of the cases that regressed
+    """
+    regressions = []
+    print(f"\n{'case':<34} {'median us':>11} {'baseline':>11} {'change':>8} {'queries':>9} {'alloc':>8}")
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            print(f"{name:<34} {result['median_us']:>11.1f} {'new':>11}")
+            continue
+        median = result['median_us'] / speed
+        change = median / before['median_us'] - 1 if before['median_us'] else 0.0
+        alloc_change = (
+            result['alloc_peak_kb'] / before['alloc_peak_kb'] - 1 if before['alloc_peak_kb'] else 0.0
+        )
+        flags = []
+        if change > threshold:
+            flags.append('slower')
+        if result['queries'] > before['queries']:
+            flags.append('more queries')
+        if alloc_change > threshold:
+            flags.append('more memory')
+        if flags:
+            regressions.append(name)
+        print(f"{name:<34} {median:>11.1f} {before['median_us']:>11.1f} {change:>+8.0%} "
+              f"{result['queries'] - before['queries']:>+9.1f} {alloc_change:>+8.0%}"
+              + (f"  REGRESSION: {', '.join(flags)}" if flags else ''))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=200, help="Timed calls per case")
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=3, help="Timed passes per case; the fastest is kept")
+    parser.add_argument('--index-sizes', default='1000,10000,100000',
+                        help="Stored order counts to render the dashboard at")
+    parser.add_argument('--only', help="Only run cases whose name contains this text")
+    parser.add_argument('--output', help="Write the results to this JSON file")
+    parser.add_argument('--compare', help="Baseline JSON file from an earlier --output run")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="Allowed slowdown / allocation growth before a case counts as a regression")
+    args = parser.parse_args()
+
+    setup_django(test_db_file=os.path.join(tempfile.mkdtemp(), 'bench_suite.sqlite3'))
+    import django
+    from django.conf import settings
+    from django.db import connection
+    from django.test.utils import override_settings
+    from shopifywebhook.models import ShopifyWebhookOrder
+    from shopifywebhook.processing import save_orders, validate_order_data
+
+    order_ids = iter(range(10_000_000, sys.maxsize))
+    results = {}
+    calibrations = []
+
+    def run(case):
+        if args.only and args.only not in case.name:
+            return
+        calibrations.append(calibrate())
+        results[case.name] = result = measure(case, args.iterations, args.warmup, args.repeat)
+        print(f"{case.name:<34} {result['median_us']:>11.1f} {result['p95_us']:>11.1f} "
+              f"{result['queries']:>8.1f} {result['alloc_peak_kb']:>10.1f}")
+
+    with override_settings(
+        ALLOWED_HOSTS=['testserver', *settings.ALLOWED_HOSTS],
+        SHOPIFY_WEBHOOK_SECRET=SECRET,
+        SHOPIFY_WEBHOOK_PREVIOUS_SECRET=None,
+        SHOPIFY_SHOP_SECRETS={},
+        SHOPIFY_SHOP_SECRETS_FILE=None,
+        SHOPIFY_OUTBOX_DESTINATIONS={},
+    ):
+        print(f"{'case':<34} {'median us':>11} {'p95 us':>11} {'queries':>8} {'alloc KB':>10}")
+        for fixture, (line_items, note_bytes) in FIXTURES.items():
+            cases, size = stage_cases(fixture, line_items, note_bytes, lambda: next(order_ids))
+            print(f"-- payload {size}")
+            for case in cases:
+                run(case)
+
+        # Dashboard cases count every stored order, including those the stage cases wrote
+        for count in sorted(int(size) for size in args.index_sizes.split(',')):
+            stored = ShopifyWebhookOrder.objects.count()
+            while stored < count:
+                batch = min(500, count - stored)
+                save_orders([
+                    validate_order_data(make_order_payload(next(order_ids), line_items=2))
+                    for _ in range(batch)
+                ])
+                stored += batch
+            print(f"-- dashboard with {count} orders")
+            for case in index_cases(count):
+                run(case)
+
+    calibration_us = statistics.median(calibrations) if calibrations else None
+    report = {
+        'meta': {
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'iterations': args.iterations,
+            'repeat': args.repeat,
+            'calibration_us': calibration_us,
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        speed = calibration_us / (baseline['meta'].get('calibration_us') or calibration_us)
+        print(f"\nMachine speed vs baseline: {1 / speed:.2f}x (latencies scaled by {1 / speed:.2f})")
+        regressions = compare(results, baseline['results'], args.threshold, speed)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+            raise SystemExit(1)
+        print(f"\nNo regressions beyond {args.threshold:.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Replay shuffled orders/updated deliveries from several threads and check that
+every order ends up at its newest version, with stale deliveries skipped.
+
+Exits non-zero if any order is left at an older version, so it doubles as a
+concurrency check for the conditional upsert:
+
+    python benchmarks/bench_versioning.py --orders 200 --versions 5 --threads 8
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from common import make_order_payload, setup_django
+
+BASE_TIME = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def make_deliveries(orders, versions, rng):
+    """
+    Build every version of every order as (payload, triggered_at) pairs.
+
+    Version v of an order has updated_at = BASE_TIME + v minutes and a total
+    price of v + 1, so the expected final price is simply `versions`.
+    """
+    deliveries = []
+    for order_id in range(1, orders + 1):
+        for version in range(versions):
+            payload = make_order_payload(order_id, line_items=2, rng=rng)
+            updated_at = BASE_TIME + timedelta(minutes=version)
+            payload['updated_at'] = updated_at.isoformat()
+            payload['total_price'] = f"{version + 1}.00"
+            deliveries.append((payload, (updated_at + timedelta(seconds=1)).isoformat()))
+    return deliveries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--orders', type=int, default=200)
+    parser.add_argument('--versions', type=int, default=5)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    db_file = os.path.join(tempfile.mkdtemp(), 'bench_versioning.sqlite3')
+    setup_django(test_db_file=db_file)
+    from django.db import connection
+    from shopifywebhook.models import ShopifyWebhookOrder
+    from shopifywebhook.topics import get_handler
+
+    rng = random.Random(args.seed)
+    deliveries = make_deliveries(args.orders, args.versions, rng)
+    rng.shuffle(deliveries)
+    handler = get_handler('orders/updated')
+
+    lock = threading.Lock()
+    counts = {'written': 0, 'stale': 0, 'errors': 0}
+    shares = [deliveries[i::args.threads] for i in range(args.threads)]
+
+    def replay(share):
+        try:
+            for payload, triggered_at in share:
+                data = handler.clean(payload, {'X-Shopify-Triggered-At': triggered_at})
+                try:
+                    order = handler.save_many([data])[0]
+                except Exception:
+                    with lock:
+                        counts['errors'] += 1
+                    continue
+                with lock:
+                    counts['stale' if order.stale else 'written'] += 1
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=replay, args=(share,)) for share in shares]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    expected_price = args.versions
+    expected_updated_at = BASE_TIME + timedelta(minutes=args.versions - 1)
+    wrong = ShopifyWebhookOrder.objects.exclude(
+        total_price=expected_price, shopify_updated_at=expected_updated_at,
+    ).count()
+    stored = ShopifyWebhookOrder.objects.count()
+
+    print(f"{len(deliveries)} deliveries for {args.orders} orders on {args.threads} threads "
+          f"in {elapsed:.2f}s ({len(deliveries) / elapsed:.0f}/s)")
+    print(f"written {counts['written']}, stale no-ops {counts['stale']}, errors {counts['errors']}")
+    print(f"orders stored {stored}, not at newest version {wrong}")
+    if wrong or stored != args.orders or counts['errors']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
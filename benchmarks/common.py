@@ -0,0 +1,70 @@
+"""
+Shared helpers for the benchmark scripts in this directory.
+
+Every script runs against a throwaway test database, never db.sqlite3:
+
+    python benchmarks/<script>.py --help
+"""
+import os
+import random
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def setup_django(settings_module='webhooktest.settings', test_db_file=None):
+    """
+    Configure Django and create a fresh test database.
+
+    Args:
+        settings_module (str): Settings to load unless DJANGO_SETTINGS_MODULE is set
+        test_db_file (str): Put the SQLite test database in this file instead of
+            memory, needed when several threads write concurrently
+    """
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+    from django.db import connection
+    if test_db_file:
+        connection.settings_dict['TEST']['NAME'] = test_db_file
+    from django.test.utils import setup_test_environment
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+
+
+def sign(body, secret):
+    """Shopify-style base64 HMAC-SHA256 signature of a request body."""
+    import base64
+    import hashlib
+    import hmac
+    return base64.b64encode(hmac.new(secret.encode('utf-8'), body, hashlib.sha256).digest()).decode()
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(seconds):
+    """Latency summary in milliseconds for a list of durations in seconds."""
+    return {
+        'count': len(seconds),
+        'mean_ms': sum(seconds) / len(seconds) * 1000 if seconds else 0.0,
+        'p50_ms': percentile(seconds, 50) * 1000,
+        'p95_ms': percentile(seconds, 95) * 1000,
+        'p99_ms': percentile(seconds, 99) * 1000,
+    }
+
+
+def make_order_payload(order_id, line_items=3, rng=random, note_bytes=0):
+    """Build a Shopify-shaped orders/create payload (see shopifywebhook.synthetic)."""
+    from shopifywebhook.synthetic import make_order_payload as build
+    return build(order_id, line_items=line_items, rng=rng, note_bytes=note_bytes)
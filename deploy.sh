@@ -24,7 +24,7 @@ python manage.py collectstatic --noinput
 
 # 4. Test the application
 echo -e "${GREEN}Running tests...${NC}"
-python manage.py test
+python -m pytest
 
 # 5. Create or update .env file
 if [ ! -f .env ]; then
@@ -1,9 +1,82 @@
 from django.contrib import admin
-from .models import ShopifyWebhookOrder
+from .models import (
+    ArchivedOrder, DeadLetterEvent, OrderLineItem, OutboxEvent, ShopifyWebhookEvent, ShopifyWebhookOrder, WebhookInboxItem,
+)
+from .search import matching_orders
+
+class OrderLineItemInline(admin.TabularInline):
+    model = OrderLineItem
+    fields = ['position', 'sku', 'title', 'quantity', 'price', 'total_discount', 'product_id', 'variant_id']
+    readonly_fields = fields
+    ordering = ['position']
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
 
 @admin.register(ShopifyWebhookOrder)
 class ShopifyWebhookOrderAdmin(admin.ModelAdmin):
-    list_display = ['order_number', 'email', 'total_price', 'created_at']
+    list_display = ['order_number', 'email', 'total_price', 'currency', 'financial_status', 'created_at']
+    list_filter = ['financial_status', 'currency']
     search_fields = ['order_number', 'email']
-    readonly_fields = ['order_id', 'order_number', 'email', 'total_price', 'raw_data', 'created_at']
+    readonly_fields = [
+        'order_id', 'order_number', 'email', 'total_price', 'financial_status', 'currency',
+        'customer_id', 'line_item_count', 'shopify_updated_at', 'shop_domain', 'placed_at',
+        'raw_data', 'created_at',
+    ]
     ordering = ['-created_at']
+    inlines = [OrderLineItemInline]
+
+    def get_search_results(self, request, queryset, search_term):
+        # Substring matches on search_fields as before, plus orders found through
+        # the search token index with the syntax of /api/orders/search/
+        # (sku:ABC-12 tag:vip smi*)
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        try:
+            results |= matching_orders(search_term, queryset)
+        except ValueError:
+            pass
+        return results, may_have_duplicates
+
+@admin.register(WebhookInboxItem)
+class WebhookInboxItemAdmin(admin.ModelAdmin):
+    list_display = ['id', 'topic', 'shop_domain', 'status', 'attempts', 'received_at', 'processed_at']
+    list_filter = ['status', 'topic']
+    search_fields = ['webhook_id', 'shop_domain']
+    readonly_fields = ['topic', 'shop_domain', 'webhook_id', 'headers', 'received_at', 'processed_at']
+    exclude = ['body']
+
+@admin.register(ShopifyWebhookEvent)
+class ShopifyWebhookEventAdmin(admin.ModelAdmin):
+    list_display = ['topic', 'resource_id', 'order_id', 'received_at']
+    list_filter = ['topic']
+    search_fields = ['resource_id', 'order_id']
+    readonly_fields = ['topic', 'resource_id', 'order_id', 'raw_data', 'received_at']
+    exclude = ['data', 'encoding']
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ['id', 'destination', 'event_type', 'order_id', 'status', 'attempts', 'next_attempt_at', 'created_at']
+    list_filter = ['destination', 'status', 'event_type']
+    search_fields = ['order_id']
+    readonly_fields = [
+        'destination', 'event_type', 'order_id', 'data', 'status', 'attempts', 'next_attempt_at',
+        'last_error', 'created_at', 'delivered_at',
+    ]
+
+@admin.register(DeadLetterEvent)
+class DeadLetterEventAdmin(admin.ModelAdmin):
+    list_display = ['id', 'destination', 'event_type', 'order_id', 'attempts', 'failed_at']
+    list_filter = ['destination', 'event_type']
+    search_fields = ['order_id']
+    readonly_fields = ['destination', 'event_type', 'order_id', 'data', 'attempts', 'last_error', 'created_at', 'failed_at']
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(admin.ModelAdmin):
+    list_display = ['order_id', 'shop_domain', 'created_at', 'archive', 'archived_at']
+    list_filter = ['archive']
+    search_fields = ['order_id']
+    readonly_fields = [
+        'order_id', 'shop_domain', 'shopify_updated_at', 'webhook_triggered_at', 'created_at', 'archive', 'archived_at',
+    ]
@@ -0,0 +1,153 @@
+from datetime import timedelta
+import numpy as np
+import pandas as pd
+from django.db import connections
+from django.db.models import FloatField
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
+from .models import OrderLineItem
+
+LINE_ITEM_COLUMNS = ('order_id', 'sku', 'product_id', 'title', 'quantity', 'price', 'total_discount')
+
+
+def line_item_frame(since=None, until=None, shop_domain=None):
+    """
+    Load line items into a DataFrame, one row per line item.
+
+    The columns are selected with a values_list query whose SQL is run on a
+    plain cursor, so rows come straight from the driver without Django's
+    per-row conversion; prices are cast to floats in SQL. A revenue column
+    (price * quantity - total_discount) is added.
+
+    Args:
+        since (datetime): Orders placed at or after this moment
+        until (datetime): Orders placed before this moment
+        shop_domain (str): Only orders from this shop
+
+    Returns:
+        pandas.DataFrame: Columns LINE_ITEM_COLUMNS plus revenue
+    """
+    queryset = OrderLineItem.objects.order_by()
+    if since or until:
+        queryset = queryset.annotate(placed=Coalesce('order__placed_at', 'order__created_at'))
+        if since:
+            queryset = queryset.filter(placed__gte=since)
+        if until:
+            queryset = queryset.filter(placed__lt=until)
+    if shop_domain:
+        queryset = queryset.filter(order__shop_domain=shop_domain.strip().lower())
+    sql, params = queryset.values_list(
+        'order_id', 'sku', 'product_id', 'title', 'quantity',
+        Cast('price', FloatField()), Cast('total_discount', FloatField()),
+    ).query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    frame = pd.DataFrame.from_records(rows, columns=LINE_ITEM_COLUMNS)
+    frame = frame.astype({
+        'order_id': np.int64, 'quantity': np.int64, 'price': np.float64, 'total_discount': np.float64,
+    })
+    frame['revenue'] = frame['price'] * frame['quantity'] - frame['total_discount']
+    return frame
+
+
+def _records(frame):
+    """DataFrame rows as dicts of plain Python values, money rounded to cents."""
+    frame = frame.round({'revenue': 2, 'share': 4, 'units_per_day': 3})
+    return [
+        {key: value.item() if isinstance(value, np.generic) else value for key, value in row.items()}
+        for row in frame.to_dict('records')
+    ]
+
+
+def sku_velocity(days=30, shop_domain=None, limit=50, now=None):
+    """
+    Units sold per day for each SKU over the last `days` days, best sellers first.
+
+    Args:
+        days (int): Length of the window
+        shop_domain (str): Only orders from this shop
+        limit (int): Most SKUs returned
+        now (datetime): End of the window (default: now)
+
+    Returns:
+        list: Dicts with sku, units, orders, revenue and units_per_day
+    """
+    now = now or timezone.now()
+    frame = line_item_frame(since=now - timedelta(days=days), until=now, shop_domain=shop_domain)
+    frame = frame[frame['sku'] != '']
+    if frame.empty:
+        return []
+    summary = frame.groupby('sku', sort=False).agg(
+        units=('quantity', 'sum'), orders=('order_id', 'nunique'), revenue=('revenue', 'sum'),
+    )
+    summary['units_per_day'] = summary['units'] / days
+    summary = summary.sort_values(['units', 'revenue'], ascending=False).head(limit)
+    return _records(summary.reset_index())
+
+
+def revenue_by_product(since=None, until=None, shop_domain=None, limit=50):
+    """
+    Revenue and units per product, highest revenue first.
+
+    Line items are grouped on product_id; custom items without one are
+    grouped on their title.
+
+    Args:
+        since (datetime): Orders placed at or after this moment
+        until (datetime): Orders placed before this moment
+        shop_domain (str): Only orders from this shop
+        limit (int): Most products returned
+
+    Returns:
+        list: Dicts with product_id, title, units, revenue and share (of all
+        revenue in the period)
+    """
+    frame = line_item_frame(since=since, until=until, shop_domain=shop_domain)
+    if frame.empty:
+        return []
+    frame['product'] = np.where(frame['product_id'] != '', frame['product_id'], 'title:' + frame['title'])
+    summary = frame.groupby('product', sort=False).agg(
+        product_id=('product_id', 'first'), title=('title', 'first'),
+        units=('quantity', 'sum'), revenue=('revenue', 'sum'),
+    )
+    total = summary['revenue'].sum()
+    summary['share'] = summary['revenue'] / total if total else 0.0
+    summary = summary.sort_values('revenue', ascending=False).head(limit)
+    return _records(summary.reset_index(drop=True))
+
+
+def basket_stats(since=None, until=None, shop_domain=None):
+    """
+    Basket size and value statistics over orders with line items.
+
+    Args:
+        since (datetime): Orders placed at or after this moment
+        until (datetime): Orders placed before this moment
+        shop_domain (str): Only orders from this shop
+
+    Returns:
+        dict: orders, mean/median line items per order, mean/p90 units per
+        order, mean basket value and the share of orders with more than one
+        line item
+    """
+    frame = line_item_frame(since=since, until=until, shop_domain=shop_domain)
+    if frame.empty:
+        return {
+            'orders': 0, 'mean_items': 0.0, 'median_items': 0.0, 'mean_units': 0.0,
+            'p90_units': 0.0, 'mean_value': 0.0, 'multi_item_share': 0.0,
+        }
+    baskets = frame.groupby('order_id', sort=False).agg(
+        items=('quantity', 'size'), units=('quantity', 'sum'), value=('revenue', 'sum'),
+    )
+    items = baskets['items'].to_numpy()
+    units = baskets['units'].to_numpy()
+    return {
+        'orders': len(baskets),
+        'mean_items': round(float(items.mean()), 3),
+        'median_items': float(np.median(items)),
+        'mean_units': round(float(units.mean()), 3),
+        'p90_units': round(float(np.percentile(units, 90)), 3),
+        'mean_value': round(float(baskets['value'].mean()), 2),
+        'multi_item_share': round(float((items > 1).mean()), 4),
+    }
@@ -1,5 +1,26 @@
 from django.apps import AppConfig
 
+
+def _retire_cached_orders(sender, **kwargs):
+    # Imported on the first write rather than at startup, so webhook-only
+    # processes never load the dashboard modules just to boot. The live feed
+    # (pubsub) is connected by the dashboard views that import it.
+    from .dashboard_cache import bump_data_version
+    from .queries import invalidate_order_caches
+    bump_data_version()
+    invalidate_order_caches()
+
+
 class ShopifywebhookConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'shopifywebhook'
+
+    def ready(self):
+        # Keep shared dashboard caches in step with order writes from any process
+        from .signals import orders_deleted, orders_saved
+        orders_saved.connect(_retire_cached_orders, dispatch_uid='shopifywebhook.retire_cached_orders')
+        orders_deleted.connect(_retire_cached_orders, dispatch_uid='shopifywebhook.retire_cached_orders')
+
+        # Preload and pre-encode webhook signing keys so requests never read them
+        from .shop_secrets import shop_secrets
+        shop_secrets.reload()
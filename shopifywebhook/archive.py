@@ -0,0 +1,204 @@
+import gzip
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import timezone as dt_timezone
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+from .instrumentation import log_event
+from .models import ArchivedOrder, ShopifyWebhookOrder
+
+DEFAULT_CHUNK_SIZE = 500
+
+# Order columns written to each archive record, ahead of the payload
+ARCHIVE_COLUMNS = (
+    'order_id', 'order_number', 'shop_domain', 'placed_at', 'created_at', 'email', 'total_price',
+    'currency', 'financial_status', 'customer_id', 'line_item_count', 'shopify_updated_at',
+    'webhook_triggered_at',
+)
+
+
+@dataclass
+class ArchiveResult:
+    """What an archive run moved, and where."""
+    orders: int = 0
+    chunks: int = 0
+    bytes_written: int = 0
+    files: set = field(default_factory=set)
+    seconds: float = 0.0
+
+
+def archive_name(moment):
+    """Archive file for orders stored in moment's (UTC) month, e.g. orders-2024-01.ndjson.gz."""
+    return f"orders-{moment.astimezone(dt_timezone.utc):%Y-%m}.ndjson.gz"
+
+
+def archive_queryset(cutoff, using=DEFAULT_DB_ALIAS):
+    """Orders stored before cutoff, oldest first, which is the (created_at, id) index read backwards."""
+    return ShopifyWebhookOrder.objects.using(using).filter(created_at__lt=cutoff).order_by('created_at', 'id')
+
+
+def _record(order):
+    record = {}
+    for name in ARCHIVE_COLUMNS:
+        value = getattr(order, name)
+        record[name] = value.isoformat() if hasattr(value, 'isoformat') else value
+    record['total_price'] = str(order.total_price)
+    record['raw_data'] = order.raw_data
+    return record
+
+
+def _append(path, lines):
+    """
+    Append lines to a gzip file as a new gzip member and sync it to disk.
+
+    gzip readers (gzip.open, zcat) read concatenated members as one stream,
+    so a month's file can grow a chunk at a time without rewriting it.
+    """
+    data = gzip.compress(''.join(lines).encode('utf-8'))
+    with open(path, 'ab') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    return len(data)
+
+
+def archive_chunk(cutoff, chunk_size=DEFAULT_CHUNK_SIZE, directory=None, using=DEFAULT_DB_ALIAS):
+    """
+    Move the oldest chunk of orders stored before cutoff into the archive.
+
+    In one transaction: lock the orders against concurrent webhooks, append
+    them (with their payloads) to the monthly archive files, write a
+    tombstone per order and delete them through the rollup-aware delete,
+    which also removes their payloads, search tokens and line items. Locks
+    are held for this one chunk only.
+
+    The archive is written before the transaction commits, so a failure
+    after the write leaves the orders in the table to be archived again
+    next time; readers take the last record of an order.
+
+    Args:
+        cutoff (datetime): Orders stored before this moment are archived
+        chunk_size (int): Most orders moved
+        directory (str): Where the archive files go (default SHOPIFY_ARCHIVE_DIR)
+        using (str): Database alias
+
+    Returns:
+        tuple: (orders moved, bytes written, set of archive file names)
+    """
+    directory = directory or settings.SHOPIFY_ARCHIVE_DIR
+    os.makedirs(directory, exist_ok=True)
+    with transaction.atomic(using=using):
+        queryset = archive_queryset(cutoff, using)
+        queryset._lock_for_write(connections[using])
+        # of=self: the payload join is an outer join, which PostgreSQL cannot lock
+        orders = list(queryset.select_for_update(of=('self',)).select_related('payload')[:chunk_size])
+        if not orders:
+            return 0, 0, set()
+
+        by_file = {}
+        archives = {}
+        for order in orders:
+            name = archives[order.order_id] = archive_name(order.created_at)
+            by_file.setdefault(name, []).append(json.dumps(_record(order), separators=(',', ':'), default=str) + '\n')
+        written = sum(_append(os.path.join(directory, name), lines) for name, lines in by_file.items())
+        ArchivedOrder.objects.using(using).bulk_create([
+            ArchivedOrder(
+                order_id=order.order_id,
+                shop_domain=order.shop_domain,
+                shopify_updated_at=order.shopify_updated_at,
+                webhook_triggered_at=order.webhook_triggered_at,
+                created_at=order.created_at,
+                archive=archives[order.order_id],
+            )
+            for order in orders
+        ])
+        ShopifyWebhookOrder.objects.using(using).filter(pk__in=[order.pk for order in orders]).delete()
+    return len(orders), written, set(by_file)
+
+
+def archive_orders(older_than, chunk_size=DEFAULT_CHUNK_SIZE, directory=None, pause=0.0,
+                   limit=None, using=DEFAULT_DB_ALIAS, on_chunk=None):
+    """
+    Archive every order stored more than older_than ago, a chunk at a time.
+
+    Args:
+        older_than (timedelta): Age past which orders are archived
+        chunk_size (int): Orders moved per transaction
+        directory (str): Where the archive files go (default SHOPIFY_ARCHIVE_DIR)
+        pause (float): Seconds to sleep between chunks, leaving the database
+            to webhooks
+        limit (int): Stop after about this many orders (default: all)
+        using (str): Database alias
+        on_chunk (callable): Called with the running ArchiveResult after each chunk
+
+    Returns:
+        ArchiveResult
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    cutoff = timezone.now() - older_than
+    result = ArchiveResult()
+    started = time.perf_counter()
+    while limit is None or result.orders < limit:
+        size = chunk_size if limit is None else min(chunk_size, limit - result.orders)
+        moved, written, files = archive_chunk(cutoff, size, directory, using)
+        if not moved:
+            break
+        result.orders += moved
+        result.chunks += 1
+        result.bytes_written += written
+        result.files |= files
+        result.seconds = time.perf_counter() - started
+        if on_chunk:
+            on_chunk(result)
+        if moved < size:
+            break
+        if pause:
+            time.sleep(pause)
+    result.seconds = time.perf_counter() - started
+    if result.orders:
+        log_event(
+            logging.INFO, 'orders.archived', orders=result.orders, chunks=result.chunks,
+            bytes=result.bytes_written, files=sorted(result.files), duration_ms=round(result.seconds * 1000, 2),
+        )
+    return result
+
+
+def iter_archive(name, directory=None):
+    """Yield the records of one archive file, in the order they were archived."""
+    with gzip.open(os.path.join(directory or settings.SHOPIFY_ARCHIVE_DIR, name), 'rt', encoding='utf-8') as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def find_archived_order(order_id, directory=None, using=DEFAULT_DB_ALIAS):
+    """
+    Look up an archived order by its Shopify id.
+
+    The tombstone names the archive file, so only that month is scanned, and
+    lines are parsed only if they contain the id.
+
+    Args:
+        order_id (str): Shopify order id
+        directory (str): Where the archive files are (default SHOPIFY_ARCHIVE_DIR)
+        using (str): Database alias
+
+    Returns:
+        dict: The archived record (order columns plus raw_data), or None if
+        the order is not archived
+    """
+    tombstone = ArchivedOrder.objects.using(using).filter(order_id=str(order_id)).first()
+    if tombstone is None:
+        return None
+    needle = '"order_id":' + json.dumps(tombstone.order_id) + ','
+    found = None
+    with gzip.open(os.path.join(directory or settings.SHOPIFY_ARCHIVE_DIR, tombstone.archive), 'rt', encoding='utf-8') as f:
+        for line in f:
+            if needle in line:
+                # An interrupted run can archive an order twice; the last copy wins
+                found = json.loads(line)
+    return found
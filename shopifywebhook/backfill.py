@@ -0,0 +1,419 @@
+import gzip
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from urllib.parse import urlencode
+import requests
+from requests.adapters import HTTPAdapter
+from django.db import reset_queries
+from .instrumentation import log_event
+from .processing import validate_order_data, save_orders
+
+# Largest page the REST Admin API serves
+MAX_PAGE_SIZE = 250
+
+
+@dataclass
+class BackfillResult:
+    """Counts and timing for one backfill run."""
+    pages: int = 0
+    fetched: int = 0
+    saved: int = 0
+    stale: int = 0
+    invalid: int = 0
+    seconds: float = 0.0
+
+    @property
+    def throughput(self):
+        """Orders read per second."""
+        return self.fetched / self.seconds if self.seconds else 0.0
+
+
+class Checkpoint:
+    """
+    Backfill progress kept in a small JSON file, replaced atomically after every
+    committed batch so an interrupted run resumes where it stopped.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.state = {}
+        if path and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.state = json.load(f)
+
+    def save(self):
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.path)
+
+
+class RateLimiter:
+    """
+    Token bucket shared by every fetcher thread, mirroring Shopify's leaky
+    bucket: `burst` requests at once, refilled at `rate` per second.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if now >= self._blocked_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = max(self._blocked_until - now, (1 - self._tokens) / self.rate)
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Hold every thread back, e.g. after a 429 or a nearly full bucket."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+
+
+class AdminApiClient:
+    """
+    Minimal REST Admin API client for paging through orders.
+
+    One requests session with a connection pool sized for the fetcher threads
+    is shared by all of them. The ShopifyAPI package keeps its session in
+    global state, so it cannot serve several concurrent fetchers.
+    """
+
+    def __init__(self, shop_domain, access_token, api_version, base_url=None,
+                 rate=2.0, burst=40, pool_size=4, timeout=30.0, max_retries=5):
+        self.shop_domain = (shop_domain or '').strip().lower()
+        self.base_url = (base_url or f"https://{shop_domain}").rstrip('/')
+        self.api_version = api_version
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.limiter = RateLimiter(rate, burst)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'X-Shopify-Access-Token': access_token or '',
+            'Accept': 'application/json',
+        })
+
+    def orders_url(self, **params):
+        """URL of the first page of an orders query."""
+        return f"{self.base_url}/admin/api/{self.api_version}/orders.json?{urlencode(params)}"
+
+    def _respect_call_limit(self, response):
+        # X-Shopify-Shop-Api-Call-Limit: "used/size"; back off before the bucket is full
+        header = response.headers.get('X-Shopify-Shop-Api-Call-Limit', '')
+        try:
+            used, size = (int(part) for part in header.split('/'))
+        except ValueError:
+            return
+        if used >= size * 0.8:
+            self.limiter.pause((used - size * 0.5) / self.limiter.rate)
+
+    def get_page(self, url):
+        """
+        Fetch one page of orders.
+
+        Returns:
+            tuple: (orders, next_url) where next_url is None on the last page
+
+        Raises:
+            requests.HTTPError: If Shopify keeps failing after max_retries
+        """
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            response = self.session.get(url, timeout=self.timeout)
+            if response.status_code == 429 or response.status_code >= 500:
+                if attempt == self.max_retries:
+                    response.raise_for_status()
+                try:
+                    retry_after = float(response.headers.get('Retry-After', ''))
+                except ValueError:
+                    retry_after = min(2 ** attempt, 30)
+                log_event(logging.WARNING, 'backfill.throttled', status=response.status_code,
+                          retry_after=retry_after, attempt=attempt + 1)
+                self.limiter.pause(retry_after)
+                continue
+            response.raise_for_status()
+            self._respect_call_limit(response)
+            return response.json().get('orders', []), response.links.get('next', {}).get('url')
+
+
+def time_windows(since, until, count):
+    """
+    Split [since, until] into count equal (start, end) slices.
+
+    Shopify's created_at_max is inclusive, so an order created exactly on a
+    boundary is read by both neighbouring windows; the second upsert is a
+    stale no-op.
+    """
+    step = (until - since) / count
+    return [(since + step * i, since + step * (i + 1) if i < count - 1 else until) for i in range(count)]
+
+
+def iter_api_pages(client, windows, concurrency=4, page_size=MAX_PAGE_SIZE):
+    """
+    Page through orders in several created_at windows concurrently.
+
+    Cursor pagination is sequential within a query, so parallelism comes from
+    fetching one window per thread. Pages go through a bounded queue, so at
+    most a few pages are in memory however many orders the shop has.
+
+    Args:
+        client (AdminApiClient): The API client
+        windows (dict): window key -> {'start', 'end', 'next_url', 'done'} as
+            stored in the checkpoint; 'next_url' resumes a partly read window
+        concurrency (int): Windows fetched at the same time
+        page_size (int): Orders per page
+
+    Yields:
+        tuple: (window_key, orders, next_url), next_url None on a window's last page
+    """
+    pending = [(key, window) for key, window in windows.items() if not window.get('done')]
+    if not pending:
+        return
+    pages = queue.Queue(maxsize=concurrency * 2)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def fetch_window(key, window):
+        try:
+            url = window.get('next_url') or client.orders_url(
+                status='any', limit=page_size, order='created_at asc',
+                created_at_min=window['start'], created_at_max=window['end'],
+            )
+            while url and not stop.is_set():
+                orders, url = client.get_page(url)
+                if not put((key, orders, url)):
+                    return
+        except Exception as e:
+            put((key, e, None))
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='backfill') as pool:
+        for key, window in pending:
+            pool.submit(fetch_window, key, window)
+        remaining = len(pending)
+        try:
+            while remaining:
+                key, orders, next_url = pages.get()
+                if isinstance(orders, Exception):
+                    raise orders
+                if next_url is None:
+                    remaining -= 1
+                yield key, orders, next_url
+        finally:
+            stop.set()
+
+
+def _open_export(path):
+    return gzip.open(path, 'rb') if str(path).endswith('.gz') else open(path, 'rb')
+
+
+def _gid_to_id(value):
+    # gid://shopify/Order/123 -> 123
+    return str(value).rsplit('/', 1)[-1] if value else value
+
+
+def normalize_bulk_order(record):
+    """
+    Map a GraphQL bulk export order onto the REST webhook payload shape that
+    validate_order_data expects. REST-shaped records pass through unchanged.
+    """
+    if 'order_number' in record or 'totalPriceSet' not in record and 'totalPrice' not in record:
+        return record
+    total = record.get('totalPriceSet', {}).get('shopMoney', {}).get('amount', record.get('totalPrice'))
+    customer = record.get('customer') or {}
+    return {
+        'id': _gid_to_id(record.get('legacyResourceId') or record.get('id')),
+        'order_number': str(record.get('name') or '').lstrip('#'),
+        'email': record.get('email'),
+        'total_price': total,
+        'currency': record.get('currencyCode', ''),
+        'financial_status': str(record.get('displayFinancialStatus') or '').lower(),
+        'created_at': record.get('createdAt'),
+        'updated_at': record.get('updatedAt'),
+        'customer': {'id': _gid_to_id(customer.get('id'))} if customer else None,
+        'line_items': record.get('line_items', []),
+    }
+
+
+def iter_bulk_export(path, offset=0):
+    """
+    Stream orders from a bulk operation JSONL export.
+
+    Nested objects (line items) arrive as their own lines carrying __parentId
+    right after their order and are folded back into its line_items.
+
+    Args:
+        path (str): Export file, optionally gzip-compressed (.gz)
+        offset (int): Byte offset to resume from, as yielded earlier
+
+    Yields:
+        tuple: (order, offset) where offset is where reading resumes after this order
+    """
+    with _open_export(path) as f:
+        f.seek(offset)
+        current = None
+        while True:
+            line_start = f.tell()
+            line = f.readline()
+            if not line:
+                break
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            parent_id = record.pop('__parentId', None)
+            if parent_id is not None:
+                if current is not None and parent_id == current.get('id'):
+                    current.setdefault('line_items', []).append(record)
+                continue
+            if current is not None:
+                yield normalize_bulk_order(current), line_start
+            current = record
+        if current is not None:
+            yield normalize_bulk_order(current), f.tell()
+
+
+def _save_batch(payloads, result, shop_domain=''):
+    """Validate and upsert one batch of raw order payloads."""
+    valid = []
+    for payload in payloads:
+        try:
+            order_data = validate_order_data(payload)
+            order_data['shop_domain'] = shop_domain
+            valid.append(order_data)
+        except ValueError as e:
+            result.invalid += 1
+            log_event(logging.WARNING, 'backfill.invalid_order', error=str(e), order_id=payload.get('id'))
+    result.fetched += len(payloads)
+    if valid:
+        saved = save_orders(valid)
+        stale = sum(1 for order in saved if order.stale)
+        result.stale += stale
+        result.saved += len(saved) - stale
+    # With DEBUG on Django keeps every query; don't let a long import accumulate them
+    reset_queries()
+
+
+def backfill_from_api(client, since, until, checkpoint, windows=4, concurrency=4,
+                      page_size=MAX_PAGE_SIZE, progress=None):
+    """
+    Import every order created between since and until from the Admin API.
+
+    Each page is upserted as one batch and then recorded in the checkpoint.
+
+    Args:
+        client (AdminApiClient): The API client
+        since (datetime): Earliest created_at
+        until (datetime): Latest created_at
+        checkpoint (Checkpoint): Progress store; resumed if it matches the range
+        windows (int): Number of created_at slices to fetch in parallel
+        concurrency (int): Fetcher threads
+        page_size (int): Orders per page
+        progress (callable): Called with the BackfillResult after every page
+
+    Returns:
+        BackfillResult: Counts and timing
+
+    Raises:
+        ValueError: If the checkpoint belongs to a different range
+    """
+    key = {'mode': 'api', 'since': since.isoformat(), 'until': until.isoformat(), 'windows': windows}
+    if checkpoint.state:
+        if {name: checkpoint.state.get(name) for name in key} != key:
+            raise ValueError("Checkpoint was written for a different backfill; remove it or pass another path")
+    else:
+        checkpoint.state = dict(key, progress={
+            str(i): {'start': start.isoformat(), 'end': end.isoformat(), 'next_url': None, 'done': False}
+            for i, (start, end) in enumerate(time_windows(since, until, windows))
+        })
+    state = checkpoint.state['progress']
+
+    result = BackfillResult()
+    started = time.perf_counter()
+    for window_key, orders, next_url in iter_api_pages(client, state, concurrency, page_size):
+        _save_batch(orders, result, client.shop_domain)
+        result.pages += 1
+        state[window_key]['next_url'] = next_url
+        state[window_key]['done'] = next_url is None
+        checkpoint.save()
+        result.seconds = time.perf_counter() - started
+        if progress:
+            progress(result)
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def backfill_from_file(path, checkpoint, batch_size=500, progress=None, shop_domain=''):
+    """
+    Import orders from a bulk operation JSONL export in batches.
+
+    Args:
+        path (str): Export file, optionally .gz
+        checkpoint (Checkpoint): Progress store; resumed if it is for this file
+        batch_size (int): Orders per upsert
+        progress (callable): Called with the BackfillResult after every batch
+        shop_domain (str): Shop the export was taken from
+
+    Returns:
+        BackfillResult: Counts and timing
+
+    Raises:
+        ValueError: If the checkpoint belongs to a different file
+    """
+    if checkpoint.state and checkpoint.state.get('path') != str(path):
+        raise ValueError("Checkpoint was written for a different backfill; remove it or pass another path")
+    checkpoint.state.setdefault('mode', 'file')
+    checkpoint.state.setdefault('path', str(path))
+    offset = checkpoint.state.get('offset', 0)
+
+    result = BackfillResult()
+    started = time.perf_counter()
+
+    def flush(batch, offset):
+        _save_batch(batch, result, shop_domain)
+        result.pages += 1
+        checkpoint.state['offset'] = offset
+        checkpoint.save()
+        result.seconds = time.perf_counter() - started
+        if progress:
+            progress(result)
+
+    batch = []
+    for order, offset in iter_bulk_export(path, offset):
+        batch.append(order)
+        if len(batch) >= batch_size:
+            flush(batch, offset)
+            batch = []
+    if batch:
+        flush(batch, offset)
+    result.seconds = time.perf_counter() - started
+    return result
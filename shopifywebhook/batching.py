@@ -0,0 +1,99 @@
+import copy
+import threading
+from concurrent.futures import Future
+from .models import ShopifyWebhookOrder, ShopifyWebhookOrderQuerySet, _is_older
+
+
+class _Batch:
+    def __init__(self):
+        self.entries = []
+        self.full = threading.Event()
+
+
+class OrderBatcher:
+    """
+    Collect orders from concurrent request threads and save them together.
+
+    The first thread to submit into an empty batch becomes its leader: it waits
+    for the batching window (or until the batch is full), takes the batch and
+    saves it with one bulk_upsert on its own database connection. Every other
+    submitter just waits for the leader's result. No background threads are
+    involved, so this only helps when the server runs several request threads
+    per process.
+    """
+
+    def __init__(self, window_seconds, max_batch_size=100, save_many=None):
+        self.window_seconds = window_seconds
+        self.max_batch_size = max_batch_size
+        # Any callable with bulk_upsert's contract: order dicts in, saved orders out
+        self.save_many = save_many or ShopifyWebhookOrder.objects.bulk_upsert
+        self._lock = threading.Lock()
+        self._current = None
+
+    def submit(self, order_data):
+        """
+        Queue validated order data for the next flush and wait for it.
+
+        Args:
+            order_data (dict): Output of validate_order_data
+
+        Returns:
+            ShopifyWebhookOrder: The saved order. If a newer version of the
+            same order was submitted into the same batch, this delivery was
+            not written: the result has stale=True and no pk.
+
+        Raises:
+            Exception: Whatever the batch's bulk_upsert raised
+        """
+        future = Future()
+        with self._lock:
+            batch = self._current
+            leader = batch is None
+            if leader:
+                batch = self._current = _Batch()
+            batch.entries.append((order_data, future))
+            if len(batch.entries) >= self.max_batch_size:
+                self._current = None
+                batch.full.set()
+
+        if leader:
+            batch.full.wait(self.window_seconds)
+            with self._lock:
+                if self._current is batch:
+                    self._current = None
+            self._flush(batch.entries)
+
+        return future.result()
+
+    def _flush(self, entries):
+        try:
+            saved = self.save_many(order_data for order_data, _ in entries)
+        except Exception as e:
+            for _, future in entries:
+                future.set_exception(e)
+            return
+
+        # save_many keeps one version per order_id, by the same rule
+        latest = {}
+        for order_data, _ in entries:
+            current = latest.get(order_data['order_id'])
+            if current is None or not _is_older(order_data, current):
+                latest[order_data['order_id']] = order_data
+
+        by_order_id = {order.order_id: order for order in saved}
+        for order_data, future in entries:
+            order = by_order_id[order_data['order_id']]
+            if order_data is not latest[order_data['order_id']]:
+                order = _superseded(order, order_data)
+            future.set_result(order)
+
+
+def _superseded(saved, order_data):
+    """Stale result for a delivery that lost to a newer one of its order in the same batch."""
+    order = copy.copy(saved)
+    for name in ShopifyWebhookOrderQuerySet.UPSERT_FIELDS:
+        if name in order_data:
+            setattr(order, name, order_data[name])
+    order.pk = None
+    order.stale = True
+    return order
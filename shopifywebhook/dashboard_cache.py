@@ -0,0 +1,91 @@
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+from django.conf import settings
+from django.core.cache import cache
+
+DATA_VERSION_KEY = 'shopifywebhook:data_version'
+
+# One thread per process rebuilds a missing entry; the others wait for that key
+# only and reuse it. key -> [lock, threads holding or waiting for it]
+_build_locks = {}
+_build_locks_guard = threading.Lock()
+
+
+def data_version():
+    """
+    Return the current order data version.
+
+    Every cached dashboard entry is keyed by it, so bumping the version
+    retires all of them at once without deleting anything.
+    """
+    version = cache.get(DATA_VERSION_KEY)
+    if version is None:
+        # Start from the clock so a version lost to eviction or a restart is
+        # never reused for different data
+        cache.add(DATA_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(DATA_VERSION_KEY)
+    return version
+
+
+def bump_data_version():
+    """Mark the order data as changed; the next dashboard view renders afresh."""
+    try:
+        return cache.incr(DATA_VERSION_KEY)
+    except ValueError:
+        # Evicted since it was last read
+        cache.add(DATA_VERSION_KEY, time.time_ns(), None)
+        return cache.get(DATA_VERSION_KEY)
+
+
+@contextmanager
+def _building(key):
+    """Hold the build lock for one cache key, dropping it once no thread needs it."""
+    with _build_locks_guard:
+        entry = _build_locks.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _build_locks_guard:
+            entry[1] -= 1
+            if not entry[1]:
+                del _build_locks[key]
+
+
+def cached(name, build, *parts):
+    """
+    Return a dashboard value from the cache, building it on a miss.
+
+    Entries are keyed by name, parts and the data version, and live for
+    SHOPIFY_DASHBOARD_CACHE_TTL seconds. That bounds how stale they can be
+    when another process writes orders and the cache backend is not shared;
+    writes in this process, or any process with a shared file cache, are
+    seen on the next request. A TTL of 0 turns caching off.
+
+    Args:
+        name (str): What is cached, e.g. 'order_cards'
+        build (callable): Computes the value; exceptions propagate and
+            nothing is cached
+        *parts: Anything else the value depends on. Each distinct value is
+            another cache entry, so never pass raw request input here
+
+    Returns:
+        The cached or freshly built value (None is a valid value)
+    """
+    ttl = settings.SHOPIFY_DASHBOARD_CACHE_TTL
+    if ttl <= 0:
+        return build()
+    digest = hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest()
+    key = f"shopifywebhook:dashboard:{data_version()}:{name}:{digest}"
+    entry = cache.get(key)
+    if entry is None:
+        with _building(key):
+            entry = cache.get(key)
+            if entry is None:
+                # Wrapped so a legitimately empty value is still a hit
+                entry = (build(),)
+                cache.set(key, entry, ttl)
+    return entry[0]
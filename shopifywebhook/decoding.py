@@ -0,0 +1,89 @@
+import importlib.util
+import json
+from django.conf import settings
+
+
+class PayloadDecodeError(ValueError):
+    """Raised when a webhook body is not valid JSON, whichever decoder is used."""
+
+
+def _stdlib_backend():
+    def loads(body):
+        try:
+            return json.loads(body)
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            raise PayloadDecodeError(str(e))
+    return loads
+
+
+def _orjson_backend():
+    import orjson
+
+    def loads(body):
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError as e:
+            raise PayloadDecodeError(str(e))
+    return loads
+
+
+def _msgspec_backend():
+    import msgspec
+    decoder = msgspec.json.Decoder()
+
+    def loads(body):
+        try:
+            return decoder.decode(body)
+        except msgspec.DecodeError as e:
+            raise PayloadDecodeError(str(e))
+    return loads
+
+
+# Backend name -> (module it needs, factory building its decode function).
+# Optional modules are imported only when their backend is picked, so a
+# process decoding with orjson never pays for importing msgspec.
+_BACKENDS = {
+    'orjson': ('orjson', _orjson_backend),
+    'msgspec': ('msgspec', _msgspec_backend),
+    'json': ('json', _stdlib_backend),
+}
+
+# Fastest first; 'auto' picks the first one that is installed
+_AUTO_ORDER = ('orjson', 'msgspec', 'json')
+
+
+def available_backends():
+    """Names of the installed backends, fastest first, found without importing them."""
+    return [name for name in _AUTO_ORDER if importlib.util.find_spec(_BACKENDS[name][0]) is not None]
+
+
+def get_decoder(name=None):
+    """
+    Return the JSON decode function for a backend.
+
+    Args:
+        name (str): 'auto', 'orjson', 'msgspec' or 'json'; defaults to the
+            SHOPIFY_JSON_DECODER setting
+
+    Returns:
+        callable: Takes bytes or str, returns the decoded object and raises
+        PayloadDecodeError on malformed input
+
+    Raises:
+        ValueError: If the requested backend is not installed
+    """
+    name = name or getattr(settings, 'SHOPIFY_JSON_DECODER', 'auto')
+    installed = available_backends()
+    if name == 'auto':
+        name = installed[0]
+    if name not in installed:
+        raise ValueError(f"JSON decoder {name!r} is not available (installed: {', '.join(installed)})")
+    return _BACKENDS[name][1]()
+
+
+def loads(body):
+    """Decode a webhook body with the configured backend."""
+    return _loads(body)
+
+
+_loads = get_decoder()
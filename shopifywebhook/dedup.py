@@ -0,0 +1,133 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from .instrumentation import REGISTRY
+from .models import WebhookDelivery
+
+
+class DeliveryCache:
+    """
+    Bounded LRU of recently seen webhook ids with a per-entry TTL.
+    """
+
+    def __init__(self, max_size=10000, ttl_seconds=48 * 3600):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, webhook_id):
+        with self._lock:
+            expires_at = self._entries.get(webhook_id)
+            if expires_at is None:
+                return False
+            if expires_at < time.monotonic():
+                del self._entries[webhook_id]
+                return False
+            self._entries.move_to_end(webhook_id)
+            return True
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, webhook_id):
+        with self._lock:
+            self._entries[webhook_id] = time.monotonic() + self.ttl_seconds
+            self._entries.move_to_end(webhook_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_cache = DeliveryCache(
+    max_size=getattr(settings, 'SHOPIFY_WEBHOOK_DEDUP_CACHE_SIZE', 10000),
+    ttl_seconds=getattr(settings, 'SHOPIFY_WEBHOOK_DEDUP_TTL_SECONDS', 48 * 3600),
+)
+DEDUP_LOOKUPS = REGISTRY.counter(
+    'shopify_webhook_dedup_lookups_total',
+    'Duplicate delivery lookups by result (cache_hit, db_hit, miss)',
+    ['result'],
+)
+REGISTRY.gauge(
+    'shopify_webhook_dedup_cache_size',
+    'Webhook ids held in the in-process duplicate cache',
+    lambda: len(_cache),
+)
+
+
+def is_duplicate(webhook_id):
+    """
+    Check whether a delivery with this X-Shopify-Webhook-Id was already accepted.
+
+    The in-process cache answers most retries; otherwise the persisted table is
+    checked so duplicates are also caught across processes and restarts. Only
+    call this for verified requests: the answer tells the caller whether the
+    id was delivered, and a miss costs a query.
+
+    Args:
+        webhook_id (str): The X-Shopify-Webhook-Id header value
+
+    Returns:
+        bool: True if the delivery has been seen within the TTL
+    """
+    if not webhook_id:
+        return False
+    if webhook_id in _cache:
+        DEDUP_LOOKUPS.inc(result='cache_hit')
+        return True
+    cutoff = timezone.now() - timedelta(seconds=_cache.ttl_seconds)
+    if WebhookDelivery.objects.filter(webhook_id=webhook_id, seen_at__gte=cutoff).exists():
+        _cache.add(webhook_id)
+        DEDUP_LOOKUPS.inc(result='db_hit')
+        return True
+    DEDUP_LOOKUPS.inc(result='miss')
+    return False
+
+
+def mark_seen(webhook_id):
+    """
+    Record a delivery as accepted so later retries short-circuit.
+
+    Args:
+        webhook_id (str): The X-Shopify-Webhook-Id header value
+    """
+    if not webhook_id:
+        return
+    _cache.add(webhook_id)
+    WebhookDelivery.objects.bulk_create(
+        [WebhookDelivery(webhook_id=webhook_id, seen_at=timezone.now())],
+        update_conflicts=True,
+        unique_fields=['webhook_id'],
+        update_fields=['seen_at'],
+    )
+
+
+def expire_deliveries():
+    """
+    Delete persisted delivery ids older than the dedup TTL.
+
+    Run by the inbox drain worker and by drain_webhook_inbox --expire-deliveries,
+    never on the request path.
+
+    Returns:
+        int: Number of deleted rows
+    """
+    cutoff = timezone.now() - timedelta(seconds=_cache.ttl_seconds)
+    deleted, _ = WebhookDelivery.objects.filter(seen_at__lt=cutoff).delete()
+    return deleted
+
+
+def dedup_stats():
+    """Return duplicate-detection counters for this process."""
+    return {
+        'cache_hits': DEDUP_LOOKUPS.value(result='cache_hit'),
+        'db_hits': DEDUP_LOOKUPS.value(result='db_hit'),
+        'misses': DEDUP_LOOKUPS.value(result='miss'),
+        'cache_size': len(_cache),
+    }
@@ -0,0 +1,233 @@
+import csv
+import json
+import zlib
+from dataclasses import dataclass, field
+from datetime import datetime, time, timezone as dt_timezone
+from decimal import Decimal
+from asgiref.sync import sync_to_async
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from .models import ShopifyWebhookOrder
+
+FORMATS = ('csv', 'ndjson')
+
+# Order columns every export starts with
+ORDER_COLUMNS = (
+    'order_id', 'order_number', 'shop_domain', 'placed_at', 'created_at', 'email',
+    'total_price', 'currency', 'financial_status', 'customer_id', 'line_item_count',
+)
+
+# Line item fields added, one row per item, when line items are exploded
+LINE_ITEM_FIELDS = ('id', 'sku', 'title', 'quantity', 'price')
+
+DEFAULT_CHUNK_SIZE = 2000
+
+
+@dataclass
+class ExportSpec:
+    """
+    What to export.
+
+    Attributes:
+        fmt (str): 'csv' or 'ndjson'
+        since (datetime): Orders placed at or after this moment
+        until (datetime): Orders placed before this moment
+        shop_domain (str): Only orders from this shop
+        raw_fields (list): Dotted payload paths to add as columns, e.g.
+            customer.first_name or shipping_address.country_code
+        line_items (bool): One row per line item instead of one per order
+        compress (bool): gzip the output
+        chunk_size (int): Orders fetched per database round trip
+    """
+    fmt: str = 'csv'
+    since: datetime = None
+    until: datetime = None
+    shop_domain: str = None
+    raw_fields: list = field(default_factory=list)
+    line_items: bool = False
+    compress: bool = False
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+
+    def __post_init__(self):
+        if self.fmt not in FORMATS:
+            raise ValueError(f"Unknown export format {self.fmt!r}; expected one of {', '.join(FORMATS)}")
+        for path in self.raw_fields:
+            if not path or any(not part for part in path.split('.')):
+                raise ValueError(f"Invalid payload field {path!r}")
+        if self.chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+
+    @property
+    def needs_payload(self):
+        return bool(self.raw_fields or self.line_items)
+
+    @property
+    def columns(self):
+        columns = list(ORDER_COLUMNS) + list(self.raw_fields)
+        if self.line_items:
+            columns += [f"line_item.{name}" for name in LINE_ITEM_FIELDS]
+        return columns
+
+    @property
+    def filename(self):
+        return f"orders.{self.fmt}" + ('.gz' if self.compress else '')
+
+    @property
+    def content_type(self):
+        if self.compress:
+            return 'application/gzip'
+        return 'text/csv; charset=utf-8' if self.fmt == 'csv' else 'application/x-ndjson'
+
+
+def parse_moment(value):
+    """
+    Parse an export bound: an ISO 8601 date (midnight UTC) or date/time.
+
+    Args:
+        value (str): e.g. 2024-01-01 or 2024-01-01T12:00:00+02:00
+
+    Returns:
+        datetime: Timezone-aware moment, or None for an empty value
+
+    Raises:
+        ValueError: If the value is not a date or date/time
+    """
+    if not value:
+        return None
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Invalid date/time: {value!r} (use ISO 8601, e.g. 2024-01-01)")
+        moment = datetime.combine(day, time())
+    return moment if timezone.is_aware(moment) else timezone.make_aware(moment, dt_timezone.utc)
+
+
+def export_queryset(spec):
+    """Orders selected by spec, in primary key order so the stream is stable."""
+    queryset = ShopifyWebhookOrder.objects.order_by('id')
+    if spec.since or spec.until:
+        queryset = queryset.annotate(placed=Coalesce('placed_at', 'created_at'))
+        if spec.since:
+            queryset = queryset.filter(placed__gte=spec.since)
+        if spec.until:
+            queryset = queryset.filter(placed__lt=spec.until)
+    if spec.shop_domain:
+        queryset = queryset.filter(shop_domain=spec.shop_domain.strip().lower())
+    if spec.needs_payload:
+        queryset = queryset.select_related('payload')
+    else:
+        queryset = queryset.only(*ORDER_COLUMNS)
+    return queryset
+
+
+def _lookup(data, path):
+    for part in path.split('.'):
+        if isinstance(data, dict):
+            data = data.get(part)
+        elif isinstance(data, list) and part.isdigit() and int(part) < len(data):
+            data = data[int(part)]
+        else:
+            return None
+    return data
+
+
+def _value(value):
+    """Render a value for a flat row: timestamps as ISO 8601, containers as JSON."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, separators=(',', ':'))
+    return value
+
+
+def iter_rows(spec):
+    """
+    Yield one flat row (list, in spec.columns order) per order or line item.
+
+    Rows are read with .iterator(), so only chunk_size orders and their
+    payloads are in memory at once.
+    """
+    for order in export_queryset(spec).iterator(chunk_size=spec.chunk_size):
+        row = [_value(getattr(order, name)) for name in ORDER_COLUMNS]
+        if not spec.needs_payload:
+            yield row
+            continue
+        data = order.raw_data
+        row += [_value(_lookup(data, path)) for path in spec.raw_fields]
+        if not spec.line_items:
+            yield row
+            continue
+        items = [item for item in data.get('line_items') or () if isinstance(item, dict)]
+        if not items:
+            yield row + [None] * len(LINE_ITEM_FIELDS)
+        for item in items:
+            yield row + [_value(item.get(name)) for name in LINE_ITEM_FIELDS]
+
+
+class _Line:
+    """File-like object that hands back what csv.writer writes instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def iter_text(spec):
+    """Yield the export as text chunks of a few hundred rows."""
+    columns = spec.columns
+    buffer = []
+    if spec.fmt == 'csv':
+        writer = csv.writer(_Line())
+        buffer.append(writer.writerow(columns))
+        encode = writer.writerow
+    else:
+        def encode(row):
+            return json.dumps(dict(zip(columns, row)), separators=(',', ':'), default=str) + '\n'
+    for row in iter_rows(spec):
+        buffer.append(encode(row))
+        if len(buffer) >= 500:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
+
+
+def iter_export(spec):
+    """
+    Yield the export as bytes, gzip-compressed if spec.compress.
+
+    Memory stays flat whatever the number of orders: rows are fetched,
+    encoded and compressed a chunk at a time.
+    """
+    if not spec.compress:
+        for text in iter_text(spec):
+            yield text.encode('utf-8')
+        return
+    # wbits=31 writes a gzip header and trailer around the deflate stream
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for text in iter_text(spec):
+        chunk = compressor.compress(text.encode('utf-8'))
+        if chunk:
+            yield chunk
+    yield compressor.flush()
+
+
+async def aiter_export(spec):
+    """
+    Async variant of iter_export for the ASGI server.
+
+    Django's ASGI handler collects a sync iterator into a list before sending
+    anything, so each chunk is pulled through sync_to_async instead. Every
+    pull runs on the same thread, which the export's database cursor needs.
+    """
+    chunks = iter_export(spec)
+    done = object()
+    pull = sync_to_async(next, thread_sensitive=True)
+    try:
+        while (chunk := await pull(chunks, done)) is not done:
+            yield chunk
+    finally:
+        await sync_to_async(chunks.close, thread_sensitive=True)()
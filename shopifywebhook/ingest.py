@@ -0,0 +1,277 @@
+import logging
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from django.db import connection, transaction
+from django.db.models import Count
+from django.utils import timezone
+from .decoding import PayloadDecodeError, loads as decode_json
+from .instrumentation import REGISTRY, log_event
+from .models import WebhookInboxItem
+from .topics import get_handler
+
+# Shopify headers kept next to the raw body so the worker can reproduce the delivery
+STORED_HEADERS = (
+    'X-Shopify-Topic',
+    'X-Shopify-Shop-Domain',
+    'X-Shopify-Webhook-Id',
+    'X-Shopify-Hmac-Sha256',
+    'X-Shopify-Api-Version',
+    'X-Shopify-Triggered-At',
+)
+
+ENQUEUE_SECONDS = REGISTRY.histogram(
+    'shopify_webhook_enqueue_seconds',
+    'Time from request arrival until the delivery is stored in the inbox',
+)
+DRAINED = REGISTRY.counter(
+    'shopify_webhook_inbox_drained_total',
+    'Inbox deliveries handled by this drain worker, by result',
+    ['result'],
+)
+DRAIN_BATCH_SECONDS = REGISTRY.histogram(
+    'shopify_webhook_inbox_drain_batch_seconds',
+    'Time spent processing one inbox batch',
+)
+
+
+@dataclass
+class DrainResult:
+    """Outcome of a single drain_batch() call."""
+    claimed: int = 0
+    processed: int = 0
+    failed: int = 0
+    retried: int = 0
+    seconds: float = 0.0
+
+    @property
+    def throughput(self):
+        """Processed deliveries per second for this batch."""
+        return self.processed / self.seconds if self.seconds else 0.0
+
+
+def enqueue_delivery(body, headers, started_at=None, topic=None):
+    """
+    Append a verified webhook delivery to the durable inbox.
+
+    Args:
+        body (bytes): The raw request body
+        headers: Request headers (case-insensitive mapping)
+        started_at (float): perf_counter() value taken when the request arrived
+        topic (str): Topic to record; defaults to the X-Shopify-Topic header
+
+    Returns:
+        WebhookInboxItem: The stored inbox row
+    """
+    kept = {name: headers[name] for name in STORED_HEADERS if name in headers}
+    item = WebhookInboxItem.objects.create(
+        topic=topic or kept.get('X-Shopify-Topic', ''),
+        shop_domain=kept.get('X-Shopify-Shop-Domain', ''),
+        webhook_id=kept.get('X-Shopify-Webhook-Id', ''),
+        headers=kept,
+        body=bytes(body),
+    )
+    if started_at is not None:
+        ENQUEUE_SECONDS.observe(time.perf_counter() - started_at)
+    return item
+
+
+def _decode_item(item):
+    """
+    Parse and validate an inbox item with its topic's handler.
+
+    Returns:
+        tuple: (handler, cleaned_data)
+    """
+    # Items queued before topics were recorded all came from the orders/create endpoint
+    handler = get_handler(item.topic or 'orders/create')
+    if handler is None:
+        raise ValueError(f"No handler for topic {item.topic}")
+    try:
+        data = decode_json(bytes(item.body))
+    except PayloadDecodeError as e:
+        raise ValueError(f"Invalid JSON data: {str(e)}")
+    return handler, handler.clean(data, item.headers)
+
+
+def _save_items(valid):
+    """
+    Save decoded inbox items, each topic's items with one save_many call.
+
+    The group is saved in its own savepoint. If that fails it is split in
+    half and each half is tried again, so an item that can never be saved
+    costs about log2(batch size) extra savepoints and does not hold back or
+    fail the valid items next to it.
+
+    Args:
+        valid (list): (item, (handler, cleaned_data)) pairs
+
+    Returns:
+        dict: Exception by item pk for the items that could not be saved
+    """
+    try:
+        with transaction.atomic():
+            by_handler = {}
+            for _, (handler, data) in valid:
+                by_handler.setdefault(handler, []).append(data)
+            for handler, batch in by_handler.items():
+                handler.save_many(batch)
+    except Exception as e:
+        if len(valid) == 1:
+            return {valid[0][0].pk: e}
+        middle = len(valid) // 2
+        return {**_save_items(valid[:middle]), **_save_items(valid[middle:])}
+    return {}
+
+
+def drain_batch(batch_size=100, max_attempts=5):
+    """
+    Process up to batch_size pending inbox items in one transaction.
+
+    Items are routed to their topic's handler and each topic's items are saved
+    with one save_many call. Items with invalid payloads or unknown topics are
+    marked failed straight away since retrying cannot fix them. If persisting
+    fails, the batch is split until the items that cannot be saved are found
+    (see _save_items); only those are retried on the next call, until they
+    have been attempted max_attempts times, and the rest are saved.
+
+    Args:
+        batch_size (int): Maximum number of items to claim
+        max_attempts (int): Attempts before a persistence failure is final
+
+    Returns:
+        DrainResult: Counts and timing for the batch
+    """
+    result = DrainResult()
+    started = time.perf_counter()
+
+    with transaction.atomic():
+        queryset = WebhookInboxItem.objects.filter(
+            status=WebhookInboxItem.STATUS_PENDING
+        ).order_by('id')
+        if connection.features.has_select_for_update_skip_locked:
+            queryset = queryset.select_for_update(skip_locked=True)
+        items = list(queryset[:batch_size])
+        result.claimed = len(items)
+        if not items:
+            return result
+
+        now = timezone.now()
+        valid = []
+        for item in items:
+            item.attempts += 1
+            try:
+                valid.append((item, _decode_item(item)))
+            except ValueError as e:
+                item.status = WebhookInboxItem.STATUS_FAILED
+                item.last_error = str(e)
+                item.processed_at = now
+                result.failed += 1
+
+        errors = _save_items(valid) if valid else {}
+        for item, _ in valid:
+            error = errors.get(item.pk)
+            if error is None:
+                item.status = WebhookInboxItem.STATUS_DONE
+                item.last_error = ''
+                item.processed_at = now
+                result.processed += 1
+            else:
+                item.last_error = str(error)
+                if item.attempts >= max_attempts:
+                    item.status = WebhookInboxItem.STATUS_FAILED
+                    item.processed_at = now
+                    result.failed += 1
+                else:
+                    result.retried += 1
+
+        WebhookInboxItem.objects.bulk_update(
+            items, ['status', 'attempts', 'last_error', 'processed_at']
+        )
+
+    result.seconds = time.perf_counter() - started
+    DRAIN_BATCH_SECONDS.observe(result.seconds)
+    DRAINED.inc(result.processed, result='processed')
+    DRAINED.inc(result.failed, result='failed')
+    DRAINED.inc(result.retried, result='retried')
+    log_event(
+        logging.DEBUG, 'inbox.batch_drained',
+        claimed=result.claimed, processed=result.processed,
+        failed=result.failed, retried=result.retried, seconds=round(result.seconds, 4),
+    )
+    return result
+
+
+def purge_inbox(older_than):
+    """
+    Delete processed inbox items received before now - older_than.
+
+    Args:
+        older_than (timedelta): Minimum age of the rows to delete
+
+    Returns:
+        int: Number of deleted rows
+    """
+    deleted, _ = WebhookInboxItem.objects.filter(
+        status=WebhookInboxItem.STATUS_DONE,
+        received_at__lt=timezone.now() - older_than,
+    ).delete()
+    return deleted
+
+
+def _oldest_pending_age():
+    oldest = (
+        WebhookInboxItem.objects.filter(status=WebhookInboxItem.STATUS_PENDING)
+        .order_by('id')
+        .values_list('received_at', flat=True)
+        .first()
+    )
+    return (timezone.now() - oldest).total_seconds() if oldest else 0.0
+
+
+def _pending_depth():
+    return WebhookInboxItem.objects.filter(status=WebhookInboxItem.STATUS_PENDING).count()
+
+
+def inbox_stats():
+    """
+    Summarise queue depth, ingest latency and drain throughput.
+
+    Queue depth and throughput come from the inbox table so they cover every
+    worker; enqueue latency is tracked per web process.
+    """
+    counts = dict(
+        WebhookInboxItem.objects.order_by()
+        .values_list('status')
+        .annotate(total=Count('id'))
+    )
+    drained_last_minute = WebhookInboxItem.objects.filter(
+        status=WebhookInboxItem.STATUS_DONE,
+        processed_at__gte=timezone.now() - timedelta(minutes=1),
+    ).count()
+    enqueue_total, enqueue_count = ENQUEUE_SECONDS.totals()
+
+    return {
+        'pending': counts.get(WebhookInboxItem.STATUS_PENDING, 0),
+        'failed': counts.get(WebhookInboxItem.STATUS_FAILED, 0),
+        'done': counts.get(WebhookInboxItem.STATUS_DONE, 0),
+        'oldest_pending_age_seconds': _oldest_pending_age(),
+        'drained_last_minute': drained_last_minute,
+        'drain_rate_per_second': drained_last_minute / 60.0,
+        'enqueue': {
+            'count': enqueue_count,
+            'avg_ms': enqueue_total / enqueue_count * 1000 if enqueue_count else 0.0,
+        },
+    }
+
+
+REGISTRY.gauge(
+    'shopify_webhook_inbox_pending',
+    'Deliveries waiting in the inbox',
+    _pending_depth,
+)
+REGISTRY.gauge(
+    'shopify_webhook_inbox_oldest_pending_seconds',
+    'Age of the oldest delivery waiting in the inbox',
+    _oldest_pending_age,
+)
@@ -0,0 +1,206 @@
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger('shopifywebhook')
+
+# Latency buckets in seconds, from sub-millisecond up to Shopify's 5 second timeout
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class _Event:
+    """Log message rendered as 'event key=value ...' only if a handler formats it."""
+    __slots__ = ('event', 'fields')
+
+    def __init__(self, event, fields):
+        self.event = event
+        self.fields = fields
+
+    def __str__(self):
+        if not self.fields:
+            return self.event
+        parts = [f"{key}={json.dumps(value, default=str)}" for key, value in self.fields.items()]
+        return f"{self.event} {' '.join(parts)}"
+
+
+def log_event(level, event, **fields):
+    """
+    Log a structured event if the shopifywebhook logger is enabled for level.
+
+    Nothing is formatted unless a handler actually emits the record. Guard
+    expensive field values with logger.isEnabledFor() at the call site.
+
+    Args:
+        level (int): A logging level such as logging.INFO
+        event (str): Short event name, e.g. 'webhook.verified'
+        **fields: Extra key/value pairs attached to the event
+    """
+    if logger.isEnabledFor(level):
+        logger.log(level, _Event(event, fields), extra={'event': event, 'fields': fields})
+
+
+class _Metric:
+    type_name = ''
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def _format_labels(self, key, extra=()):
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{name}="{value}"' for name, value in pairs) + '}'
+
+
+class Counter(_Metric):
+    """Monotonically increasing value, optionally split by labels."""
+    type_name = 'counter'
+
+    def __init__(self, name, help_text, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name + self._format_labels(key), value) for key, value in items]
+
+
+class Gauge(_Metric):
+    """Value computed on every scrape by calling a function."""
+    type_name = 'gauge'
+
+    def __init__(self, name, help_text, func):
+        super().__init__(name, help_text)
+        self.func = func
+
+    def samples(self):
+        try:
+            return [(self.name, self.func())]
+        except Exception as e:
+            log_event(logging.WARNING, 'metrics.gauge_failed', gauge=self.name, error=str(e))
+            return []
+
+
+class Histogram(_Metric):
+    """Cumulative bucketed distribution with sum and count, split by labels."""
+    type_name = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def totals(self, **labels):
+        """Return (sum, count) for one label combination."""
+        state = self._values.get(self._key(labels))
+        return (state[1], state[2]) if state else (0.0, 0)
+
+    def samples(self):
+        with self._lock:
+            items = [(key, (list(state[0]), state[1], state[2])) for key, state in self._values.items()]
+        samples = []
+        for key, (bucket_counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                samples.append((self.name + '_bucket' + self._format_labels(key, [('le', bound)]), cumulative))
+            samples.append((self.name + '_bucket' + self._format_labels(key, [('le', '+Inf')]), count))
+            samples.append((self.name + '_sum' + self._format_labels(key), total))
+            samples.append((self.name + '_count' + self._format_labels(key), count))
+        return samples
+
+
+class Registry:
+    """Process-wide collection of metrics rendered in Prometheus text format."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._register(Counter(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def gauge(self, name, help_text, func):
+        return self._register(Gauge(name, help_text, func))
+
+    def render(self):
+        """Return every metric in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            for sample, value in metric.samples():
+                lines.append(f"{sample} {value}")
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'shopify_webhook_stage_seconds',
+    'Time spent in each webhook processing stage',
+    ['stage'],
+)
+WEBHOOK_REQUESTS = REGISTRY.counter(
+    'shopify_webhook_requests_total',
+    'Webhook requests by outcome',
+    ['outcome'],
+)
+
+
+@contextmanager
+def stage_timer(stage):
+    """
+    Time a block and record it under shopify_webhook_stage_seconds{stage=...}.
+
+    Args:
+        stage (str): One of verify, parse, validate, persist, respond, ...
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage=stage)
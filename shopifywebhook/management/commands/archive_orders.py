@@ -0,0 +1,60 @@
+import json
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from shopifywebhook.archive import DEFAULT_CHUNK_SIZE, archive_orders, archive_queryset, find_archived_order
+
+
+class Command(BaseCommand):
+    help = "Move orders older than the retention period into monthly gzip NDJSON archive files"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int,
+                            help="Archive orders stored more than this many days ago (default SHOPIFY_RETENTION_DAYS)")
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help="Orders moved per transaction")
+        parser.add_argument('--pause', type=float, default=0.1,
+                            help="Seconds to wait between chunks so webhooks are not held up")
+        parser.add_argument('--limit', type=int, help="Stop after this many orders")
+        parser.add_argument('--archive-dir', help="Where the archive files go (default SHOPIFY_ARCHIVE_DIR)")
+        parser.add_argument('--dry-run', action='store_true', help="Only count the orders that would be archived")
+        parser.add_argument('--show', metavar='ORDER_ID', help="Print an archived order as JSON and exit")
+
+    def handle(self, *args, **options):
+        if options['show']:
+            record = find_archived_order(options['show'], options['archive_dir'])
+            if record is None:
+                raise CommandError(f"Order {options['show']} is not archived")
+            self.stdout.write(json.dumps(record, indent=2))
+            return
+
+        days = options['days'] if options['days'] is not None else settings.SHOPIFY_RETENTION_DAYS
+        if days <= 0:
+            raise CommandError("Pass --days or set SHOPIFY_RETENTION_DAYS to a positive number of days")
+        older_than = timedelta(days=days)
+
+        if options['dry_run']:
+            count = archive_queryset(timezone.now() - older_than).count()
+            self.stdout.write(f"{count} orders stored more than {days} days ago would be archived")
+            return
+
+        def on_chunk(result):
+            self.stdout.write(f"Archived {result.orders} orders ({result.bytes_written / 1e6:.1f} MB)", ending='\r')
+
+        try:
+            result = archive_orders(
+                older_than,
+                chunk_size=options['chunk_size'],
+                directory=options['archive_dir'],
+                pause=options['pause'],
+                limit=options['limit'],
+                on_chunk=on_chunk if options['verbosity'] >= 1 else None,
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        rate = result.orders / result.seconds if result.seconds else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {result.orders} orders in {result.chunks} chunks to "
+            f"{', '.join(sorted(result.files)) or 'no files'} in {result.seconds:.1f}s ({rate:.0f} orders/s)"
+        ))
@@ -0,0 +1,80 @@
+from datetime import timezone as dt_timezone
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from shopifywebhook.backfill import (
+    MAX_PAGE_SIZE, AdminApiClient, Checkpoint, backfill_from_api, backfill_from_file,
+)
+
+
+def _parse_moment(value):
+    moment = parse_datetime(value)
+    if moment is None:
+        raise CommandError(f"Invalid date/time: {value!r} (use ISO 8601, e.g. 2024-01-01T00:00:00Z)")
+    return moment if timezone.is_aware(moment) else timezone.make_aware(moment, dt_timezone.utc)
+
+
+class Command(BaseCommand):
+    help = (
+        "Import historical orders from the Shopify Admin API or a bulk operation JSONL "
+        "export, in batches, with resumable checkpoints"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', help="Read a bulk operation JSONL export (.jsonl or .jsonl.gz) instead of the API")
+        parser.add_argument('--since', help="API: earliest created_at to import (ISO 8601)")
+        parser.add_argument('--until', help="API: latest created_at to import (default: now)")
+        parser.add_argument('--windows', type=int, default=8,
+                            help="API: created_at slices that can be fetched in parallel")
+        parser.add_argument('--concurrency', type=int, default=4, help="API: fetcher threads")
+        parser.add_argument('--rate', type=float, default=2.0,
+                            help="API: requests per second across all threads (Shopify's REST limit is 2)")
+        parser.add_argument('--page-size', type=int, default=MAX_PAGE_SIZE, help="API: orders per page")
+        parser.add_argument('--api-url', help="API: base URL override, e.g. a local stub")
+        parser.add_argument('--batch-size', type=int, default=500, help="File: orders per upsert")
+        parser.add_argument('--checkpoint', help="Progress file; an interrupted run resumes from it")
+
+    def _progress(self, result):
+        self.stdout.write(
+            f"{result.fetched} read, {result.saved} saved, {result.stale} stale, "
+            f"{result.invalid} invalid ({result.throughput:.0f} orders/s)"
+        )
+
+    def handle(self, *args, **options):
+        checkpoint = Checkpoint(options['checkpoint'])
+        try:
+            if options['file']:
+                result = backfill_from_file(
+                    options['file'], checkpoint,
+                    batch_size=options['batch_size'], progress=self._progress,
+                    shop_domain=(settings.SHOPIFY_SHOP_DOMAIN or '').strip().lower(),
+                )
+            else:
+                if not options['since']:
+                    raise CommandError("--since is required when importing from the API")
+                if not options['api_url'] and not (settings.SHOPIFY_SHOP_DOMAIN and settings.SHOPIFY_ACCESS_TOKEN):
+                    raise CommandError("SHOPIFY_SHOP_DOMAIN and SHOPIFY_ACCESS_TOKEN must be set")
+                since = _parse_moment(options['since'])
+                until = _parse_moment(options['until']) if options['until'] else timezone.now()
+                if until <= since:
+                    raise CommandError("--until must be after --since")
+                result = self._backfill_api(options, checkpoint, since, until, options['api_url'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Backfilled {result.saved} orders ({result.stale} already up to date, "
+            f"{result.invalid} invalid) from {result.fetched} records in {result.seconds:.1f}s"
+        ))
+
+    def _backfill_api(self, options, checkpoint, since, until, base_url):
+        client = AdminApiClient(
+            settings.SHOPIFY_SHOP_DOMAIN, settings.SHOPIFY_ACCESS_TOKEN, settings.SHOPIFY_API_VERSION,
+            base_url=base_url, rate=options['rate'], pool_size=options['concurrency'],
+        )
+        return backfill_from_api(
+            client, since, until, checkpoint,
+            windows=options['windows'], concurrency=options['concurrency'],
+            page_size=min(options['page_size'], MAX_PAGE_SIZE), progress=self._progress,
+        )
@@ -0,0 +1,59 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from shopifywebhook.models import WebhookInboxItem
+from shopifywebhook.replay import inbox_deliveries, write_archive
+from shopifywebhook.synthetic import TrafficProfile, synthesize_deliveries
+
+
+class Command(BaseCommand):
+    help = (
+        "Record webhook deliveries (headers and body) to a JSONL archive for replay_webhooks, "
+        "either from the inbox or synthesized"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help="Archive path; compressed with gzip if it ends in .gz")
+        parser.add_argument('--synthesize', type=int, metavar='COUNT',
+                            help="Generate COUNT synthetic deliveries instead of reading the inbox")
+        parser.add_argument('--since-hours', type=float,
+                            help="Only inbox deliveries received in the last N hours")
+        parser.add_argument('--topic', help="Only inbox deliveries for this topic")
+        parser.add_argument('--limit', type=int, help="Maximum inbox deliveries to record")
+        parser.add_argument('--duplicate-ratio', type=float, default=0.02,
+                            help="Synthetic: share of deliveries that are retries")
+        parser.add_argument('--update-ratio', type=float, default=0.0,
+                            help="Synthetic: share of deliveries that are orders/updated")
+        parser.add_argument('--note-bytes', type=int, default=0,
+                            help="Synthetic: pad payloads with a random note of up to N bytes")
+        parser.add_argument('--shop-domain', default='load-test.myshopify.com',
+                            help="Synthetic: X-Shopify-Shop-Domain of every delivery")
+        parser.add_argument('--seed', type=int, default=1, help="Synthetic: random seed")
+
+    def handle(self, *args, **options):
+        if options['synthesize'] is not None:
+            profile = TrafficProfile(
+                note_bytes=options['note_bytes'],
+                duplicate_ratio=options['duplicate_ratio'],
+                update_ratio=options['update_ratio'],
+            )
+            if profile.duplicate_ratio + profile.update_ratio >= 1:
+                raise CommandError("--duplicate-ratio plus --update-ratio must be below 1")
+            deliveries = synthesize_deliveries(
+                options['synthesize'], profile,
+                shop_domain=options['shop_domain'], seed=options['seed'],
+            )
+        else:
+            queryset = WebhookInboxItem.objects.order_by('id')
+            if options['since_hours'] is not None:
+                queryset = queryset.filter(
+                    received_at__gte=timezone.now() - timedelta(hours=options['since_hours'])
+                )
+            if options['topic']:
+                queryset = queryset.filter(topic=options['topic'])
+            if options['limit']:
+                queryset = queryset[:options['limit']]
+            deliveries = inbox_deliveries(queryset)
+
+        count = write_archive(options['output'], deliveries)
+        self.stdout.write(self.style.SUCCESS(f"Recorded {count} deliveries to {options['output']}"))
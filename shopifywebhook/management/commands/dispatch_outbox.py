@@ -0,0 +1,107 @@
+import json
+import signal
+import threading
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from shopifywebhook.outbox import (
+    DestinationSender, configured_destinations, outbox_stats, purge_outbox, requeue_dead_letters, run_dispatcher,
+)
+
+
+class Command(BaseCommand):
+    help = "Deliver queued order events to the downstream destinations in SHOPIFY_OUTBOX_DESTINATIONS"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--destination', action='append',
+                            help="Only deliver to this destination (repeatable)")
+        parser.add_argument('--max-attempts', type=int,
+                            help="Attempts before an event is dead-lettered (default SHOPIFY_OUTBOX_MAX_ATTEMPTS)")
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help="Seconds to wait when a destination has nothing due")
+        parser.add_argument('--once', action='store_true',
+                            help="Deliver until nothing is due, then exit")
+        parser.add_argument('--stats', action='store_true',
+                            help="Print outbox statistics as JSON and exit")
+        parser.add_argument('--requeue-dead', action='store_true',
+                            help="Move dead-lettered events back into the outbox and exit")
+        parser.add_argument('--purge-days', type=int,
+                            help="Delete delivered events older than this many days and exit")
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.stdout.write(json.dumps(outbox_stats(), indent=2))
+            return
+
+        if options['purge_days'] is not None:
+            deleted = purge_outbox(timedelta(days=options['purge_days']))
+            self.stdout.write(f"Purged {deleted} delivered events")
+            return
+
+        if options['requeue_dead']:
+            names = options['destination'] or [None]
+            requeued = sum(requeue_dead_letters(name) for name in names)
+            self.stdout.write(f"Requeued {requeued} dead-lettered events")
+            return
+
+        try:
+            destinations = configured_destinations()
+        except (TypeError, ValueError) as e:
+            raise CommandError(f"Invalid SHOPIFY_OUTBOX_DESTINATIONS: {e}")
+        if options['destination']:
+            unknown = set(options['destination']) - {destination.name for destination in destinations}
+            if unknown:
+                raise CommandError(f"Unknown destination(s): {', '.join(sorted(unknown))}")
+            destinations = [d for d in destinations if d.name in options['destination']]
+        if not destinations:
+            raise CommandError("No outbox destinations configured (SHOPIFY_OUTBOX_DESTINATIONS)")
+
+        totals = {destination.name: 0 for destination in destinations}
+        started = time.perf_counter()
+        if options['once']:
+            for destination in destinations:
+                sender = DestinationSender(destination)
+                try:
+                    while True:
+                        result = sender.dispatch_once(options['max_attempts'])
+                        if not result.claimed:
+                            break
+                        self._report(destination, result)
+                        totals[destination.name] += result.delivered
+                        if not result.delivered:
+                            break
+                finally:
+                    sender.close()
+        else:
+            stop = threading.Event()
+            signal.signal(signal.SIGTERM, lambda *_: stop.set())
+
+            def on_result(destination, result):
+                totals[destination.name] += result.delivered
+                self._report(destination, result)
+
+            runner = threading.Thread(
+                target=run_dispatcher,
+                kwargs=dict(stop=stop, destinations=destinations, poll_interval=options['poll_interval'],
+                            max_attempts=options['max_attempts'], on_result=on_result),
+            )
+            runner.start()
+            try:
+                while runner.is_alive():
+                    runner.join(0.5)
+            except KeyboardInterrupt:
+                stop.set()
+                runner.join()
+
+        elapsed = time.perf_counter() - started
+        total = sum(totals.values())
+        rate = total / elapsed if elapsed else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f"Delivered {total} events in {elapsed:.1f}s ({rate:.0f} events/s)"
+        ))
+
+    def _report(self, destination, result):
+        self.stdout.write(
+            f"{destination.name}: {result.claimed} claimed, {result.delivered} delivered, "
+            f"{result.retried} retried, {result.dead} dead-lettered in {result.seconds * 1000:.1f} ms"
+        )
@@ -0,0 +1,81 @@
+import json
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from shopifywebhook.dedup import expire_deliveries
+from shopifywebhook.ingest import drain_batch, inbox_stats, purge_inbox
+
+
+class Command(BaseCommand):
+    help = "Process queued Shopify webhook deliveries from the inbox in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help="Maximum deliveries processed per transaction")
+        parser.add_argument('--max-attempts', type=int, default=5,
+                            help="Attempts before a delivery is marked failed")
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help="Seconds to sleep when the inbox is empty")
+        parser.add_argument('--once', action='store_true',
+                            help="Drain until the inbox is empty, then exit")
+        parser.add_argument('--purge-days', type=int,
+                            help="Delete processed deliveries older than this many days and exit")
+        parser.add_argument('--expire-deliveries', action='store_true',
+                            help="Delete webhook ids older than the duplicate-detection TTL and exit")
+        parser.add_argument('--stats', action='store_true',
+                            help="Print queue statistics as JSON and exit")
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.stdout.write(json.dumps(inbox_stats(), indent=2))
+            return
+
+        if options['purge_days'] is not None:
+            deleted = purge_inbox(timedelta(days=options['purge_days']))
+            self.stdout.write(f"Purged {deleted} processed deliveries")
+            return
+
+        if options['expire_deliveries']:
+            deleted = expire_deliveries()
+            self.stdout.write(f"Expired {deleted} webhook ids")
+            return
+
+        total = 0
+        started = time.perf_counter()
+        expiry_interval = settings.SHOPIFY_WEBHOOK_DEDUP_EXPIRY_INTERVAL_SECONDS
+        last_expiry = None
+        try:
+            while True:
+                close_old_connections()
+                if last_expiry is None or time.monotonic() - last_expiry >= expiry_interval:
+                    # Kept off the request path, where the DELETE would hold up a delivery
+                    expire_deliveries()
+                    last_expiry = time.monotonic()
+                result = drain_batch(
+                    batch_size=options['batch_size'],
+                    max_attempts=options['max_attempts'],
+                )
+                if result.claimed:
+                    total += result.processed
+                    self.stdout.write(
+                        f"Batch of {result.claimed}: {result.processed} processed, "
+                        f"{result.failed} failed, {result.retried} retried "
+                        f"in {result.seconds * 1000:.1f} ms ({result.throughput:.0f} orders/s)"
+                    )
+                    if result.retried and not result.processed:
+                        # Back off instead of hammering a failing database
+                        time.sleep(options['poll_interval'])
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+
+        elapsed = time.perf_counter() - started
+        rate = total / elapsed if elapsed else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f"Drained {total} deliveries in {elapsed:.1f}s ({rate:.0f} orders/s)"
+        ))
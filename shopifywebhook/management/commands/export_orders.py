@@ -0,0 +1,54 @@
+import sys
+import time
+from django.core.management.base import BaseCommand, CommandError
+from shopifywebhook.export import DEFAULT_CHUNK_SIZE, FORMATS, ExportSpec, iter_export, parse_moment
+
+
+class Command(BaseCommand):
+    help = "Stream stored orders to a CSV or NDJSON file, optionally gzipped, in bounded memory"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=FORMATS, default='csv')
+        parser.add_argument('--output', default='-', help="File to write (default: stdout)")
+        parser.add_argument('--gzip', action='store_true', help="gzip-compress the output")
+        parser.add_argument('--since', help="Orders placed at or after this date or date/time (ISO 8601)")
+        parser.add_argument('--until', help="Orders placed before this date or date/time (ISO 8601)")
+        parser.add_argument('--shop', help="Only orders from this shop domain")
+        parser.add_argument('--fields', default='',
+                            help="Comma-separated payload paths to add as columns, e.g. customer.first_name")
+        parser.add_argument('--line-items', action='store_true', help="One row per line item")
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help="Orders fetched per database round trip")
+
+    def handle(self, *args, **options):
+        try:
+            spec = ExportSpec(
+                fmt=options['format'],
+                since=parse_moment(options['since']),
+                until=parse_moment(options['until']),
+                shop_domain=options['shop'],
+                raw_fields=[path.strip() for path in options['fields'].split(',') if path.strip()],
+                line_items=options['line_items'],
+                compress=options['gzip'],
+                chunk_size=options['chunk_size'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        started = time.perf_counter()
+        written = 0
+        to_stdout = options['output'] == '-'
+        out = sys.stdout.buffer if to_stdout else open(options['output'], 'wb')
+        try:
+            for chunk in iter_export(spec):
+                out.write(chunk)
+                written += len(chunk)
+        finally:
+            if to_stdout:
+                out.flush()
+            else:
+                out.close()
+        if not to_stdout:
+            self.stdout.write(self.style.SUCCESS(
+                f"Wrote {written} bytes to {options['output']} in {time.perf_counter() - started:.1f}s"
+            ))
@@ -0,0 +1,44 @@
+import json
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from shopifywebhook.analytics import basket_stats, revenue_by_product, sku_velocity
+
+
+class Command(BaseCommand):
+    help = "Report SKU velocity, revenue by product and basket statistics from the line item table"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help="Length of the reporting window")
+        parser.add_argument('--shop', help="Only orders from this shop domain")
+        parser.add_argument('--limit', type=int, default=20, help="Rows per report")
+        parser.add_argument('--json', action='store_true', help="Print the reports as one JSON object")
+
+    def handle(self, *args, **options):
+        days, shop, limit = options['days'], options['shop'], options['limit']
+        now = timezone.now()
+        since = now - timedelta(days=days)
+        reports = {
+            'skus': sku_velocity(days=days, shop_domain=shop, limit=limit, now=now),
+            'products': revenue_by_product(since=since, until=now, shop_domain=shop, limit=limit),
+            'baskets': basket_stats(since=since, until=now, shop_domain=shop),
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(reports, indent=2))
+            return
+
+        self.stdout.write(f"Last {days} days")
+        self.stdout.write(f"\n{'sku':<24} {'units':>8} {'orders':>8} {'revenue':>12} {'units/day':>10}")
+        for row in reports['skus']:
+            self.stdout.write(f"{row['sku'][:24]:<24} {row['units']:>8} {row['orders']:>8} "
+                              f"{row['revenue']:>12.2f} {row['units_per_day']:>10.2f}")
+        self.stdout.write(f"\n{'product':<32} {'units':>8} {'revenue':>12} {'share':>7}")
+        for row in reports['products']:
+            name = row['title'] or row['product_id']
+            self.stdout.write(f"{name[:32]:<32} {row['units']:>8} {row['revenue']:>12.2f} {row['share']:>7.1%}")
+        baskets = reports['baskets']
+        self.stdout.write(
+            f"\n{baskets['orders']} orders: {baskets['mean_items']:.2f} line items and "
+            f"{baskets['mean_units']:.2f} units per order (p90 {baskets['p90_units']:.0f}), "
+            f"average basket {baskets['mean_value']:.2f}, {baskets['multi_item_share']:.0%} with several items"
+        )
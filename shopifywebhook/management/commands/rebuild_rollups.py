@@ -0,0 +1,19 @@
+import time
+from django.core.management.base import BaseCommand
+from shopifywebhook.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute the sales and customer rollup tables from the stored orders"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default',
+                            help="Database alias to rebuild")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        sales, customers = rebuild_rollups(using=options['database'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {sales} hourly sales rows and {customers} customer rows "
+            f"in {time.perf_counter() - started:.1f}s"
+        ))
@@ -0,0 +1,21 @@
+import time
+from django.core.management.base import BaseCommand
+from shopifywebhook.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Re-tokenize every stored order payload into the search index"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help="Orders re-indexed per transaction")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        total = rebuild_search_index(
+            batch_size=options['batch_size'],
+            progress=lambda done: self.stdout.write(f"{done} orders indexed"),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {total} orders in {time.perf_counter() - started:.1f}s"
+        ))
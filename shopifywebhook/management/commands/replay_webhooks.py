@@ -0,0 +1,89 @@
+import json
+import os
+import tempfile
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.urls import reverse
+from shopifywebhook.replay import read_archive, replay
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay an archive from capture_webhooks against the webhook endpoint and report "
+        "throughput, latency percentiles and database writes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archive', help="Archive written by capture_webhooks")
+        parser.add_argument('--rate', type=float,
+                            help="Deliveries per second (default: as fast as possible)")
+        parser.add_argument('--concurrency', type=int, default=8, help="Sending threads")
+        parser.add_argument('--secret', default='replay-secret',
+                            help="Secret deliveries are re-signed with")
+        parser.add_argument('--url',
+                            help="Base URL of a running server, e.g. http://127.0.0.1:8000; "
+                                 "default is Django's test client in this process")
+        parser.add_argument('--path', default=None,
+                            help="Endpoint path (default: the orders/create webhook)")
+        parser.add_argument('--test-db', action='store_true',
+                            help="Test client only: replay into a throwaway database")
+        parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+
+    def handle(self, *args, **options):
+        deliveries = read_archive(options['archive'])
+        if not deliveries:
+            raise CommandError(f"No deliveries in {options['archive']}")
+        path = options['path'] or reverse('shopifywebhook:webhook_order_created')
+
+        if options['url']:
+            if options['test_db']:
+                raise CommandError("--test-db only applies to the test client")
+            self.stderr.write("Make sure the server verifies with the secret passed as --secret")
+            report = replay(
+                deliveries, options['secret'], path, base_url=options['url'],
+                rate=options['rate'], concurrency=options['concurrency'],
+            )
+        else:
+            test_db_name = None
+            if options['test_db']:
+                # A file, not memory, so every sending thread sees the same database
+                connection.settings_dict['TEST']['NAME'] = os.path.join(
+                    tempfile.mkdtemp(), 'replay.sqlite3'
+                )
+                test_db_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+            try:
+                # The in-process app must verify with the replay secret whatever the shop
+                with override_settings(
+                    ALLOWED_HOSTS=['testserver', *settings.ALLOWED_HOSTS],
+                    SHOPIFY_WEBHOOK_SECRET=options['secret'],
+                    SHOPIFY_WEBHOOK_PREVIOUS_SECRET=None,
+                    SHOPIFY_SHOP_SECRETS={},
+                    SHOPIFY_SHOP_SECRETS_FILE=None,
+                ):
+                    report = replay(
+                        deliveries, options['secret'], path,
+                        rate=options['rate'], concurrency=options['concurrency'],
+                    )
+            finally:
+                if test_db_name:
+                    connection.creation.destroy_test_db(test_db_name, verbosity=0)
+
+        result = report.as_dict()
+        if options['json']:
+            self.stdout.write(json.dumps(result, indent=2))
+            return
+        writes = result['db_writes_per_second']
+        self.stdout.write(
+            f"{result['sent']} deliveries in {result['seconds']:.2f}s "
+            f"({result['throughput_per_second']:.0f}/s), concurrency {options['concurrency']}"
+        )
+        self.stdout.write(
+            f"latency p50 {result['p50_ms']:.1f} ms, p95 {result['p95_ms']:.1f} ms, "
+            f"p99 {result['p99_ms']:.1f} ms, max {result['max_ms']:.1f} ms"
+        )
+        self.stdout.write(
+            f"statuses {result['statuses']}, errors {result['errors']}, "
+            f"db writes/s {writes if writes is not None else 'n/a (remote server)'}"
+        )
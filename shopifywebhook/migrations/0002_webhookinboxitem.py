@@ -0,0 +1,35 @@
+# Generated by Django 5.2.4 on 2026-10-17 01:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shopifywebhook', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookInboxItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('topic', models.CharField(blank=True, max_length=100)),
+                ('shop_domain', models.CharField(blank=True, max_length=255)),
+                ('webhook_id', models.CharField(blank=True, max_length=100)),
+                ('headers', models.JSONField(default=dict)),
+                ('body', models.BinaryField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Webhook Inbox Item',
+                'verbose_name_plural': 'Webhook Inbox Items',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['status', 'id'], name='inbox_status_id_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-17 01:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shopifywebhook', '0003_webhookdelivery'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='shopifywebhookorder',
+            index=models.Index(fields=['-created_at', '-id'], name='order_created_id_idx'),
+        ),
+    ]
@@ -0,0 +1,143 @@
+# Generated by Django 5.2.4 on 2026-10-17 01:36
+
+import json
+import zlib
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils.dateparse import parse_datetime
+
+BATCH_SIZE = 500
+
+
+# Frozen copies of the shopifywebhook.payloads helpers as they were when this
+# migration was written, so later changes to them cannot change what it does
+
+def compress_payload(data, level=6):
+    return zlib.compress(json.dumps(data, separators=(',', ':')).encode('utf-8'), level)
+
+
+def decompress_payload(blob, encoding='zlib+json'):
+    if encoding != 'zlib+json':
+        raise ValueError(f"Unknown payload encoding: {encoding}")
+    return json.loads(zlib.decompress(bytes(blob)))
+
+
+def extract_order_columns(data):
+    customer = data.get('customer')
+    line_items = data.get('line_items')
+    updated_at = data.get('updated_at')
+    try:
+        shopify_updated_at = parse_datetime(updated_at) if isinstance(updated_at, str) else None
+    except ValueError:
+        shopify_updated_at = None
+    return {
+        'financial_status': str(data.get('financial_status') or '')[:50],
+        'currency': str(data.get('currency') or '')[:3],
+        'customer_id': (
+            str(customer.get('id') or '')[:50] if isinstance(customer, dict) else ''
+        ),
+        'line_item_count': len(line_items) if isinstance(line_items, list) else 0,
+        'shopify_updated_at': shopify_updated_at,
+    }
+
+
+def move_raw_data_to_payloads(apps, schema_editor):
+    ShopifyWebhookOrder = apps.get_model('shopifywebhook', 'ShopifyWebhookOrder')
+    OrderPayload = apps.get_model('shopifywebhook', 'OrderPayload')
+    # The columns this migration adds; later migrations fill in any promoted since
+    columns = ['financial_status', 'currency', 'customer_id', 'line_item_count', 'shopify_updated_at']
+
+    orders = []
+    for order in ShopifyWebhookOrder.objects.only('id', 'raw_data').iterator(chunk_size=BATCH_SIZE):
+        raw_data = order.raw_data or {}
+        extracted = extract_order_columns(raw_data)
+        for name in columns:
+            setattr(order, name, extracted[name])
+        orders.append(order)
+        if len(orders) >= BATCH_SIZE:
+            _save_batch(ShopifyWebhookOrder, OrderPayload, orders, columns)
+            orders = []
+    if orders:
+        _save_batch(ShopifyWebhookOrder, OrderPayload, orders, columns)
+
+
+def _save_batch(ShopifyWebhookOrder, OrderPayload, orders, columns):
+    ShopifyWebhookOrder.objects.bulk_update(orders, columns)
+    payloads = []
+    for order in orders:
+        blob = compress_payload(order.raw_data or {})
+        payloads.append(OrderPayload(order_id=order.pk, data=blob, size=len(blob)))
+    OrderPayload.objects.bulk_create(payloads)
+
+
+def restore_raw_data(apps, schema_editor):
+    ShopifyWebhookOrder = apps.get_model('shopifywebhook', 'ShopifyWebhookOrder')
+    OrderPayload = apps.get_model('shopifywebhook', 'OrderPayload')
+    orders = []
+    for payload in OrderPayload.objects.iterator(chunk_size=BATCH_SIZE):
+        raw_data = decompress_payload(payload.data, payload.encoding)
+        orders.append(ShopifyWebhookOrder(pk=payload.order_id, raw_data=raw_data))
+        if len(orders) >= BATCH_SIZE:
+            ShopifyWebhookOrder.objects.bulk_update(orders, ['raw_data'])
+            orders = []
+    if orders:
+        ShopifyWebhookOrder.objects.bulk_update(orders, ['raw_data'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shopifywebhook', '0004_order_created_id_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderPayload',
+            fields=[
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='payload', serialize=False, to='shopifywebhook.shopifywebhookorder')),
+                ('data', models.BinaryField()),
+                ('encoding', models.CharField(default='zlib+json', max_length=20)),
+                ('size', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Order Payload',
+                'verbose_name_plural': 'Order Payloads',
+            },
+        ),
+        migrations.AddField(
+            model_name='shopifywebhookorder',
+            name='currency',
+            field=models.CharField(blank=True, max_length=3),
+        ),
+        migrations.AddField(
+            model_name='shopifywebhookorder',
+            name='customer_id',
+            field=models.CharField(blank=True, db_index=True, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='shopifywebhookorder',
+            name='financial_status',
+            field=models.CharField(blank=True, db_index=True, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='shopifywebhookorder',
+            name='line_item_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='shopifywebhookorder',
+            name='shopify_updated_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='shopifywebhookorder',
+            name='raw_data',
+            field=models.JSONField(null=True),
+        ),
+        migrations.RunPython(move_raw_data_to_payloads, restore_raw_data),
+        migrations.RemoveField(
+            model_name='shopifywebhookorder',
+            name='raw_data',
+        ),
+    ]
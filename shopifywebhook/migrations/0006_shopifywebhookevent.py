@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-17 01:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shopifywebhook', '0005_order_payload_split'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShopifyWebhookEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('topic', models.CharField(max_length=100)),
+                ('resource_id', models.CharField(max_length=100)),
+                ('order_id', models.CharField(blank=True, db_index=True, max_length=100)),
+                ('data', models.BinaryField()),
+                ('encoding', models.CharField(default='zlib+json', max_length=20)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Shopify Webhook Event',
+                'verbose_name_plural': 'Shopify Webhook Events',
+                'ordering': ['-received_at'],
+                'indexes': [models.Index(fields=['topic', 'resource_id'], name='event_topic_resource_idx')],
+            },
+        ),
+    ]
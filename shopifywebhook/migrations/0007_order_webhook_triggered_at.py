@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 01:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shopifywebhook', '0006_shopifywebhookevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shopifywebhookorder',
+            name='webhook_triggered_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,131 @@
+# Generated by Django 5.2.4 on 2026-10-17 01:55
+
+import json
+import zlib
+from datetime import timezone
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce, TruncHour
+from django.utils.dateparse import parse_datetime
+
+BATCH_SIZE = 500
+
+
+# Frozen copies of the shopifywebhook.payloads and shopifywebhook.rollups helpers
+# as they were when this migration was written, so later changes to them cannot
+# change what it does
+
+def decompress_payload(blob, encoding='zlib+json'):
+    if encoding != 'zlib+json':
+        raise ValueError(f"Unknown payload encoding: {encoding}")
+    return json.loads(zlib.decompress(bytes(blob)))
+
+
+def parse_shopify_datetime(value):
+    if not isinstance(value, str):
+        return None
+    try:
+        return parse_datetime(value)
+    except ValueError:
+        return None
+
+
+def _rebuild(order_model, sales_model, customer_model, using):
+    orders = order_model.objects.using(using).order_by()
+    sales_model.objects.using(using).all().delete()
+    customer_model.objects.using(using).all().delete()
+    sales_model.objects.using(using).bulk_create(
+        sales_model(**row)
+        for row in orders.annotate(bucket=TruncHour(Coalesce('placed_at', 'created_at'), tzinfo=timezone.utc))
+        .values('shop_domain', 'bucket')
+        .annotate(order_count=Count('id'), revenue=Sum('total_price'))
+        .iterator()
+    )
+    customer_model.objects.using(using).bulk_create(
+        customer_model(**row)
+        for row in orders.exclude(email__isnull=True).exclude(email='')
+        .values('shop_domain', 'email')
+        .annotate(order_count=Count('id'), revenue=Sum('total_price'))
+        .iterator()
+    )
+
+
+def build_rollups(apps, schema_editor):
+    ShopifyWebhookOrder = apps.get_model('shopifywebhook', 'ShopifyWebhookOrder')
+    OrderPayload = apps.get_model('shopifywebhook', 'OrderPayload')
+    using = schema_editor.connection.alias
+
+    # Bucket existing orders by when they were placed, not when they were received
+    orders = []
+    for payload in OrderPayload.objects.using(using).iterator(chunk_size=BATCH_SIZE):
+        placed_at = parse_shopify_datetime(decompress_payload(payload.data, payload.encoding).get('created_at'))
+        if placed_at is not None:
+            orders.append(ShopifyWebhookOrder(pk=payload.order_id, placed_at=placed_at))
+        if len(orders) >= BATCH_SIZE:
+            ShopifyWebhookOrder.objects.using(using).bulk_update(orders, ['placed_at'])
+            orders = []
+    if orders:
+        ShopifyWebhookOrder.objects.using(using).bulk_update(orders, ['placed_at'])
+
+    _rebuild(
+        ShopifyWebhookOrder,
+        apps.get_model('shopifywebhook', 'SalesRollup'),
+        apps.get_model('shopifywebhook', 'CustomerRollup'),
+        using,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shopifywebhook', '0007_order_webhook_triggered_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shopifywebhookorder',
+            name='placed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='shopifywebhookorder',
+            name='shop_domain',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.CreateModel(
+            name='CustomerRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shop_domain', models.CharField(blank=True, max_length=255)),
+                ('email', models.EmailField(max_length=254)),
+                ('order_count', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+            ],
+            options={
+                'verbose_name': 'Customer Rollup',
+                'verbose_name_plural': 'Customer Rollups',
+                'ordering': ['-revenue'],
+                'indexes': [models.Index(fields=['-revenue'], name='customer_rollup_revenue_idx')],
+                'constraints': [models.UniqueConstraint(fields=('shop_domain', 'email'), name='customer_rollup_shop_email_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shop_domain', models.CharField(blank=True, max_length=255)),
+                ('bucket', models.DateTimeField()),
+                ('order_count', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+            ],
+            options={
+                'verbose_name': 'Sales Rollup',
+                'verbose_name_plural': 'Sales Rollups',
+                'ordering': ['-bucket'],
+                'indexes': [models.Index(fields=['bucket'], name='sales_rollup_bucket_idx')],
+                'constraints': [models.UniqueConstraint(fields=('shop_domain', 'bucket'), name='sales_rollup_shop_bucket_uniq')],
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,107 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:03
+
+import json
+import re
+import zlib
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+
+
+# Frozen copies of the shopifywebhook.payloads helpers as they were when this
+# migration was written, so later changes to them cannot change what it does
+
+SEARCH_TOKEN_LENGTH = 100
+MAX_SEARCH_TOKENS = 300
+_WORD = re.compile(r'\w+')
+
+
+def decompress_payload(blob, encoding='zlib+json'):
+    if encoding != 'zlib+json':
+        raise ValueError(f"Unknown payload encoding: {encoding}")
+    return json.loads(zlib.decompress(bytes(blob)))
+
+
+def _search_words(value):
+    return [word for word in _WORD.findall(str(value).lower()) if len(word) > 1] if value else []
+
+
+def extract_search_tokens(data):
+    tokens = set()
+
+    def add(field, value):
+        token = str(value).strip().lower()[:SEARCH_TOKEN_LENGTH] if value is not None else ''
+        if token:
+            tokens.add((field, token))
+
+    add('number', data.get('order_number'))
+    add('number', str(data.get('name') or '').lstrip('#'))
+    add('email', data.get('email'))
+    addresses = [data.get('billing_address'), data.get('shipping_address')]
+    customer = data.get('customer')
+    if isinstance(customer, dict):
+        add('email', customer.get('email'))
+        addresses.insert(0, customer)
+    for person in addresses:
+        if isinstance(person, dict):
+            for word in _search_words(person.get('first_name')) + _search_words(person.get('last_name')):
+                add('customer', word)
+    tags = data.get('tags')
+    if isinstance(tags, str):
+        for tag in tags.split(','):
+            add('tag', tag)
+    for discount in data.get('discount_codes') or ():
+        if isinstance(discount, dict):
+            add('discount', discount.get('code'))
+    line_items = data.get('line_items')
+    for item in line_items if isinstance(line_items, list) else ():
+        if isinstance(item, dict):
+            add('sku', item.get('sku'))
+            for word in _search_words(item.get('title')):
+                add('product', word)
+    if len(tokens) > MAX_SEARCH_TOKENS:
+        tokens = set(sorted(tokens, key=lambda pair: (pair[0] == 'product', len(pair[1]), pair))[:MAX_SEARCH_TOKENS])
+    return tokens
+
+
+def index_existing_orders(apps, schema_editor):
+    OrderPayload = apps.get_model('shopifywebhook', 'OrderPayload')
+    OrderSearchToken = apps.get_model('shopifywebhook', 'OrderSearchToken')
+    using = schema_editor.connection.alias
+
+    tokens = []
+    for payload in OrderPayload.objects.using(using).iterator(chunk_size=BATCH_SIZE):
+        for field, token in extract_search_tokens(decompress_payload(payload.data, payload.encoding)):
+            tokens.append(OrderSearchToken(order_id=payload.order_id, field=field, token=token))
+        if len(tokens) >= BATCH_SIZE * 20:
+            OrderSearchToken.objects.using(using).bulk_create(tokens)
+            tokens = []
+    if tokens:
+        OrderSearchToken.objects.using(using).bulk_create(tokens)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shopifywebhook', '0008_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderSearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field', models.CharField(max_length=20)),
+                ('token', models.CharField(max_length=100)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='shopifywebhook.shopifywebhookorder')),
+            ],
+            options={
+                'verbose_name': 'Order Search Token',
+                'verbose_name_plural': 'Order Search Tokens',
+                'indexes': [models.Index(fields=['token', 'field', 'order'], name='search_token_idx')],
+            },
+        ),
+        migrations.RunPython(index_existing_orders, migrations.RunPython.noop),
+    ]
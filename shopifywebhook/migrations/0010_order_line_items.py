@@ -0,0 +1,109 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:12
+
+import json
+import zlib
+from decimal import Decimal, InvalidOperation
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+
+
+# Frozen copies of the shopifywebhook.payloads helpers as they were when this
+# migration was written, so later changes to them cannot change what it does
+
+MAX_LINE_ITEMS = 1000
+_MAX_AMOUNT = Decimal('99999999.99')
+
+
+def decompress_payload(blob, encoding='zlib+json'):
+    if encoding != 'zlib+json':
+        raise ValueError(f"Unknown payload encoding: {encoding}")
+    return json.loads(zlib.decompress(bytes(blob)))
+
+
+def _amount(value):
+    try:
+        amount = Decimal(value if isinstance(value, (str, int)) else str(value)).quantize(Decimal('0.01'))
+    except (InvalidOperation, TypeError, ValueError):
+        return Decimal('0.00')
+    return amount if amount.is_finite() and abs(amount) <= _MAX_AMOUNT else Decimal('0.00')
+
+
+def _quantity(value):
+    try:
+        return max(int(value), 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def extract_line_items(data):
+    line_items = data.get('line_items')
+    rows = []
+    for item in line_items if isinstance(line_items, list) else ():
+        if not isinstance(item, dict):
+            continue
+        rows.append({
+            'position': len(rows),
+            'line_item_id': str(item.get('id') or '')[:50],
+            'product_id': str(item.get('product_id') or '')[:50],
+            'variant_id': str(item.get('variant_id') or '')[:50],
+            'sku': str(item.get('sku') or '')[:255],
+            'title': str(item.get('title') or '')[:255],
+            'quantity': _quantity(item.get('quantity')),
+            'price': _amount(item.get('price')),
+            'total_discount': _amount(item.get('total_discount')),
+        })
+        if len(rows) >= MAX_LINE_ITEMS:
+            break
+    return rows
+
+
+def normalize_existing_orders(apps, schema_editor):
+    OrderPayload = apps.get_model('shopifywebhook', 'OrderPayload')
+    OrderLineItem = apps.get_model('shopifywebhook', 'OrderLineItem')
+    using = schema_editor.connection.alias
+
+    items = []
+    for payload in OrderPayload.objects.using(using).iterator(chunk_size=BATCH_SIZE):
+        for item in extract_line_items(decompress_payload(payload.data, payload.encoding)):
+            items.append(OrderLineItem(order_id=payload.order_id, **item))
+        if len(items) >= BATCH_SIZE * 5:
+            OrderLineItem.objects.using(using).bulk_create(items)
+            items = []
+    if items:
+        OrderLineItem.objects.using(using).bulk_create(items)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shopifywebhook', '0009_order_search_tokens'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderLineItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField()),
+                ('line_item_id', models.CharField(blank=True, max_length=50)),
+                ('product_id', models.CharField(blank=True, max_length=50)),
+                ('variant_id', models.CharField(blank=True, max_length=50)),
+                ('sku', models.CharField(blank=True, max_length=255)),
+                ('title', models.CharField(blank=True, max_length=255)),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('price', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('total_discount', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='line_items', to='shopifywebhook.shopifywebhookorder')),
+            ],
+            options={
+                'verbose_name': 'Order Line Item',
+                'verbose_name_plural': 'Order Line Items',
+                'indexes': [models.Index(fields=['sku'], name='line_item_sku_idx'), models.Index(fields=['product_id'], name='line_item_product_idx')],
+                'constraints': [models.UniqueConstraint(fields=('order', 'position'), name='line_item_order_position_uniq')],
+            },
+        ),
+        migrations.RunPython(normalize_existing_orders, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:16
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shopifywebhook', '0010_order_line_items'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeadLetterEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('destination', models.CharField(max_length=100)),
+                ('event_type', models.CharField(max_length=50)),
+                ('order_id', models.CharField(max_length=100)),
+                ('data', models.JSONField()),
+                ('attempts', models.PositiveIntegerField()),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField()),
+                ('failed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Dead Letter Event',
+                'verbose_name_plural': 'Dead Letter Events',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['destination', 'failed_at'], name='dead_letter_dest_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('destination', models.CharField(max_length=100)),
+                ('event_type', models.CharField(max_length=50)),
+                ('order_id', models.CharField(max_length=100)),
+                ('data', models.JSONField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('done', 'Done')], default='pending', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('delivered_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Outbox Event',
+                'verbose_name_plural': 'Outbox Events',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['destination', 'status', 'next_attempt_at'], name='outbox_due_idx')],
+            },
+        ),
+    ]
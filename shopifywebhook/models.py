@@ -1,17 +1,901 @@
-from django.db import models
+from collections import defaultdict
+from datetime import timezone
+from decimal import Decimal
+from django.conf import settings
+from django.db import IntegrityError, connections, models, transaction
+from django.db.models.functions import Coalesce, TruncHour
+from django.utils.timezone import now as timezone_now
+from .payloads import (
+    ENCODING_ZLIB_JSON, compress_payload, decompress_payload, extract_line_items, extract_search_tokens,
+)
+from .signals import orders_deleted, orders_saved
+
+
+def _is_older(incoming, current):
+    """
+    Whether validated order data `incoming` is an older version than `current`.
+
+    Versions compare on Shopify's updated_at, then on the webhook's
+    X-Shopify-Triggered-At. Missing values never count as older.
+    """
+    incoming_version = incoming.get('shopify_updated_at')
+    current_version = current.get('shopify_updated_at')
+    if not incoming_version or not current_version:
+        return False
+    if incoming_version != current_version:
+        return incoming_version < current_version
+    incoming_triggered = incoming.get('webhook_triggered_at')
+    current_triggered = current.get('webhook_triggered_at')
+    return bool(incoming_triggered and current_triggered and incoming_triggered < current_triggered)
+
+
+def _is_newer(incoming, current):
+    """
+    Whether validated order data `incoming` would overwrite the stored
+    version `current`, by the rule the conditional upsert applies in SQL:
+    a missing updated_at on either side always overwrites, and equal
+    versions only when the delivery was triggered later.
+    """
+    incoming_version = incoming.get('shopify_updated_at')
+    current_version = current.get('shopify_updated_at')
+    if not incoming_version or not current_version:
+        return True
+    if incoming_version != current_version:
+        return incoming_version > current_version
+    incoming_triggered = incoming.get('webhook_triggered_at')
+    current_triggered = current.get('webhook_triggered_at')
+    return bool(incoming_triggered and current_triggered and incoming_triggered > current_triggered)
+
+
+def _newer_than_stored(order):
+    """Q matching the stored row only if `order` is a newer version of it."""
+    if order.shopify_updated_at is None:
+        return models.Q()
+    newer = (
+        models.Q(shopify_updated_at__isnull=True)
+        | models.Q(shopify_updated_at__lt=order.shopify_updated_at)
+    )
+    if order.webhook_triggered_at is not None:
+        newer |= models.Q(
+            shopify_updated_at=order.shopify_updated_at,
+            webhook_triggered_at__lt=order.webhook_triggered_at,
+        )
+    return newer
+
+
+def hour_bucket(moment):
+    """Truncate an aware datetime to the start of its UTC hour, the rollup bucket."""
+    return moment.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def rollup_bucket():
+    """The hour_bucket of an order as a database expression, for aggregating in SQL."""
+    return TruncHour(Coalesce('placed_at', 'created_at'), tzinfo=timezone.utc)
+
+
+def _rollup_deltas(previous, orders):
+    """
+    Work out how writing `orders` changes the sales and customer rollups.
+
+    An order's shop and hour never change once stored, so an update only
+    moves its total (and, if the email changed, its customer); a new order
+    adds one to its hour and customer.
+
+    Args:
+        previous (dict): order_id -> (shop_domain, placed_at, created_at,
+            total_price, email) of the stored rows, read before the write
+        orders (list): The ShopifyWebhookOrder instances that were written
+
+    Returns:
+        tuple: (sales, customers), each a dict of rollup key -> [count, revenue]
+    """
+    sales = defaultdict(lambda: [0, Decimal(0)])
+    customers = defaultdict(lambda: [0, Decimal(0)])
+    for order in orders:
+        price = Decimal(order.total_price)
+        old = previous.get(order.order_id)
+        if old is None:
+            shop_domain = order.shop_domain
+            sales_key = (shop_domain, hour_bucket(order.placed_at or order.created_at))
+            sales[sales_key][0] += 1
+            sales[sales_key][1] += price
+        else:
+            shop_domain, placed_at, created_at, old_price, old_email = old
+            sales[(shop_domain, hour_bucket(placed_at or created_at))][1] += price - old_price
+            if old_email:
+                customers[(shop_domain, old_email)][0] -= 1
+                customers[(shop_domain, old_email)][1] -= old_price
+        if order.email:
+            customers[(shop_domain, order.email)][0] += 1
+            customers[(shop_domain, order.email)][1] += price
+    return (
+        {key: delta for key, delta in sales.items() if any(delta)},
+        {key: delta for key, delta in customers.items() if any(delta)},
+    )
+
+
+class ShopifyWebhookOrderQuerySet(models.QuerySet):
+    # Columns overwritten when a newer version of an existing order is upserted
+    UPSERT_FIELDS = [
+        'order_number', 'email', 'total_price', 'financial_status', 'currency',
+        'customer_id', 'line_item_count', 'shopify_updated_at', 'webhook_triggered_at',
+    ]
+
+    def bulk_upsert(self, order_dicts):
+        """
+        Insert or update many validated orders, skipping stale versions.
+
+        Orders are deduplicated by order_id first, keeping the newest version
+        (Shopify updated_at, then X-Shopify-Triggered-At; ties go to the later
+        entry). Each remaining order is then written only if the database has
+        no newer version of it, in one conditional upsert statement, so an old
+        delivery that arrives late is a no-op rather than an overwrite. The raw
+        payloads of the written orders are compressed into OrderPayload rows,
+        their search tokens and OrderLineItem rows are replaced, the SalesRollup and
+        CustomerRollup rows they affect are adjusted, and an OutboxEvent is queued
+        for each outbound destination, in the same transaction.
+
+        An order moved out by archive_orders is checked against its
+        ArchivedOrder tombstone instead: a version that is not newer than the
+        archived one is skipped as stale, a newer one is stored again (as an
+        update, not a new order) and its tombstone removed.
+
+        Args:
+            order_dicts (iterable): Dicts as returned by validate_order_data
+
+        Returns:
+            list: One ShopifyWebhookOrder per order_id. Orders that were not
+            written because a newer version is stored have stale=True and no pk.
+        """
+        latest = {}
+        for order_data in order_dicts:
+            current = latest.get(order_data['order_id'])
+            if current is not None and _is_older(order_data, current):
+                continue
+            latest[order_data['order_id']] = order_data
+
+        if not latest:
+            return []
+
+        orders = [
+            self.model(
+                order_id=order_data['order_id'],
+                order_number=order_data['order_number'],
+                email=order_data['email'],
+                total_price=order_data['total_price'],
+                financial_status=order_data.get('financial_status', ''),
+                currency=order_data.get('currency', ''),
+                customer_id=order_data.get('customer_id', ''),
+                line_item_count=order_data.get('line_item_count', 0),
+                shopify_updated_at=order_data.get('shopify_updated_at'),
+                webhook_triggered_at=order_data.get('webhook_triggered_at'),
+                shop_domain=order_data.get('shop_domain', ''),
+                placed_at=order_data.get('placed_at'),
+            )
+            for order_data in latest.values()
+        ]
+        connection = connections[self.db]
+        with transaction.atomic(using=self.db):
+            self._lock_for_write(connection, sorted(latest))
+            # Values the rollups currently count for these orders, which no
+            # other writer can change until this transaction ends
+            previous = {
+                row[0]: row[1:]
+                for row in self.select_for_update().filter(order_id__in=list(latest))
+                .order_by().values_list('order_id', 'shop_domain', 'placed_at', 'created_at', 'total_price', 'email')
+            }
+            archived = {}
+            unknown = [order_id for order_id in latest if order_id not in previous]
+            if unknown:
+                archived = {
+                    row['order_id']: row
+                    for row in ArchivedOrder.objects.using(self.db).filter(order_id__in=unknown)
+                    .values('order_id', 'shopify_updated_at', 'webhook_triggered_at')
+                }
+            candidates = [
+                order for order in orders
+                if order.order_id not in archived or _is_newer(latest[order.order_id], archived[order.order_id])
+            ]
+            if not candidates:
+                written = {}
+            elif connection.vendor in ('sqlite', 'postgresql') and connection.features.can_return_rows_from_bulk_insert:
+                written = self._upsert_if_newer(connection, candidates)
+            else:
+                written = self._update_if_newer(candidates)
+
+            saved = []
+            payloads = []
+            for order in orders:
+                order.pk = written.get(order.order_id)
+                order.stale = order.pk is None
+                order._raw_data = latest[order.order_id]['raw_data']
+                if order.stale:
+                    continue
+                saved.append(order)
+                blob = compress_payload(order._raw_data)
+                payloads.append(OrderPayload(order_id=order.pk, data=blob, size=len(blob)))
+            if payloads:
+                OrderPayload.objects.using(self.db).bulk_create(
+                    payloads,
+                    update_conflicts=True,
+                    unique_fields=['order'],
+                    update_fields=['data', 'encoding', 'size'],
+                )
+                new_order_ids = {order.order_id for order in saved if order.order_id not in previous}
+                restored = new_order_ids & archived.keys()
+                if restored:
+                    ArchivedOrder.objects.using(self.db).filter(order_id__in=restored).delete()
+                OrderSearchToken.objects.using(self.db).reindex(saved, new_order_ids)
+                OrderLineItem.objects.using(self.db).replace(saved, new_order_ids)
+                OutboxEvent.objects.using(self.db).record(saved, new_order_ids - restored)
+                sales, customers = _rollup_deltas(previous, saved)
+                SalesRollup.objects.using(self.db).increment(sales)
+                CustomerRollup.objects.using(self.db).increment(customers)
+                transaction.on_commit(
+                    lambda: orders_saved.send(sender=self.model, orders=saved),
+                    using=self.db,
+                )
+        return orders
+
+    def delete(self):
+        """Delete the orders and take them out of the rollups, in one transaction."""
+        with transaction.atomic(using=self.db):
+            self._lock_for_write(connections[self.db])
+            self._subtract_from_rollups()
+            transaction.on_commit(lambda: orders_deleted.send(sender=self.model), using=self.db)
+            return super().delete()
+
+    def _lock_for_write(self, connection, order_ids=()):
+        """
+        Keep other writers off these orders until the transaction ends, so the
+        rollup deltas computed from a read of them stay correct.
+
+        SQLite has no SELECT ... FOR UPDATE, and a transaction that read first
+        fails with "database is locked" instead of waiting if another
+        connection starts writing before it does; a write that matches no rows
+        takes the single write lock up front. On PostgreSQL, row locks cannot
+        cover an order that does not exist yet, so two deliveries of a new
+        order could both count it as an insert; a transaction-level advisory
+        lock per order_id, taken in sorted order, serializes them.
+        """
+        meta = self.model._meta
+        if connection.vendor == 'sqlite':
+            pk = connection.ops.quote_name(meta.pk.column)
+            with connection.cursor() as cursor:
+                cursor.execute(f"UPDATE {connection.ops.quote_name(meta.db_table)} SET {pk} = {pk} WHERE 0")
+        elif connection.vendor == 'postgresql' and order_ids:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT pg_advisory_xact_lock(hashtext(%s), hashtext(order_id))"
+                    " FROM (SELECT unnest(%s::text[]) AS order_id ORDER BY 1) AS ids",
+                    [meta.db_table, list(order_ids)],
+                )
+
+    def _subtract_from_rollups(self):
+        orders = self.order_by()
+        sales = {
+            (row['shop_domain'], row['bucket']): (-row['order_count'], -row['revenue'])
+            for row in orders.annotate(bucket=rollup_bucket())
+            .values('shop_domain', 'bucket')
+            .annotate(order_count=models.Count('id'), revenue=models.Sum('total_price'))
+        }
+        customers = {
+            (row['shop_domain'], row['email']): (-row['order_count'], -row['revenue'])
+            for row in orders.exclude(email__isnull=True).exclude(email='')
+            .values('shop_domain', 'email')
+            .annotate(order_count=models.Count('id'), revenue=models.Sum('total_price'))
+        }
+        SalesRollup.objects.using(self.db).increment(sales)
+        CustomerRollup.objects.using(self.db).increment(customers)
+
+    def _upsert_if_newer(self, connection, orders):
+        """
+        INSERT ... ON CONFLICT DO UPDATE ... WHERE <incoming is newer>, which
+        Django's bulk_create cannot express. RETURNING only yields the rows
+        that were inserted or updated.
+
+        Returns:
+            dict: order_id -> id of every order that was written
+        """
+        meta = self.model._meta
+        qn = connection.ops.quote_name
+        fields = [field for field in meta.concrete_fields if not field.primary_key]
+        table = qn(meta.db_table)
+        updated_at = qn(meta.get_field('shopify_updated_at').column)
+        triggered_at = qn(meta.get_field('webhook_triggered_at').column)
+        assignments = ', '.join(
+            f"{qn(column)} = EXCLUDED.{qn(column)}"
+            for column in (meta.get_field(name).column for name in self.UPSERT_FIELDS)
+        )
+        newer = (
+            f"{table}.{updated_at} IS NULL OR EXCLUDED.{updated_at} IS NULL"
+            f" OR EXCLUDED.{updated_at} > {table}.{updated_at}"
+            f" OR (EXCLUDED.{updated_at} = {table}.{updated_at}"
+            f" AND EXCLUDED.{triggered_at} > {table}.{triggered_at})"
+        )
+        placeholders = '(' + ', '.join(['%s'] * len(fields)) + ')'
+        batch_size = max(1, connection.ops.bulk_batch_size(fields, orders))
+
+        written = {}
+        with connection.cursor() as cursor:
+            for start in range(0, len(orders), batch_size):
+                batch = orders[start:start + batch_size]
+                params = [
+                    field.get_db_prep_save(field.pre_save(order, True), connection)
+                    for order in batch
+                    for field in fields
+                ]
+                cursor.execute(
+                    f"INSERT INTO {table} ({', '.join(qn(field.column) for field in fields)})"
+                    f" VALUES {', '.join([placeholders] * len(batch))}"
+                    f" ON CONFLICT ({qn(meta.get_field('order_id').column)}) DO UPDATE SET {assignments}"
+                    f" WHERE {newer}"
+                    f" RETURNING {qn(meta.pk.column)}, {qn(meta.get_field('order_id').column)}",
+                    params,
+                )
+                written.update((order_id, pk) for pk, order_id in cursor.fetchall())
+        return written
+
+    def _update_if_newer(self, orders):
+        """
+        Fallback for backends without upsert-with-condition (e.g. MySQL): one
+        conditional UPDATE per order, then insert the ones that do not exist.
+
+        Returns:
+            dict: order_id -> id of every order that was written
+        """
+        written = set()
+        missing = []
+        for order in orders:
+            values = {name: getattr(order, name) for name in self.UPSERT_FIELDS}
+            if self.filter(_newer_than_stored(order), order_id=order.order_id).update(**values):
+                written.add(order.order_id)
+            else:
+                missing.append(order)
+        if missing:
+            existing = set(
+                self.filter(order_id__in=[order.order_id for order in missing])
+                .values_list('order_id', flat=True)
+            )
+            new_orders = [order for order in missing if order.order_id not in existing]
+            self.bulk_create(new_orders, ignore_conflicts=True)
+            written.update(order.order_id for order in new_orders)
+        return dict(self.filter(order_id__in=written).values_list('order_id', 'id'))
+
 
 class ShopifyWebhookOrder(models.Model):
     order_id = models.CharField(max_length=100, unique=True)
     order_number = models.CharField(max_length=100)
     email = models.EmailField(null=True, blank=True)
     total_price = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
-    raw_data = models.JSONField()
+    # Promoted from the payload so they can be filtered without reading it
+    financial_status = models.CharField(max_length=50, blank=True, db_index=True)
+    currency = models.CharField(max_length=3, blank=True)
+    customer_id = models.CharField(max_length=50, blank=True, db_index=True)
+    line_item_count = models.PositiveIntegerField(default=0)
+    shopify_updated_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    # X-Shopify-Triggered-At of the delivery that wrote this version
+    webhook_triggered_at = models.DateTimeField(null=True, blank=True)
+    # Set on insert only: a Shopify order never moves shop or creation time
+    shop_domain = models.CharField(max_length=255, blank=True)
+    placed_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = ShopifyWebhookOrderQuerySet.as_manager()
+
+    # Set by bulk_upsert on orders it skipped because a newer version is stored
+    stale = False
+
     def __str__(self):
         return f"Order {self.order_number} - {self.email or 'No email'}"
 
+    def delete(self, using=None, keep_parents=False):
+        using = using or self._state.db
+        with transaction.atomic(using=using):
+            orders = type(self).objects.using(using).filter(pk=self.pk)
+            orders._lock_for_write(connections[using])
+            orders._subtract_from_rollups()
+            transaction.on_commit(lambda: orders_deleted.send(sender=type(self)), using=using)
+            return super().delete(using=using, keep_parents=keep_parents)
+
+    @property
+    def raw_data(self):
+        """The full Shopify payload, loaded and decompressed on first access."""
+        if not hasattr(self, '_raw_data'):
+            try:
+                self._raw_data = self.payload.decode()
+            except OrderPayload.DoesNotExist:
+                self._raw_data = {}
+        return self._raw_data
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination for the dashboard seeks on (created_at, id)
+            models.Index(fields=['-created_at', '-id'], name='order_created_id_idx'),
+        ]
         verbose_name = "Shopify Webhook Order"
         verbose_name_plural = "Shopify Webhook Orders"
+
+class OrderPayload(models.Model):
+    """Compressed raw Shopify payload of an order, kept out of the hot order rows."""
+
+    order = models.OneToOneField(
+        ShopifyWebhookOrder, on_delete=models.CASCADE, primary_key=True, related_name='payload',
+    )
+    data = models.BinaryField()
+    encoding = models.CharField(max_length=20, default=ENCODING_ZLIB_JSON)
+    size = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"Payload of order {self.order_id}"
+
+    def decode(self):
+        """Return the payload as a dict."""
+        return decompress_payload(self.data, self.encoding)
+
+    class Meta:
+        verbose_name = "Order Payload"
+        verbose_name_plural = "Order Payloads"
+
+
+class ArchivedOrder(models.Model):
+    """
+    Tombstone of an order that archive_orders moved out of the order table
+    into an archive file.
+
+    Keeps the archived version so webhooks for the order still resolve: a
+    redelivery that is not newer is skipped as stale instead of coming back
+    as a new order.
+    """
+
+    order_id = models.CharField(max_length=100, unique=True)
+    shop_domain = models.CharField(max_length=255, blank=True)
+    shopify_updated_at = models.DateTimeField(null=True, blank=True)
+    webhook_triggered_at = models.DateTimeField(null=True, blank=True)
+    # When the order was first stored; it is archived by this, not placed_at
+    created_at = models.DateTimeField()
+    # File name of the archive holding it, relative to SHOPIFY_ARCHIVE_DIR
+    archive = models.CharField(max_length=255)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Archived order {self.order_id} ({self.archive})"
+
+    class Meta:
+        ordering = ['-id']
+        verbose_name = "Archived Order"
+        verbose_name_plural = "Archived Orders"
+
+
+class WebhookInboxItem(models.Model):
+    """A verified webhook delivery waiting to be processed by the drain worker."""
+
+    STATUS_PENDING = 'pending'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    topic = models.CharField(max_length=100, blank=True)
+    shop_domain = models.CharField(max_length=255, blank=True)
+    webhook_id = models.CharField(max_length=100, blank=True)
+    headers = models.JSONField(default=dict)
+    body = models.BinaryField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Delivery {self.pk} ({self.topic or 'unknown topic'}) - {self.status}"
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'id'], name='inbox_status_id_idx'),
+        ]
+        verbose_name = "Webhook Inbox Item"
+        verbose_name_plural = "Webhook Inbox Items"
+
+class WebhookDelivery(models.Model):
+    """A webhook delivery id that has already been accepted, used to drop retries."""
+
+    webhook_id = models.CharField(max_length=100, primary_key=True)
+    seen_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"Delivery {self.webhook_id}"
+
+    class Meta:
+        verbose_name = "Webhook Delivery"
+        verbose_name_plural = "Webhook Deliveries"
+
+class ShopifyWebhookEvent(models.Model):
+    """A non-order webhook payload (refund, product, ...) stored as received."""
+
+    topic = models.CharField(max_length=100)
+    resource_id = models.CharField(max_length=100)
+    # Set for resources that belong to an order, e.g. refunds
+    order_id = models.CharField(max_length=100, blank=True, db_index=True)
+    data = models.BinaryField()
+    encoding = models.CharField(max_length=20, default=ENCODING_ZLIB_JSON)
+    received_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.topic} {self.resource_id}"
+
+    @property
+    def raw_data(self):
+        """The full Shopify payload."""
+        return decompress_payload(self.data, self.encoding)
+
+    class Meta:
+        ordering = ['-received_at']
+        indexes = [
+            models.Index(fields=['topic', 'resource_id'], name='event_topic_resource_idx'),
+        ]
+        verbose_name = "Shopify Webhook Event"
+        verbose_name_plural = "Shopify Webhook Events"
+
+class RollupQuerySet(models.QuerySet):
+
+    def increment(self, deltas):
+        """
+        Add count and revenue deltas to rollup rows, creating missing rows.
+
+        On SQLite and PostgreSQL this is one INSERT ... ON CONFLICT DO UPDATE
+        adding to the stored values per batch, so concurrent writers never
+        overwrite each other's increments. Other backends get an UPDATE per
+        key and an INSERT for the keys that had no row.
+
+        Args:
+            deltas (dict): Tuple of the model's KEY_FIELDS values -> (count, revenue)
+        """
+        if not deltas:
+            return
+        key_fields = self.model.KEY_FIELDS
+        connection = connections[self.db]
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            for key, (count, revenue) in deltas.items():
+                lookup = dict(zip(key_fields, key))
+                increments = {'order_count': models.F('order_count') + count, 'revenue': models.F('revenue') + revenue}
+                if self.filter(**lookup).update(**increments):
+                    continue
+                try:
+                    with transaction.atomic(using=self.db):
+                        self.create(order_count=count, revenue=revenue, **lookup)
+                except IntegrityError:
+                    # Another writer created the row first
+                    self.filter(**lookup).update(**increments)
+            return
+
+        meta = self.model._meta
+        qn = connection.ops.quote_name
+        table = qn(meta.db_table)
+        fields = [meta.get_field(name) for name in (*key_fields, 'order_count', 'revenue')]
+        placeholders = '(' + ', '.join(['%s'] * len(fields)) + ')'
+        rows = [(*key, count, revenue) for key, (count, revenue) in deltas.items()]
+        batch_size = max(1, connection.ops.bulk_batch_size(fields, rows))
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start:start + batch_size]
+                cursor.execute(
+                    f"INSERT INTO {table} ({', '.join(qn(field.column) for field in fields)})"
+                    f" VALUES {', '.join([placeholders] * len(batch))}"
+                    f" ON CONFLICT ({', '.join(qn(meta.get_field(name).column) for name in key_fields)})"
+                    f" DO UPDATE SET order_count = {table}.order_count + EXCLUDED.order_count,"
+                    f" revenue = {table}.revenue + EXCLUDED.revenue",
+                    [
+                        field.get_db_prep_save(value, connection)
+                        for row in batch
+                        for field, value in zip(fields, row)
+                    ],
+                )
+
+
+class SalesRollup(models.Model):
+    """Order count and total_price sum per shop per UTC hour, kept up to date by bulk_upsert."""
+
+    KEY_FIELDS = ('shop_domain', 'bucket')
+
+    shop_domain = models.CharField(max_length=255, blank=True)
+    # Start of the hour the orders were placed in (Shopify created_at, else when first received)
+    bucket = models.DateTimeField()
+    order_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    objects = RollupQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.shop_domain or 'unknown shop'} {self.bucket:%Y-%m-%d %H:00}"
+
+    class Meta:
+        ordering = ['-bucket']
+        constraints = [
+            models.UniqueConstraint(fields=['shop_domain', 'bucket'], name='sales_rollup_shop_bucket_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['bucket'], name='sales_rollup_bucket_idx'),
+        ]
+        verbose_name = "Sales Rollup"
+        verbose_name_plural = "Sales Rollups"
+
+class CustomerRollup(models.Model):
+    """Order count and total_price sum per shop per customer email."""
+
+    KEY_FIELDS = ('shop_domain', 'email')
+
+    shop_domain = models.CharField(max_length=255, blank=True)
+    email = models.EmailField()
+    order_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    objects = RollupQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.email} ({self.shop_domain or 'unknown shop'})"
+
+    class Meta:
+        ordering = ['-revenue']
+        constraints = [
+            models.UniqueConstraint(fields=['shop_domain', 'email'], name='customer_rollup_shop_email_uniq'),
+        ]
+        indexes = [
+            # Top customers reads the first rows of this index
+            models.Index(fields=['-revenue'], name='customer_rollup_revenue_idx'),
+        ]
+        verbose_name = "Customer Rollup"
+        verbose_name_plural = "Customer Rollups"
+
+
+class OrderSearchTokenQuerySet(models.QuerySet):
+
+    def reindex(self, orders, new_order_ids=()):
+        """
+        Replace the search tokens of orders with those of their current payload.
+
+        Orders typically carry a dozen tokens each, so rows are written with
+        one executemany instead of building a model instance per token.
+
+        Args:
+            orders (list): Saved ShopifyWebhookOrder instances with raw_data loaded
+            new_order_ids (set): order_ids just inserted, which have no tokens to delete
+        """
+        replaced = [order.pk for order in orders if order.order_id not in new_order_ids]
+        if replaced:
+            self.filter(order__in=replaced).delete()
+        rows = [
+            (order.pk, field, token)
+            for order in orders
+            for field, token in extract_search_tokens(order.raw_data)
+        ]
+        if not rows:
+            return
+        connection = connections[self.db]
+        meta = self.model._meta
+        qn = connection.ops.quote_name
+        columns = ', '.join(qn(meta.get_field(name).column) for name in ('order', 'field', 'token'))
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {qn(meta.db_table)} ({columns}) VALUES (%s, %s, %s)", rows,
+            )
+
+
+class OrderSearchToken(models.Model):
+    """
+    Inverted index over order payloads: one row per searchable word or
+    identifier of an order (SKU, email, customer name, tag, discount code...).
+    """
+
+    order = models.ForeignKey(ShopifyWebhookOrder, on_delete=models.CASCADE, related_name='search_tokens')
+    field = models.CharField(max_length=20)
+    token = models.CharField(max_length=100)
+
+    objects = OrderSearchTokenQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.field}:{self.token}"
+
+    class Meta:
+        indexes = [
+            # Exact and prefix lookups seek on token and read order ids from the index
+            models.Index(fields=['token', 'field', 'order'], name='search_token_idx'),
+        ]
+        verbose_name = "Order Search Token"
+        verbose_name_plural = "Order Search Tokens"
+
+
+class OrderLineItemQuerySet(models.QuerySet):
+
+    def replace(self, orders, new_order_ids=()):
+        """
+        Replace the line item rows of orders with those of their current payload.
+
+        Only these orders' rows are touched; like search tokens they are
+        written with one executemany.
+
+        Args:
+            orders (list): Saved ShopifyWebhookOrder instances with raw_data loaded
+            new_order_ids (set): order_ids just inserted, which have no rows to delete
+        """
+        replaced = [order.pk for order in orders if order.order_id not in new_order_ids]
+        if replaced:
+            self.filter(order__in=replaced).delete()
+        fields = (
+            'position', 'line_item_id', 'product_id', 'variant_id', 'sku', 'title',
+            'quantity', 'price', 'total_discount',
+        )
+        rows = [
+            (order.pk, *(item[name] for name in fields))
+            for order in orders
+            for item in extract_line_items(order.raw_data)
+        ]
+        if not rows:
+            return
+        connection = connections[self.db]
+        meta = self.model._meta
+        qn = connection.ops.quote_name
+        columns = ', '.join(qn(meta.get_field(name).column) for name in ('order', *fields))
+        placeholders = ', '.join(['%s'] * (len(fields) + 1))
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {qn(meta.db_table)} ({columns}) VALUES ({placeholders})", rows,
+            )
+
+
+class OrderLineItem(models.Model):
+    """
+    One line item of an order, normalized out of its payload so units and
+    revenue per SKU or product can be aggregated without decoding payloads.
+    """
+
+    order = models.ForeignKey(ShopifyWebhookOrder, on_delete=models.CASCADE, related_name='line_items')
+    position = models.PositiveSmallIntegerField()
+    line_item_id = models.CharField(max_length=50, blank=True)
+    product_id = models.CharField(max_length=50, blank=True)
+    variant_id = models.CharField(max_length=50, blank=True)
+    sku = models.CharField(max_length=255, blank=True)
+    title = models.CharField(max_length=255, blank=True)
+    quantity = models.PositiveIntegerField(default=0)
+    # Unit price; the line total is price * quantity - total_discount
+    price = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    total_discount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+
+    objects = OrderLineItemQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.quantity} x {self.sku or self.title}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['order', 'position'], name='line_item_order_position_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['sku'], name='line_item_sku_idx'),
+            models.Index(fields=['product_id'], name='line_item_product_idx'),
+        ]
+        verbose_name = "Order Line Item"
+        verbose_name_plural = "Order Line Items"
+
+
+def _order_event_data(order):
+    """The order fields sent to downstream consumers with an outbox event."""
+    return {
+        'order_id': order.order_id,
+        'order_number': order.order_number,
+        'shop_domain': order.shop_domain,
+        'email': order.email,
+        'total_price': str(order.total_price),
+        'currency': order.currency,
+        'financial_status': order.financial_status,
+        'customer_id': order.customer_id,
+        'placed_at': order.placed_at.isoformat() if order.placed_at else None,
+        # Shopify's version of the order; events for one order can arrive out of order
+        'updated_at': order.shopify_updated_at.isoformat() if order.shopify_updated_at else None,
+        'line_items': [
+            {
+                'sku': item['sku'], 'title': item['title'], 'quantity': item['quantity'],
+                'price': str(item['price']), 'total_discount': str(item['total_discount']),
+            }
+            for item in extract_line_items(order.raw_data)
+        ],
+    }
+
+
+class OutboxEventQuerySet(models.QuerySet):
+
+    def record(self, orders, new_order_ids=()):
+        """
+        Queue an order.created or order.updated event per order for every
+        destination in SHOPIFY_OUTBOX_DESTINATIONS.
+
+        Called inside the transaction that saves the orders, so an event
+        exists exactly when its order version was committed.
+
+        Args:
+            orders (list): Saved ShopifyWebhookOrder instances with raw_data loaded
+            new_order_ids (set): order_ids that were just inserted
+        """
+        destinations = sorted(settings.SHOPIFY_OUTBOX_DESTINATIONS)
+        if not destinations or not orders:
+            return
+        events = []
+        for order in orders:
+            event_type = 'order.created' if order.order_id in new_order_ids else 'order.updated'
+            data = _order_event_data(order)
+            events.extend(
+                self.model(destination=name, event_type=event_type, order_id=order.order_id, data=data)
+                for name in destinations
+            )
+        self.bulk_create(events)
+
+
+class OutboxEvent(models.Model):
+    """
+    An order event waiting to be sent to one downstream destination (ERP,
+    fulfilment, email...). Written in the same transaction as the order and
+    delivered later by the outbox dispatcher, at least once.
+    """
+
+    STATUS_PENDING = 'pending'
+    STATUS_DONE = 'done'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_DONE, 'Done'),
+    ]
+
+    destination = models.CharField(max_length=100)
+    event_type = models.CharField(max_length=50)
+    order_id = models.CharField(max_length=100)
+    data = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    # Not sent before this moment: backoff after a failure, or the lease of a
+    # dispatcher that has claimed the event
+    next_attempt_at = models.DateTimeField(default=timezone_now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+
+    objects = OutboxEventQuerySet.as_manager()
+
+    def __str__(self):
+        return f"{self.event_type} {self.order_id} -> {self.destination} ({self.status})"
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['destination', 'status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+        verbose_name = "Outbox Event"
+        verbose_name_plural = "Outbox Events"
+
+
+class DeadLetterEvent(models.Model):
+    """An outbox event that failed on every attempt and was given up on."""
+
+    destination = models.CharField(max_length=100)
+    event_type = models.CharField(max_length=50)
+    order_id = models.CharField(max_length=100)
+    data = models.JSONField()
+    attempts = models.PositiveIntegerField()
+    last_error = models.TextField(blank=True)
+    # When the original event was written, and when it was given up on
+    created_at = models.DateTimeField()
+    failed_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.event_type} {self.order_id} -> {self.destination} (dead)"
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['destination', 'failed_at'], name='dead_letter_dest_idx'),
+        ]
+        verbose_name = "Dead Letter Event"
+        verbose_name_plural = "Dead Letter Events"
@@ -0,0 +1,385 @@
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import timedelta
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.db import close_old_connections, connection, connections, transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+from .instrumentation import REGISTRY, log_event
+from .models import DeadLetterEvent, OutboxEvent
+
+OUTBOX_SENT = REGISTRY.counter(
+    'shopify_outbox_events_total',
+    'Outbox events handled by this dispatcher, by destination and result',
+    ['destination', 'result'],
+)
+OUTBOX_POST_SECONDS = REGISTRY.histogram(
+    'shopify_outbox_post_seconds',
+    'Time taken by one batched POST to a destination',
+    ['destination'],
+)
+
+# Statuses worth retrying; any other 4xx means the request itself is rejected
+RETRYABLE_STATUSES = frozenset({408, 409, 425, 429})
+
+
+@dataclass
+class Destination:
+    """
+    A downstream consumer of order events, from SHOPIFY_OUTBOX_DESTINATIONS.
+
+    Attributes:
+        name (str): Key in SHOPIFY_OUTBOX_DESTINATIONS, stored on each event
+        url (str): Endpoint that batches of events are POSTed to
+        secret (str): If set, each request carries X-Outbox-Hmac-Sha256, the
+            base64 HMAC-SHA256 of the body, like Shopify's own webhooks
+        headers (dict): Extra request headers, e.g. an Authorization token
+        batch_size (int): Most events per request
+        concurrency (int): Requests in flight at once, and pooled connections
+        timeout (float): Seconds to wait for a response
+    """
+    name: str
+    url: str
+    secret: str = ''
+    headers: dict = field(default_factory=dict)
+    batch_size: int = 50
+    concurrency: int = 2
+    timeout: float = 10.0
+
+    def __post_init__(self):
+        if not self.url.startswith(('http://', 'https://')):
+            raise ValueError(f"Outbox destination {self.name!r} needs an http(s) url")
+        if self.batch_size < 1 or self.concurrency < 1:
+            raise ValueError(f"Outbox destination {self.name!r}: batch_size and concurrency must be at least 1")
+
+
+def configured_destinations():
+    """
+    Destinations from SHOPIFY_OUTBOX_DESTINATIONS.
+
+    Raises:
+        ValueError: If a destination is misconfigured
+    """
+    return [
+        Destination(name=name, **options)
+        for name, options in sorted(settings.SHOPIFY_OUTBOX_DESTINATIONS.items())
+    ]
+
+
+@dataclass
+class DispatchResult:
+    """Outcome of a single DestinationSender.dispatch_once() call."""
+    claimed: int = 0
+    delivered: int = 0
+    retried: int = 0
+    dead: int = 0
+    seconds: float = 0.0
+
+    @property
+    def throughput(self):
+        """Delivered events per second for this round."""
+        return self.delivered / self.seconds if self.seconds else 0.0
+
+
+def backoff_seconds(attempts, base=None, cap=None):
+    """
+    Delay before retrying an event that has failed `attempts` times.
+
+    Exponential (base, 2 * base, 4 * base...) up to cap, with jitter so
+    events that failed together do not all retry in the same instant.
+    """
+    base = settings.SHOPIFY_OUTBOX_BACKOFF_SECONDS if base is None else base
+    cap = settings.SHOPIFY_OUTBOX_MAX_BACKOFF_SECONDS if cap is None else cap
+    return min(cap, base * 2 ** max(attempts - 1, 0)) * random.uniform(0.5, 1.0)
+
+
+def claim_events(destination, limit, lease_seconds):
+    """
+    Claim up to limit due events for a destination, oldest first.
+
+    The claim is a lease: next_attempt_at is pushed lease_seconds ahead so
+    other dispatchers skip the events while they are being sent. If this
+    dispatcher dies, they become due again when the lease runs out.
+
+    Returns:
+        list: The claimed OutboxEvent rows
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        queryset = OutboxEvent.objects.filter(
+            destination=destination, status=OutboxEvent.STATUS_PENDING, next_attempt_at__lte=now,
+        ).order_by('id')
+        if connection.features.has_select_for_update_skip_locked:
+            queryset = queryset.select_for_update(skip_locked=True)
+        events = list(queryset[:limit])
+        if events:
+            OutboxEvent.objects.filter(id__in=[event.id for event in events]).update(
+                next_attempt_at=now + timedelta(seconds=lease_seconds),
+            )
+    return events
+
+
+class DestinationSender:
+    """
+    Sends one destination's events: a keep-alive session whose connection
+    pool matches the destination's concurrency, and that many sender threads.
+    """
+
+    def __init__(self, destination):
+        self.destination = destination
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=destination.concurrency)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({'Content-Type': 'application/json', **destination.headers})
+        self.executor = ThreadPoolExecutor(
+            max_workers=destination.concurrency, thread_name_prefix=f"outbox-{destination.name}",
+        )
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.session.close()
+
+    def body(self, events):
+        """JSON request body for a batch of events."""
+        return json.dumps({
+            'destination': self.destination.name,
+            'events': [
+                {
+                    'id': event.id,
+                    'type': event.event_type,
+                    'order_id': event.order_id,
+                    'created_at': event.created_at.isoformat(),
+                    'attempt': event.attempts + 1,
+                    'data': event.data,
+                }
+                for event in events
+            ],
+        }, separators=(',', ':')).encode('utf-8')
+
+    def post(self, events):
+        """
+        POST one batch.
+
+        Returns:
+            tuple: (error, retryable); error is None when the batch was accepted
+        """
+        body = self.body(events)
+        headers = {}
+        if self.destination.secret:
+            digest = hmac.new(self.destination.secret.encode('utf-8'), body, hashlib.sha256).digest()
+            headers['X-Outbox-Hmac-Sha256'] = base64.b64encode(digest).decode()
+        started = time.perf_counter()
+        try:
+            response = self.session.post(self.destination.url, data=body, headers=headers,
+                                         timeout=self.destination.timeout)
+        except requests.RequestException as e:
+            return f"{type(e).__name__}: {e}", True
+        finally:
+            OUTBOX_POST_SECONDS.observe(time.perf_counter() - started, destination=self.destination.name)
+        if response.status_code < 300:
+            return None, False
+        retryable = response.status_code >= 500 or response.status_code in RETRYABLE_STATUSES
+        return f"HTTP {response.status_code}: {response.text[:200]}", retryable
+
+    def dispatch_once(self, max_attempts=None):
+        """
+        Claim due events, send them in concurrent batches and record the outcome.
+
+        Delivered events are marked done. Failed ones are retried with
+        exponential backoff until they have been attempted max_attempts
+        times, or straight away moved to the dead-letter table if the
+        destination rejected them with a non-retryable 4xx.
+
+        Args:
+            max_attempts (int): Default SHOPIFY_OUTBOX_MAX_ATTEMPTS
+
+        Returns:
+            DispatchResult: Counts and timing for the round
+        """
+        max_attempts = max_attempts or settings.SHOPIFY_OUTBOX_MAX_ATTEMPTS
+        destination = self.destination
+        result = DispatchResult()
+        started = time.perf_counter()
+        # Long enough for every batch to time out once before the lease ends
+        lease = destination.timeout * 2 + 30
+        events = claim_events(destination.name, destination.batch_size * destination.concurrency, lease)
+        result.claimed = len(events)
+        if not events:
+            return result
+
+        batches = [events[i:i + destination.batch_size] for i in range(0, len(events), destination.batch_size)]
+        outcomes = list(self.executor.map(self.post, batches))
+
+        now = timezone.now()
+        delivered, retry, dead = [], [], []
+        for batch, (error, retryable) in zip(batches, outcomes):
+            for event in batch:
+                event.attempts += 1
+                if error is None:
+                    delivered.append(event.id)
+                    continue
+                event.last_error = error
+                if retryable and event.attempts < max_attempts:
+                    event.next_attempt_at = now + timedelta(seconds=backoff_seconds(event.attempts))
+                    retry.append(event)
+                else:
+                    dead.append(event)
+            if error is not None:
+                log_event(logging.WARNING, 'outbox.post_failed', destination=destination.name,
+                          events=len(batch), error=error, retryable=retryable)
+
+        with transaction.atomic():
+            if delivered:
+                OutboxEvent.objects.filter(id__in=delivered).update(
+                    status=OutboxEvent.STATUS_DONE, attempts=F('attempts') + 1, last_error='', delivered_at=now,
+                )
+            if retry:
+                OutboxEvent.objects.bulk_update(retry, ['attempts', 'last_error', 'next_attempt_at'])
+            if dead:
+                DeadLetterEvent.objects.bulk_create([
+                    DeadLetterEvent(
+                        destination=event.destination, event_type=event.event_type, order_id=event.order_id,
+                        data=event.data, attempts=event.attempts, last_error=event.last_error,
+                        created_at=event.created_at,
+                    )
+                    for event in dead
+                ])
+                OutboxEvent.objects.filter(id__in=[event.id for event in dead]).delete()
+
+        result.delivered, result.retried, result.dead = len(delivered), len(retry), len(dead)
+        result.seconds = time.perf_counter() - started
+        OUTBOX_SENT.inc(result.delivered, destination=destination.name, result='delivered')
+        OUTBOX_SENT.inc(result.retried, destination=destination.name, result='retried')
+        OUTBOX_SENT.inc(result.dead, destination=destination.name, result='dead')
+        log_event(
+            logging.DEBUG, 'outbox.dispatched', destination=destination.name, claimed=result.claimed,
+            delivered=result.delivered, retried=result.retried, dead=result.dead,
+            seconds=round(result.seconds, 4),
+        )
+        return result
+
+
+def _destination_loop(sender, stop, poll_interval, max_attempts, on_result):
+    try:
+        while not stop.is_set():
+            close_old_connections()
+            try:
+                result = sender.dispatch_once(max_attempts)
+            except Exception as e:
+                log_event(logging.ERROR, 'outbox.dispatch_failed', destination=sender.destination.name, error=str(e))
+                stop.wait(poll_interval)
+                continue
+            if result.claimed and on_result:
+                on_result(sender.destination, result)
+            # Keep going while there is work; back off when idle or when
+            # nothing in the round got through
+            if not result.claimed or not result.delivered:
+                stop.wait(poll_interval)
+    finally:
+        sender.close()
+        connections.close_all()
+
+
+def run_dispatcher(stop, destinations=None, poll_interval=1.0, max_attempts=None, on_result=None):
+    """
+    Deliver outbox events until stop is set, one loop thread per destination
+    so a slow or failing consumer never holds up the others.
+
+    Args:
+        stop (threading.Event): Set to shut down; in-flight batches finish first
+        destinations (list): Default configured_destinations()
+        poll_interval (float): Seconds to wait when a destination has nothing due
+        max_attempts (int): Default SHOPIFY_OUTBOX_MAX_ATTEMPTS
+        on_result (callable): Called with (destination, DispatchResult) after
+            every round that claimed events, from the loop threads
+    """
+    destinations = configured_destinations() if destinations is None else destinations
+    threads = [
+        threading.Thread(
+            target=_destination_loop, name=f"outbox-{destination.name}-loop",
+            args=(DestinationSender(destination), stop, poll_interval, max_attempts, on_result),
+        )
+        for destination in destinations
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def requeue_dead_letters(destination=None):
+    """
+    Move dead-lettered events back into the outbox for another round of attempts.
+
+    Args:
+        destination (str): Only this destination's events; all by default
+
+    Returns:
+        int: Number of events requeued
+    """
+    with transaction.atomic():
+        dead = DeadLetterEvent.objects.select_for_update().order_by('id')
+        if destination:
+            dead = dead.filter(destination=destination)
+        dead = list(dead)
+        OutboxEvent.objects.bulk_create([
+            OutboxEvent(destination=event.destination, event_type=event.event_type,
+                        order_id=event.order_id, data=event.data)
+            for event in dead
+        ])
+        DeadLetterEvent.objects.filter(id__in=[event.id for event in dead]).delete()
+    return len(dead)
+
+
+def purge_outbox(older_than):
+    """
+    Delete delivered events created before now - older_than.
+
+    Returns:
+        int: Number of deleted rows
+    """
+    deleted, _ = OutboxEvent.objects.filter(
+        status=OutboxEvent.STATUS_DONE, created_at__lt=timezone.now() - older_than,
+    ).delete()
+    return deleted
+
+
+def outbox_stats():
+    """Pending, delivered and dead-lettered events per destination."""
+    now = timezone.now()
+    stats = {}
+    rows = (
+        OutboxEvent.objects.order_by().values_list('destination', 'status')
+        .annotate(total=Count('id'), oldest=Min('created_at'))
+    )
+    for name, status, total, oldest in rows:
+        entry = stats.setdefault(name, {'pending': 0, 'done': 0, 'dead': 0, 'oldest_pending_age_seconds': 0.0})
+        entry[status] = total
+        if status == OutboxEvent.STATUS_PENDING:
+            entry['oldest_pending_age_seconds'] = (now - oldest).total_seconds()
+    for name, total in DeadLetterEvent.objects.order_by().values_list('destination').annotate(total=Count('id')):
+        stats.setdefault(name, {'pending': 0, 'done': 0, 'dead': 0, 'oldest_pending_age_seconds': 0.0})
+        stats[name]['dead'] = total
+    return stats
+
+
+def _pending_depth():
+    return OutboxEvent.objects.filter(status=OutboxEvent.STATUS_PENDING).count()
+
+
+REGISTRY.gauge(
+    'shopify_outbox_pending',
+    'Outbox events waiting to be delivered',
+    _pending_depth,
+)
@@ -0,0 +1,190 @@
+import json
+import re
+import zlib
+from decimal import Decimal, InvalidOperation
+from django.utils.dateparse import parse_datetime
+
+# Identifies how OrderPayload.data was encoded so the format can change later
+ENCODING_ZLIB_JSON = 'zlib+json'
+
+# Search tokens: longest token stored, and most tokens kept per order
+SEARCH_TOKEN_LENGTH = 100
+MAX_SEARCH_TOKENS = 300
+_WORD = re.compile(r'\w+')
+
+# Line items: most rows kept per order, and the largest amount a price column holds
+MAX_LINE_ITEMS = 1000
+_MAX_AMOUNT = Decimal('99999999.99')
+
+
+def compress_payload(data, level=6):
+    """
+    Serialize an order payload to compact JSON and zlib-compress it.
+
+    Args:
+        data (dict): The raw Shopify order payload
+        level (int): zlib compression level
+
+    Returns:
+        bytes: The compressed payload
+    """
+    return zlib.compress(json.dumps(data, separators=(',', ':')).encode('utf-8'), level)
+
+
+def decompress_payload(blob, encoding=ENCODING_ZLIB_JSON):
+    """
+    Inverse of compress_payload.
+
+    Raises:
+        ValueError: If the encoding is unknown
+    """
+    if encoding != ENCODING_ZLIB_JSON:
+        raise ValueError(f"Unknown payload encoding: {encoding}")
+    return json.loads(zlib.decompress(bytes(blob)))
+
+
+def parse_shopify_datetime(value):
+    """
+    Parse an ISO 8601 timestamp from a payload or header, e.g. updated_at or
+    X-Shopify-Triggered-At (nanosecond fractions are truncated).
+
+    Returns:
+        datetime: The parsed value, or None if it is missing or malformed
+    """
+    if not isinstance(value, str):
+        return None
+    try:
+        return parse_datetime(value)
+    except ValueError:
+        return None
+
+
+def extract_order_columns(data):
+    """
+    Pull the fields the app filters and displays out of an order payload.
+
+    Args:
+        data (dict): The raw Shopify order payload
+
+    Returns:
+        dict: Values for the promoted ShopifyWebhookOrder columns
+    """
+    customer = data.get('customer')
+    line_items = data.get('line_items')
+    return {
+        'financial_status': str(data.get('financial_status') or '')[:50],
+        'currency': str(data.get('currency') or '')[:3],
+        'customer_id': (
+            str(customer.get('id') or '')[:50] if isinstance(customer, dict) else ''
+        ),
+        'line_item_count': len(line_items) if isinstance(line_items, list) else 0,
+        'shopify_updated_at': parse_shopify_datetime(data.get('updated_at')),
+        'placed_at': parse_shopify_datetime(data.get('created_at')),
+    }
+
+
+def _search_words(value):
+    # Single letters (sizes, initials) would match half the table
+    return [word for word in _WORD.findall(str(value).lower()) if len(word) > 1] if value else []
+
+
+def extract_search_tokens(data):
+    """
+    Pull searchable (field, token) pairs out of an order payload.
+
+    Identifiers such as SKUs, emails, tags and discount codes are kept whole,
+    lowercased, so a search for 'abc-12' finds the SKU 'ABC-12'. Names and
+    product titles are split into words. Fields are: number, email, customer,
+    sku, product, tag and discount.
+
+    Args:
+        data (dict): The raw Shopify order payload
+
+    Returns:
+        set: (field, token) pairs, at most MAX_SEARCH_TOKENS of them
+    """
+    tokens = set()
+
+    def add(field, value):
+        token = str(value).strip().lower()[:SEARCH_TOKEN_LENGTH] if value is not None else ''
+        if token:
+            tokens.add((field, token))
+
+    add('number', data.get('order_number'))
+    add('number', str(data.get('name') or '').lstrip('#'))
+    add('email', data.get('email'))
+    addresses = [data.get('billing_address'), data.get('shipping_address')]
+    customer = data.get('customer')
+    if isinstance(customer, dict):
+        add('email', customer.get('email'))
+        addresses.insert(0, customer)
+    for person in addresses:
+        if isinstance(person, dict):
+            for word in _search_words(person.get('first_name')) + _search_words(person.get('last_name')):
+                add('customer', word)
+    tags = data.get('tags')
+    if isinstance(tags, str):
+        for tag in tags.split(','):
+            add('tag', tag)
+    for discount in data.get('discount_codes') or ():
+        if isinstance(discount, dict):
+            add('discount', discount.get('code'))
+    line_items = data.get('line_items')
+    for item in line_items if isinstance(line_items, list) else ():
+        if isinstance(item, dict):
+            add('sku', item.get('sku'))
+            for word in _search_words(item.get('title')):
+                add('product', word)
+    if len(tokens) > MAX_SEARCH_TOKENS:
+        # Identifiers first, then the shortest words, so a huge order keeps what matters
+        tokens = set(sorted(tokens, key=lambda pair: (pair[0] == 'product', len(pair[1]), pair))[:MAX_SEARCH_TOKENS])
+    return tokens
+
+
+def _amount(value):
+    # Malformed or out-of-range money becomes 0 rather than failing the order
+    try:
+        amount = Decimal(value if isinstance(value, (str, int)) else str(value)).quantize(Decimal('0.01'))
+    except (InvalidOperation, TypeError, ValueError):
+        return Decimal('0.00')
+    return amount if amount.is_finite() and abs(amount) <= _MAX_AMOUNT else Decimal('0.00')
+
+
+def _quantity(value):
+    try:
+        return max(int(value), 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def extract_line_items(data):
+    """
+    Pull the line items out of an order payload as OrderLineItem values.
+
+    Args:
+        data (dict): The raw Shopify order payload
+
+    Returns:
+        list: Dicts with position, line_item_id, product_id, variant_id, sku,
+        title, quantity, price (unit) and total_discount, in payload order, at
+        most MAX_LINE_ITEMS of them
+    """
+    line_items = data.get('line_items')
+    rows = []
+    for item in line_items if isinstance(line_items, list) else ():
+        if not isinstance(item, dict):
+            continue
+        rows.append({
+            'position': len(rows),
+            'line_item_id': str(item.get('id') or '')[:50],
+            'product_id': str(item.get('product_id') or '')[:50],
+            'variant_id': str(item.get('variant_id') or '')[:50],
+            'sku': str(item.get('sku') or '')[:255],
+            'title': str(item.get('title') or '')[:255],
+            'quantity': _quantity(item.get('quantity')),
+            'price': _amount(item.get('price')),
+            'total_discount': _amount(item.get('total_discount')),
+        })
+        if len(rows) >= MAX_LINE_ITEMS:
+            break
+    return rows
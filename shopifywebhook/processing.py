@@ -0,0 +1,105 @@
+import logging
+from decimal import Decimal
+from .instrumentation import log_event
+from .models import ShopifyWebhookOrder
+from .payloads import extract_order_columns
+
+REQUIRED_FIELDS = ('id', 'order_number', 'total_price')
+
+
+def _clean_text(value):
+    text = str(value).strip()
+    if not text:
+        raise ValueError("cannot be empty")
+    return text
+
+
+# The largest total_price the column holds and its smallest unit (99999999.99 and 0.01)
+_PRICE_FIELD = ShopifyWebhookOrder._meta.get_field('total_price')
+_CENTS = Decimal(1).scaleb(-_PRICE_FIELD.decimal_places)
+_MAX_PRICE = Decimal(10) ** (_PRICE_FIELD.max_digits - _PRICE_FIELD.decimal_places) - _CENTS
+
+
+def _clean_price(value):
+    # Shopify sends prices as strings; floats go through str() to avoid binary noise
+    price = Decimal(value if isinstance(value, (str, int)) else str(value))
+    if not price.is_finite():
+        raise ValueError("must be a finite number")
+    if price < 0:
+        raise ValueError("cannot be negative")
+    # Anything the column cannot hold would be stored but fail every later read
+    if price > _MAX_PRICE:
+        raise ValueError(f"cannot exceed {_MAX_PRICE}")
+    return price.quantize(_CENTS)
+
+
+def _clean_email(value):
+    if not value:
+        return None
+    email = str(value).strip()
+    if '@' not in email:
+        raise ValueError("Invalid email format")
+    return email
+
+
+def _clean_line_items(value):
+    if value is not None and not isinstance(value, list):
+        raise ValueError(f"expected a list, got {type(value).__name__}")
+    return value
+
+
+# (output key, payload key, cleaner, error label), checked in a single pass
+ORDER_SCHEMA = (
+    ('order_id', 'id', _clean_text, 'Invalid order ID'),
+    ('order_number', 'order_number', _clean_text, 'Invalid order number'),
+    ('total_price', 'total_price', _clean_price, 'Invalid total price'),
+    ('email', 'email', _clean_email, 'Invalid email'),
+    (None, 'line_items', _clean_line_items, 'Invalid line items'),
+)
+
+
+def validate_order_data(data):
+    """
+    Validate and clean order data from Shopify webhook.
+    
+    Args:
+        data (dict): Raw order data from Shopify webhook
+        
+    Returns:
+        dict: Cleaned and validated order data
+        
+    Raises:
+        ValueError: If required fields are missing or invalid
+    """
+    if not isinstance(data, dict):
+        raise ValueError(f"Expected dictionary, got {type(data)}")
+
+    missing_fields = [field for field in REQUIRED_FIELDS if not data.get(field)]
+    if missing_fields:
+        raise ValueError(f"Missing required fields: {', '.join(missing_fields)}")
+
+    order_data = {}
+    for key, source, clean, label in ORDER_SCHEMA:
+        try:
+            value = clean(data.get(source))
+        except (TypeError, ValueError, ArithmeticError) as e:
+            log_event(logging.WARNING, 'order.validation_failed', error=str(e), order_id=data.get('id'))
+            raise ValueError(f"Data validation failed: {label}: {str(e)}")
+        if key is not None:
+            order_data[key] = value
+
+    order_data.update(extract_order_columns(data))
+    order_data['raw_data'] = data
+    return order_data
+
+def save_orders(order_dicts):
+    """
+    Save many validated orders with one bulk upsert.
+
+    Args:
+        order_dicts (iterable): Dicts as returned by validate_order_data
+
+    Returns:
+        list: The saved ShopifyWebhookOrder instances
+    """
+    return ShopifyWebhookOrder.objects.bulk_upsert(order_dicts)
@@ -0,0 +1,130 @@
+import asyncio
+import json
+import threading
+from django.conf import settings
+from django.dispatch import receiver
+from .instrumentation import REGISTRY
+from .queries import order_summary
+from .signals import orders_saved
+
+EVENTS_PUBLISHED = REGISTRY.counter(
+    'shopify_live_feed_events_total',
+    'Order events published to live feed subscribers',
+)
+SUBSCRIBERS_DROPPED = REGISTRY.counter(
+    'shopify_live_feed_dropped_total',
+    'Live feed subscribers disconnected because their buffer was full',
+)
+
+
+class SubscriberDropped(Exception):
+    """Raised to a subscriber that fell too far behind and was disconnected."""
+
+
+class Subscription:
+    """
+    One live feed client: a bounded asyncio queue living on the client's loop.
+    """
+
+    def __init__(self, hub, loop, buffer_size):
+        self.hub = hub
+        self.loop = loop
+        self.queue = asyncio.Queue(buffer_size)
+        self.dropped = False
+
+    def _offer(self, message):
+        # Runs on self.loop; a full buffer means the client cannot keep up
+        if self.dropped:
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.dropped = True
+            self.hub.unsubscribe(self)
+            SUBSCRIBERS_DROPPED.inc()
+
+    async def get(self, timeout=None):
+        """
+        Wait for the next message.
+
+        Raises:
+            SubscriberDropped: If the buffer overflowed
+            asyncio.TimeoutError: If nothing arrived within timeout seconds
+        """
+        if self.dropped:
+            raise SubscriberDropped()
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class OrderEventHub:
+    """
+    In-process fan-out of order events to live feed subscribers.
+
+    Each event is serialized once and handed to every subscriber's queue, so the
+    cost of a new order does not depend on the database or on how many viewers
+    are connected beyond one queue append each. Only orders saved by this
+    process are published; clients catch up on anything else through the
+    polling feed.
+    """
+
+    def __init__(self, buffer_size=100):
+        self.buffer_size = buffer_size
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._subscribers)
+
+    def subscribe(self):
+        """Register a subscriber on the running event loop."""
+        subscription = Subscription(self, asyncio.get_running_loop(), self.buffer_size)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, message):
+        """
+        Deliver an already-encoded message to every subscriber. Safe to call
+        from any thread.
+        """
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._offer, message)
+            except RuntimeError:
+                # The subscriber's event loop has shut down
+                self.unsubscribe(subscription)
+        EVENTS_PUBLISHED.inc()
+
+
+def encode_order_event(order):
+    """Encode a saved order as a Server-Sent Events 'order' message."""
+    data = json.dumps(order_summary(order))
+    return f"id: {order.pk}\nevent: order\ndata: {data}\n\n"
+
+
+order_events = OrderEventHub(
+    buffer_size=getattr(settings, 'SHOPIFY_LIVE_FEED_BUFFER_SIZE', 100),
+)
+
+REGISTRY.gauge(
+    'shopify_live_feed_subscribers',
+    'Live feed clients connected to this process',
+    lambda: len(order_events),
+)
+
+
+@receiver(orders_saved)
+def _publish_saved_orders(sender, orders, **kwargs):
+    if not len(order_events):
+        return
+    for order in orders:
+        order_events.publish(encode_order_event(order))
@@ -0,0 +1,148 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from .models import ShopifyWebhookOrder
+
+# Columns the dashboard shows; raw_data is never loaded for listings
+LIST_FIELDS = ('id', 'order_id', 'order_number', 'email', 'total_price', 'created_at')
+
+ORDER_COUNT_CACHE_KEY = 'shopifywebhook:order_count'
+HIGH_WATER_CACHE_KEY = 'shopifywebhook:orders_high_water'
+
+
+def encode_cursor(order):
+    """
+    Build an opaque keyset cursor pointing at an order.
+
+    Args:
+        order (ShopifyWebhookOrder): The last order shown on a page
+
+    Returns:
+        str: '<created_at isoformat>|<id>'
+    """
+    return f"{order.created_at.isoformat()}|{order.pk}"
+
+
+def decode_cursor(cursor):
+    """
+    Parse a cursor produced by encode_cursor.
+
+    Args:
+        cursor (str): The cursor string from the query string
+
+    Returns:
+        tuple: (created_at, id)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        created_at_text, pk_text = cursor.rsplit('|', 1)
+        created_at = parse_datetime(created_at_text)
+        pk = int(pk_text)
+    except (AttributeError, TypeError, ValueError):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    if created_at is None:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return created_at, pk
+
+
+def order_summary(order):
+    """Serialize the listing columns of an order for the JSON and live feeds."""
+    return {
+        "pk": order.pk,
+        "id": order.order_id,
+        "number": order.order_number,
+        "email": order.email,
+        "total_price": str(order.total_price),
+        "created_at": order.created_at.isoformat(),
+    }
+
+
+def list_orders():
+    """Newest-first orders with only the listing columns loaded."""
+    return ShopifyWebhookOrder.objects.only(*LIST_FIELDS).order_by('-created_at', '-id')
+
+
+def recent_orders_page(before=None, limit=50):
+    """
+    Fetch one page of orders, newest first, using keyset pagination.
+
+    Seeking on (created_at, id) uses the composite index, so every page costs
+    the same regardless of how deep the client has paged.
+
+    Args:
+        before (str): Cursor of the last order on the previous page, if any
+        limit (int): Page size
+
+    Returns:
+        tuple: (orders, next_cursor) where next_cursor is None on the last page
+
+    Raises:
+        ValueError: If before is not a valid cursor
+    """
+    queryset = list_orders()
+    if before:
+        created_at, pk = decode_cursor(before)
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+        )
+    orders = list(queryset[:limit + 1])
+    next_cursor = encode_cursor(orders[limit - 1]) if len(orders) > limit else None
+    return orders[:limit], next_cursor
+
+
+def cached_order_count(timeout=60):
+    """
+    Return the total number of orders, cached so the table is not scanned on
+    every dashboard refresh. Saves in this process drop the cached value; saves
+    elsewhere show up within timeout seconds.
+    """
+    count = cache.get(ORDER_COUNT_CACHE_KEY)
+    if count is None:
+        count = ShopifyWebhookOrder.objects.count()
+        cache.set(ORDER_COUNT_CACHE_KEY, count, timeout)
+    return count
+
+
+def orders_high_water():
+    """
+    Return (id, created_at) of the newest order, or (0, None) if there is none.
+
+    The value is cached and dropped whenever this process saves orders. Writes
+    from other processes (e.g. the inbox drain worker) show up once the short
+    SHOPIFY_ORDERS_HIGH_WATER_TTL expires.
+    """
+    high_water = cache.get(HIGH_WATER_CACHE_KEY)
+    if high_water is None:
+        high_water = (
+            ShopifyWebhookOrder.objects.order_by('-id').values_list('id', 'created_at').first()
+            or (0, None)
+        )
+        cache.set(HIGH_WATER_CACHE_KEY, high_water, settings.SHOPIFY_ORDERS_HIGH_WATER_TTL)
+    return high_water
+
+
+def orders_after(after_id, limit=100):
+    """
+    Fetch orders added after a known order id, oldest first.
+
+    Args:
+        after_id (int): The highest order id the client already has
+        limit (int): Maximum number of orders to return
+
+    Returns:
+        tuple: (orders, has_more)
+    """
+    orders = list(
+        ShopifyWebhookOrder.objects.only(*LIST_FIELDS)
+        .filter(id__gt=after_id)
+        .order_by('id')[:limit + 1]
+    )
+    return orders[:limit], len(orders) > limit
+
+
+def invalidate_order_caches():
+    """Drop the cached order count and high-water mark after orders change."""
+    cache.delete_many([ORDER_COUNT_CACHE_KEY, HIGH_WATER_CACHE_KEY])
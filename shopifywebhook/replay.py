@@ -0,0 +1,272 @@
+import base64
+import gzip
+import hashlib
+import hmac
+import itertools
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from dataclasses import dataclass, field
+from django.db import connection
+from django.db.backends.signals import connection_created
+
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+def _open(path, mode):
+    if str(path).endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def write_archive(path, deliveries):
+    """
+    Write deliveries to a JSONL archive, gzip-compressed if path ends in .gz.
+
+    Each line holds topic, shop_domain, webhook_id, headers and the body, as
+    text when it is valid UTF-8 and as body_b64 otherwise.
+
+    Args:
+        path (str): Output file
+        deliveries (iterable): dicts with the keys above, body as bytes
+
+    Returns:
+        int: Number of deliveries written
+    """
+    count = 0
+    with _open(path, 'w') as f:
+        for delivery in deliveries:
+            record = {key: value for key, value in delivery.items() if key != 'body'}
+            body = bytes(delivery['body'])
+            try:
+                record['body'] = body.decode('utf-8')
+            except UnicodeDecodeError:
+                record['body_b64'] = base64.b64encode(body).decode('ascii')
+            f.write(json.dumps(record, separators=(',', ':'), default=str) + '\n')
+            count += 1
+    return count
+
+
+def read_archive(path):
+    """
+    Load every delivery from an archive written by write_archive.
+
+    Returns:
+        list: Delivery dicts with body as bytes
+    """
+    deliveries = []
+    with _open(path, 'r') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if 'body_b64' in record:
+                record['body'] = base64.b64decode(record.pop('body_b64'))
+            else:
+                record['body'] = record['body'].encode('utf-8')
+            deliveries.append(record)
+    return deliveries
+
+
+def inbox_deliveries(queryset):
+    """
+    Turn stored inbox items into archive deliveries, signature headers included.
+
+    Args:
+        queryset: WebhookInboxItem queryset
+
+    Yields:
+        dict: One delivery per item
+    """
+    for item in queryset.iterator():
+        yield {
+            'topic': item.topic,
+            'shop_domain': item.shop_domain,
+            'webhook_id': item.webhook_id,
+            'headers': item.headers,
+            'body': bytes(item.body),
+            'received_at': item.received_at.isoformat(),
+        }
+
+
+def signed_headers(delivery, secret):
+    """Return the delivery's headers with X-Shopify-Hmac-Sha256 computed for secret."""
+    headers = dict(delivery.get('headers') or {})
+    digest = hmac.new(secret.encode('utf-8'), delivery['body'], hashlib.sha256).digest()
+    headers['X-Shopify-Hmac-Sha256'] = base64.b64encode(digest).decode('ascii')
+    return headers
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class WriteCounter:
+    """
+    Count INSERT/UPDATE/DELETE statements on every connection opened in this
+    process while installed, including the ones request threads open.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+        self._wrapped = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if sql.lstrip()[:7].upper().startswith(WRITE_STATEMENTS):
+            with self._lock:
+                self.count += len(params) if many and params else 1
+        return execute(sql, params, many, context)
+
+    def _attach(self, sender=None, connection=None, **kwargs):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+            self._wrapped.append(connection)
+
+    def __enter__(self):
+        self._attach(connection=connection)
+        connection_created.connect(self._attach, weak=False)
+        return self
+
+    def __exit__(self, *exc_info):
+        connection_created.disconnect(self._attach)
+        for wrapped in self._wrapped:
+            if self in wrapped.execute_wrappers:
+                wrapped.execute_wrappers.remove(self)
+
+
+@dataclass
+class ReplayReport:
+    """Throughput and latency of one replay run."""
+    sent: int = 0
+    seconds: float = 0.0
+    latencies: list = field(default_factory=list, repr=False)
+    statuses: Counter = field(default_factory=Counter)
+    errors: int = 0
+    # Write statements seen in this process; None when replaying against a remote URL
+    write_statements: int = None
+
+    @property
+    def throughput(self):
+        return self.sent / self.seconds if self.seconds else 0.0
+
+    def as_dict(self):
+        return {
+            'sent': self.sent,
+            'seconds': round(self.seconds, 3),
+            'throughput_per_second': round(self.throughput, 1),
+            'p50_ms': round(percentile(self.latencies, 50) * 1000, 2),
+            'p95_ms': round(percentile(self.latencies, 95) * 1000, 2),
+            'p99_ms': round(percentile(self.latencies, 99) * 1000, 2),
+            'max_ms': round(max(self.latencies, default=0.0) * 1000, 2),
+            'statuses': {str(status): count for status, count in sorted(self.statuses.items())},
+            'errors': self.errors,
+            'db_writes_per_second': (
+                round(self.write_statements / self.seconds, 1)
+                if self.write_statements is not None and self.seconds else None
+            ),
+        }
+
+
+def _client_sender(path):
+    from django.test import Client
+    client = Client()
+
+    def send(body, headers):
+        return client.post(path, body, content_type='application/json', headers=headers).status_code
+    return send
+
+
+def _http_sender(url, timeout):
+    def send(body, headers):
+        request = urllib.request.Request(
+            url, data=body, method='POST',
+            headers={'Content-Type': 'application/json', **headers},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+    return send
+
+
+def replay(deliveries, secret, path, base_url=None, rate=None, concurrency=8, timeout=10.0):
+    """
+    Fire deliveries at the webhook endpoint and measure how it copes.
+
+    Every delivery is re-signed with secret. Without base_url they go through
+    Django's test client in this process, which also lets the report count
+    database writes; with base_url they are POSTed over HTTP to a running server.
+
+    Args:
+        deliveries (list): Delivery dicts as returned by read_archive
+        secret (str): Webhook secret the target verifies with
+        path (str): Endpoint path, e.g. /webhooks/shopify/order/create/
+        base_url (str): e.g. http://127.0.0.1:8000; None for the test client
+        rate (float): Deliveries started per second across all workers; None for as fast as possible
+        concurrency (int): Number of sending threads
+        timeout (float): HTTP timeout in seconds
+
+    Returns:
+        ReplayReport: The measurements
+    """
+    prepared = [(delivery['body'], signed_headers(delivery, secret)) for delivery in deliveries]
+    report = ReplayReport()
+    lock = threading.Lock()
+    next_index = itertools.count()
+    started = time.perf_counter()
+
+    def worker():
+        send = _http_sender(base_url.rstrip('/') + path, timeout) if base_url else _client_sender(path)
+        latencies, statuses, errors = [], Counter(), 0
+        try:
+            while True:
+                with lock:
+                    index = next(next_index)
+                if index >= len(prepared):
+                    break
+                if rate:
+                    delay = started + index / rate - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                body, headers = prepared[index]
+                sent_at = time.perf_counter()
+                try:
+                    statuses[send(body, headers)] += 1
+                except Exception:
+                    errors += 1
+                latencies.append(time.perf_counter() - sent_at)
+        finally:
+            if not base_url:
+                connection.close()
+            with lock:
+                report.latencies.extend(latencies)
+                report.statuses.update(statuses)
+                report.errors += errors
+
+    def run():
+        threads = [threading.Thread(target=worker, name=f'replay-{i}') for i in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    if base_url:
+        run()
+    else:
+        with WriteCounter() as writes:
+            run()
+        report.write_statements = writes.count
+    report.seconds = time.perf_counter() - started
+    report.sent = len(prepared)
+    return report
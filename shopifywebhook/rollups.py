@@ -0,0 +1,145 @@
+from datetime import timedelta, timezone
+from decimal import Decimal
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDay
+from django.utils.timezone import now
+from .models import CustomerRollup, SalesRollup, ShopifyWebhookOrder, hour_bucket, rollup_bucket
+
+
+CENTS = Decimal('0.01')
+
+
+def _money(value):
+    # SQLite sums decimals as floats; bring them back to two places
+    return Decimal(value or 0).quantize(CENTS)
+
+
+def _totals(queryset):
+    totals = queryset.aggregate(order_count=Sum('order_count'), revenue=Sum('revenue'))
+    order_count = totals['order_count'] or 0
+    revenue = _money(totals['revenue'])
+    return {
+        'order_count': order_count,
+        'revenue': revenue,
+        'average_order_value': _money(revenue / order_count) if order_count else _money(0),
+    }
+
+
+def _series(rows):
+    return [dict(row, revenue=_money(row['revenue'])) for row in rows]
+
+
+def _sales(since, until, shop_domain):
+    queryset = SalesRollup.objects.filter(bucket__gte=hour_bucket(since))
+    if until is not None:
+        queryset = queryset.filter(bucket__lt=until)
+    if shop_domain is not None:
+        queryset = queryset.filter(shop_domain=shop_domain)
+    return queryset
+
+
+def sales_by_hour(since, until=None, shop_domain=None):
+    """
+    Order count and revenue per hour, read from the hourly rollup.
+
+    Args:
+        since (datetime): First hour to include
+        until (datetime): End of the range (exclusive), or None for now
+        shop_domain (str): Only this shop; None sums every shop
+
+    Returns:
+        list: {'bucket', 'order_count', 'revenue'} dicts, oldest first, for
+        the hours that had orders
+    """
+    return _series(
+        _sales(since, until, shop_domain).order_by().values('bucket')
+        .annotate(order_count=Sum('order_count'), revenue=Sum('revenue'))
+        .order_by('bucket')
+    )
+
+
+def sales_by_day(since, until=None, shop_domain=None):
+    """Like sales_by_hour, with the hourly buckets summed per UTC day."""
+    return _series(
+        _sales(since, until, shop_domain).order_by()
+        .annotate(day=TruncDay('bucket', tzinfo=timezone.utc)).values('day')
+        .annotate(order_count=Sum('order_count'), revenue=Sum('revenue'))
+        .order_by('day')
+    )
+
+
+def top_customers(limit=10, shop_domain=None):
+    """
+    Customers with the highest total spend.
+
+    Returns:
+        list: {'shop_domain', 'email', 'order_count', 'revenue'} dicts
+    """
+    queryset = CustomerRollup.objects.filter(order_count__gt=0)
+    if shop_domain is not None:
+        queryset = queryset.filter(shop_domain=shop_domain)
+    return list(queryset.order_by('-revenue').values('shop_domain', 'email', 'order_count', 'revenue')[:limit])
+
+
+def dashboard_stats(hours=24, top=5):
+    """
+    Sales figures for the dashboard, computed from the rollups only.
+
+    Every value costs a read of at most `hours` hourly buckets per shop and
+    the first `top` customer rows, however many orders are stored.
+
+    Returns:
+        dict: order_count, revenue and average_order_value over the last
+        `hours` hours, plus the per-hour series and the all-time top
+        customers (CustomerRollup has no time dimension)
+    """
+    since = now() - timedelta(hours=hours)
+    stats = _totals(_sales(since, None, None))
+    stats['hours'] = hours
+    stats['by_hour'] = sales_by_hour(since)
+    stats['top_customers'] = top_customers(top)
+    return stats
+
+
+def _rebuild(order_model, sales_model, customer_model, using=DEFAULT_DB_ALIAS):
+    orders = order_model.objects.using(using).order_by()
+    sales_model.objects.using(using).all().delete()
+    customer_model.objects.using(using).all().delete()
+    sales_model.objects.using(using).bulk_create(
+        sales_model(**row)
+        for row in orders.annotate(bucket=rollup_bucket())
+        .values('shop_domain', 'bucket')
+        .annotate(order_count=Count('id'), revenue=Sum('total_price'))
+        .iterator()
+    )
+    customer_model.objects.using(using).bulk_create(
+        customer_model(**row)
+        for row in orders.exclude(email__isnull=True).exclude(email='')
+        .values('shop_domain', 'email')
+        .annotate(order_count=Count('id'), revenue=Sum('total_price'))
+        .iterator()
+    )
+
+
+def rebuild_rollups(using=DEFAULT_DB_ALIAS):
+    """
+    Recompute every rollup row from the orders table.
+
+    Runs in one transaction. On PostgreSQL the orders table is locked against
+    writes meanwhile, so webhooks wait rather than being counted twice or not
+    at all; SQLite already allows a single writer.
+
+    Returns:
+        tuple: (sales rows, customer rows) written
+    """
+    with transaction.atomic(using=using):
+        connection = connections[using]
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"LOCK TABLE {connection.ops.quote_name(ShopifyWebhookOrder._meta.db_table)}"
+                    " IN SHARE ROW EXCLUSIVE MODE"
+                )
+        _rebuild(ShopifyWebhookOrder, SalesRollup, CustomerRollup, using)
+        return SalesRollup.objects.using(using).count(), CustomerRollup.objects.using(using).count()
@@ -0,0 +1,143 @@
+from django.db import transaction
+from django.db.models import Q
+from .models import OrderSearchToken, OrderPayload, ShopifyWebhookOrder
+from .payloads import SEARCH_TOKEN_LENGTH
+from .queries import decode_cursor, encode_cursor, list_orders
+
+SEARCH_FIELDS = ('number', 'email', 'customer', 'sku', 'product', 'tag', 'discount')
+
+# Sorts after every character a token can contain, to turn a prefix into a range
+_PREFIX_END = '\U0010ffff'
+
+
+def parse_query(query):
+    """
+    Split a search string into (field, term, prefix) triples.
+
+    Terms are separated by spaces and all must match. `field:term` restricts a
+    term to one field (e.g. sku:ABC-12, tag:vip) and a trailing * makes it a
+    prefix match (smi*).
+
+    Args:
+        query (str): The search string
+
+    Returns:
+        list: (field or None, lowercased term, is_prefix) triples
+
+    Raises:
+        ValueError: If a term is empty
+    """
+    terms = []
+    for part in (query or '').split():
+        field = None
+        if ':' in part and part.split(':', 1)[0].lower() in SEARCH_FIELDS:
+            field, part = part.split(':', 1)
+            field = field.lower()
+        prefix = part.endswith('*')
+        term = part.rstrip('*').lower()[:SEARCH_TOKEN_LENGTH]
+        if not term:
+            raise ValueError(f"Empty search term in {query!r}")
+        terms.append((field, term, prefix))
+    return terms
+
+
+def _term_filter(field, term, prefix):
+    # A range rather than startswith so every backend seeks on the token index
+    lookup = Q(token__gte=term, token__lt=term + _PREFIX_END) if prefix else Q(token=term)
+    if field:
+        lookup &= Q(field=field)
+    return lookup
+
+
+def matching_orders(query, queryset=None):
+    """
+    Filter orders to those matching every term of a search string.
+
+    Each term is answered from the token index, so the cost depends on how
+    many orders match, not on how many are stored.
+
+    Args:
+        query (str): Search string, see parse_query
+        queryset: Orders to search; all orders by default
+
+    Returns:
+        QuerySet: The matching orders
+
+    Raises:
+        ValueError: If the query is malformed or empty
+    """
+    terms = parse_query(query)
+    if not terms:
+        raise ValueError("Empty search")
+    queryset = ShopifyWebhookOrder.objects.all() if queryset is None else queryset
+    for field, term, prefix in terms:
+        queryset = queryset.filter(
+            id__in=OrderSearchToken.objects.filter(_term_filter(field, term, prefix)).values('order_id')
+        )
+    return queryset
+
+
+def search_orders(query, before=None, limit=50):
+    """
+    One page of orders matching a search string, newest first.
+
+    Args:
+        query (str): Search string, see parse_query
+        before (str): Cursor from the previous page, as for recent_orders_page
+        limit (int): Page size
+
+    Returns:
+        tuple: (orders, next_cursor) where next_cursor is None on the last page
+
+    Raises:
+        ValueError: If the query or cursor is malformed
+    """
+    queryset = matching_orders(query, list_orders())
+    if before:
+        created_at, pk = decode_cursor(before)
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+    orders = list(queryset[:limit + 1])
+    next_cursor = encode_cursor(orders[limit - 1]) if len(orders) > limit else None
+    return orders[:limit], next_cursor
+
+
+def rebuild_search_index(batch_size=500, progress=None):
+    """
+    Re-tokenize every stored order payload.
+
+    Needed after the tokenizer changes; new and updated orders are indexed
+    as they are saved.
+
+    Args:
+        batch_size (int): Orders re-indexed per transaction
+        progress (callable): Called with the number of orders done after each batch
+
+    Returns:
+        int: Number of orders indexed
+    """
+    done = 0
+    batch = []
+    payloads = OrderPayload.objects.order_by('order_id').iterator(chunk_size=batch_size)
+    for payload in payloads:
+        batch.append(payload)
+        if len(batch) >= batch_size:
+            done += _reindex_payloads(batch)
+            batch = []
+            if progress:
+                progress(done)
+    if batch:
+        done += _reindex_payloads(batch)
+        if progress:
+            progress(done)
+    return done
+
+
+def _reindex_payloads(payloads):
+    orders = []
+    for payload in payloads:
+        order = ShopifyWebhookOrder(pk=payload.order_id)
+        order._raw_data = payload.decode()
+        orders.append(order)
+    with transaction.atomic():
+        OrderSearchToken.objects.reindex(orders)
+    return len(orders)
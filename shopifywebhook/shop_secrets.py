@@ -0,0 +1,200 @@
+import binascii
+import hashlib
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from .instrumentation import log_event
+from .payloads import parse_shopify_datetime
+
+# Raw SHA-256 digest length; anything else in the header cannot match
+DIGEST_SIZE = hashlib.sha256().digest_size
+
+
+def signing_key(secret, expires_at=None):
+    """
+    Pre-key an HMAC-SHA256 state for a secret.
+
+    Verifying then only copies this state and hashes the body, skipping the
+    secret encoding and key setup that hmac.new() repeats on every call.
+
+    Args:
+        secret (str): The webhook secret
+        expires_at (float): Unix time after which the key is rejected, or None
+
+    Returns:
+        tuple: (hmac_state, expires_at)
+    """
+    return (hmac.new(secret.encode('utf-8'), digestmod=hashlib.sha256), expires_at)
+
+
+def _signing_keys(secret, previous=None, previous_expires=None):
+    """Build a shop's keys, current first, then the previous one if still in its grace window."""
+    keys = []
+    if secret:
+        keys.append(signing_key(secret))
+    if previous:
+        expires = parse_shopify_datetime(previous_expires)
+        if previous_expires and expires is None:
+            raise ValueError(f"Invalid previous secret expiry: {previous_expires!r}")
+        keys.append(signing_key(previous, expires.timestamp() if expires else None))
+    return tuple(keys)
+
+
+class ShopSecretRegistry:
+    """
+    Webhook signing keys per shop domain, held in memory.
+
+    Keys are turned into pre-keyed HMAC states once when loaded, so verifying
+    a request costs one dict lookup plus hashing the body. During a secret rotation a shop has its new
+    key and its previous key; the previous one is tried only if the new one
+    does not match and stops being accepted when its grace window ends.
+    """
+
+    def __init__(self):
+        self._shops = {}
+        self._default = ()
+        self._lock = threading.Lock()
+        self._source_mtime = None
+        self._next_check = 0.0
+
+    def load(self, shops, default=None):
+        """
+        Replace every key in the registry.
+
+        Args:
+            shops (dict): shop domain -> secret string, or a dict with 'secret'
+                and optionally 'previous' and 'previous_expires' (ISO 8601)
+            default (tuple): Keys for shops not listed, as built by _signing_keys
+
+        Raises:
+            ValueError: If an entry has no secret or a malformed expiry
+        """
+        loaded = {}
+        for domain, entry in shops.items():
+            if isinstance(entry, str):
+                entry = {'secret': entry}
+            if not isinstance(entry, dict) or not entry.get('secret'):
+                raise ValueError(f"No secret configured for shop {domain}")
+            loaded[domain.strip().lower()] = _signing_keys(
+                entry['secret'], entry.get('previous'), entry.get('previous_expires'),
+            )
+        # Swap both references at once so concurrent requests see old or new keys, never a mix
+        self._shops, self._default = loaded, tuple(default or ())
+
+    def reload(self):
+        """Reload keys from settings and SHOPIFY_SHOP_SECRETS_FILE."""
+        with self._lock:
+            default = _signing_keys(
+                getattr(settings, 'SHOPIFY_WEBHOOK_SECRET', None),
+                getattr(settings, 'SHOPIFY_WEBHOOK_PREVIOUS_SECRET', None),
+                getattr(settings, 'SHOPIFY_WEBHOOK_PREVIOUS_SECRET_EXPIRES', None),
+            )
+            shops = dict(getattr(settings, 'SHOPIFY_SHOP_SECRETS', {}))
+            path = getattr(settings, 'SHOPIFY_SHOP_SECRETS_FILE', None)
+            mtime = None
+            if path:
+                mtime = os.stat(path).st_mtime
+                with open(path, encoding='utf-8') as f:
+                    from_file = json.load(f)
+                if not isinstance(from_file, dict):
+                    raise ValueError(f"{path} must contain a JSON object")
+                shops.update(from_file)
+            self.load(shops, default)
+            self._source_mtime = mtime
+            self._next_check = time.monotonic() + getattr(settings, 'SHOPIFY_SHOP_SECRETS_RELOAD_SECONDS', 30)
+        log_event(logging.INFO, 'secrets.loaded', shops=len(self._shops), default=bool(self._default))
+
+    def _maybe_reload(self):
+        # At most one stat() per reload interval; requests never wait on it
+        if time.monotonic() < self._next_check or not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._next_check = time.monotonic() + getattr(settings, 'SHOPIFY_SHOP_SECRETS_RELOAD_SECONDS', 30)
+            path = getattr(settings, 'SHOPIFY_SHOP_SECRETS_FILE', None)
+            if not path:
+                return
+            try:
+                changed = os.stat(path).st_mtime != self._source_mtime
+            except OSError as e:
+                log_event(logging.WARNING, 'secrets.stat_failed', path=path, error=str(e))
+                return
+        finally:
+            self._lock.release()
+        if changed:
+            try:
+                self.reload()
+            except (OSError, ValueError) as e:
+                # Keep serving with the keys we have
+                log_event(logging.ERROR, 'secrets.reload_failed', path=path, error=str(e))
+
+    def keys_for(self, shop_domain):
+        """
+        Return the keys a delivery from shop_domain may be signed with.
+
+        Returns:
+            tuple: ((hmac_state, expires_at), ...), empty if none are configured
+        """
+        self._maybe_reload()
+        if not shop_domain:
+            return self._default
+        keys = self._shops.get(shop_domain)
+        if keys is None:
+            keys = self._shops.get(shop_domain.strip().lower(), self._default)
+        return keys
+
+    def __len__(self):
+        return len(self._shops)
+
+    @property
+    def configured(self):
+        """Whether any key at all is configured."""
+        return bool(self._shops or self._default)
+
+
+def verify_hmac(body, hmac_header, keys, now=None):
+    """
+    Check a X-Shopify-Hmac-Sha256 header against one or more signing keys.
+
+    The header is base64-decoded once and compared to raw HMAC digests in
+    constant time, so neither the secret nor the digest is re-encoded.
+
+    Args:
+        body (bytes): The raw request body
+        hmac_header (str): The X-Shopify-Hmac-Sha256 header value
+        keys (tuple): ((hmac_state, expires_at), ...) as returned by keys_for
+        now (float): Current Unix time, for testing expiry
+
+    Returns:
+        bool: True if any unexpired key produced the signature
+    """
+    if not hmac_header or not keys:
+        return False
+    try:
+        expected = binascii.a2b_base64(hmac_header)
+    except (binascii.Error, ValueError):
+        return False
+    if len(expected) != DIGEST_SIZE:
+        return False
+    for state, expires_at in keys:
+        if expires_at is not None and (now or time.time()) >= expires_at:
+            continue
+        mac = state.copy()
+        mac.update(body)
+        if hmac.compare_digest(mac.digest(), expected):
+            return True
+    return False
+
+
+shop_secrets = ShopSecretRegistry()
+
+
+@receiver(setting_changed)
+def _reload_on_setting_change(setting, **kwargs):
+    if setting.startswith(('SHOPIFY_WEBHOOK_SECRET', 'SHOPIFY_WEBHOOK_PREVIOUS_SECRET', 'SHOPIFY_SHOP_SECRETS')):
+        shop_secrets.reload()
@@ -0,0 +1,7 @@
+from django.dispatch import Signal
+
+# Sent after the transaction that saved orders commits, with orders=[ShopifyWebhookOrder, ...]
+orders_saved = Signal()
+
+# Sent after the transaction that deleted orders commits
+orders_deleted = Signal()
@@ -0,0 +1,128 @@
+import json
+import random
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+# Line item counts seen on a typical storefront: most orders are small, with a long tail
+LINE_ITEM_WEIGHTS = ((1, 40), (2, 25), (3, 12), (5, 10), (10, 7), (25, 4), (100, 2))
+
+BASE_TIME = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def make_order_payload(order_id, line_items=3, rng=random, note_bytes=0):
+    """
+    Build a Shopify-shaped order payload.
+
+    Args:
+        order_id (int): Shopify order id
+        line_items (int): Number of line items
+        rng (random.Random): Source of randomness, for reproducible runs
+        note_bytes (int): Size of the free-text note, to pad the payload
+
+    Returns:
+        dict: The order payload
+    """
+    items = []
+    for i in range(line_items):
+        product = rng.randint(1, 500)
+        items.append({
+            'id': order_id * 1000 + i,
+            'product_id': 7000000 + product,
+            'variant_id': 8000000 + product,
+            'sku': f"SKU-{product:04d}",
+            'title': f"Product {product}",
+            'quantity': rng.randint(1, 5),
+            'price': f"{rng.uniform(1, 200):.2f}",
+        })
+    total = sum(Decimal(item['price']) * item['quantity'] for item in items)
+    payload = {
+        'id': order_id,
+        'order_number': 1000 + order_id,
+        'email': f"customer{order_id % 997}@example.com",
+        'total_price': str(total),
+        'currency': 'USD',
+        'financial_status': 'paid',
+        'created_at': '2025-01-01T00:00:00+00:00',
+        'updated_at': '2025-01-01T00:00:00+00:00',
+        'customer': {'id': order_id % 997, 'email': f"customer{order_id % 997}@example.com"},
+        'line_items': items,
+    }
+    if note_bytes:
+        payload['note'] = 'x' * note_bytes
+    return payload
+
+
+@dataclass
+class TrafficProfile:
+    """
+    Shape of a synthetic delivery stream.
+
+    Attributes:
+        line_item_weights (tuple): (line item count, relative weight) pairs
+        note_bytes (int): Maximum random note size added to each payload
+        duplicate_ratio (float): Share of deliveries that are Shopify retries of
+            an earlier delivery (same webhook id and body)
+        update_ratio (float): Share of deliveries that are orders/updated for an
+            order created earlier in the stream
+    """
+    line_item_weights: tuple = LINE_ITEM_WEIGHTS
+    note_bytes: int = 0
+    duplicate_ratio: float = 0.02
+    update_ratio: float = 0.0
+
+
+def synthesize_deliveries(count, profile=None, shop_domain='load-test.myshopify.com', seed=None):
+    """
+    Generate a reproducible stream of unsigned webhook deliveries.
+
+    Args:
+        count (int): Number of deliveries
+        profile (TrafficProfile): Payload and retry distribution
+        shop_domain (str): X-Shopify-Shop-Domain of every delivery
+        seed (int): Random seed
+
+    Returns:
+        list: dicts with topic, shop_domain, webhook_id, headers and body (bytes),
+        in the format used by shopifywebhook.replay archives
+    """
+    profile = profile or TrafficProfile()
+    rng = random.Random(seed)
+    sizes, weights = zip(*profile.line_item_weights)
+    deliveries = []
+    created = []
+    for n in range(count):
+        roll = rng.random()
+        if deliveries and roll < profile.duplicate_ratio:
+            deliveries.append(dict(rng.choice(deliveries)))
+            continue
+        triggered_at = BASE_TIME + timedelta(seconds=n)
+        if created and roll < profile.duplicate_ratio + profile.update_ratio:
+            topic = 'orders/updated'
+            order_id = rng.choice(created)
+        else:
+            topic = 'orders/create'
+            order_id = len(created) + 1
+            created.append(order_id)
+        payload = make_order_payload(
+            order_id,
+            line_items=rng.choices(sizes, weights)[0],
+            rng=rng,
+            note_bytes=rng.randint(0, profile.note_bytes) if profile.note_bytes else 0,
+        )
+        payload['updated_at'] = triggered_at.isoformat()
+        webhook_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        deliveries.append({
+            'topic': topic,
+            'shop_domain': shop_domain,
+            'webhook_id': webhook_id,
+            'headers': {
+                'X-Shopify-Topic': topic,
+                'X-Shopify-Shop-Domain': shop_domain,
+                'X-Shopify-Webhook-Id': webhook_id,
+                'X-Shopify-Triggered-At': triggered_at.isoformat(),
+            },
+            'body': json.dumps(payload, separators=(',', ':')).encode('utf-8'),
+        })
+    return deliveries
@@ -0,0 +1,119 @@
+import base64
+import json
+import math
+import random
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+from django.utils.dateparse import parse_datetime
+from shopifywebhook.synthetic import make_order_payload
+
+
+class AdminApiStub:
+    """
+    Local stand-in for the REST Admin API orders endpoint, for testing and
+    benchmarking backfill_orders without a real shop.
+
+    Serves `orders` synthetic orders created one every `spacing` from `start`,
+    with created_at filters, page_info cursor pagination via the Link header,
+    X-Shopify-Shop-Api-Call-Limit and, optionally, a 429 for every Nth request.
+    Orders are generated on request, so the stub's memory does not grow with
+    `orders` either.
+
+        with AdminApiStub(orders=10000) as stub:
+            client = AdminApiClient('stub', 'token', '2024-07', base_url=stub.url)
+    """
+
+    def __init__(self, orders=1000, start=datetime(2024, 1, 1, tzinfo=timezone.utc),
+                 spacing=timedelta(minutes=5), throttle_every=0, line_items=3):
+        self.orders = orders
+        self.start = start
+        self.spacing = spacing
+        self.throttle_every = throttle_every
+        self.line_items = line_items
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _created_at(self, order_id):
+        return self.start + self.spacing * (order_id - 1)
+
+    def _id_range(self, since, until):
+        # Ids of the orders with since <= created_at <= until (both inclusive, as in Shopify)
+        first = 1 if since is None else max(1, math.ceil((since - self.start) / self.spacing) + 1)
+        last = self.orders if until is None else min(self.orders, math.floor((until - self.start) / self.spacing) + 1)
+        return first, last
+
+    def order(self, order_id):
+        payload = make_order_payload(order_id, self.line_items, rng=random.Random(order_id))
+        created_at = self._created_at(order_id).isoformat()
+        payload['created_at'] = payload['updated_at'] = created_at
+        return payload
+
+    def page(self, query):
+        """Return (orders, next_query) for a parsed orders.json query string."""
+        limit = min(int(query.get('limit', ['50'])[0]), 250)
+        if 'page_info' in query:
+            first, last = json.loads(base64.urlsafe_b64decode(query['page_info'][0]))
+        else:
+            since = query.get('created_at_min', [None])[0]
+            until = query.get('created_at_max', [None])[0]
+            first, last = self._id_range(
+                parse_datetime(since) if since else None,
+                parse_datetime(until) if until else None,
+            )
+        ids = range(first, min(first + limit, last + 1))
+        next_query = None
+        if first + limit <= last:
+            cursor = base64.urlsafe_b64encode(json.dumps([first + limit, last]).encode()).decode()
+            next_query = {'limit': limit, 'page_info': cursor}
+        return [self.order(order_id) for order_id in ids], next_query
+
+    def __enter__(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                with stub._lock:
+                    stub.requests += 1
+                    count = stub.requests
+                if not parsed.path.endswith('/orders.json'):
+                    self.send_error(404)
+                    return
+                if stub.throttle_every and count % stub.throttle_every == 0:
+                    self.send_response(429)
+                    self.send_header('Retry-After', '0.1')
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                orders, next_query = stub.page(parse_qs(parsed.query))
+                body = json.dumps({'orders': orders}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('X-Shopify-Shop-Api-Call-Limit', '1/40')
+                if next_query:
+                    next_url = f"{stub.url}{parsed.path}?{urlencode(next_query)}"
+                    self.send_header('Link', f'<{next_url}>; rel="next"')
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,46 @@
+import json
+
+import pytest
+from django.core.cache import cache
+from django.db import connections
+from django.test import Client
+
+from shopifywebhook.tests.signing import WEBHOOK_SECRET, sign
+
+
+@pytest.fixture(scope='session')
+def django_db_modify_db_settings(tmp_path_factory):
+    # Tests that write from several threads need a file; each connection to
+    # SQLite's in-memory test database would get a database of its own
+    settings_dict = connections['default'].settings_dict
+    if settings_dict['ENGINE'] == 'django.db.backends.sqlite3':
+        settings_dict['TEST']['NAME'] = str(tmp_path_factory.mktemp('db') / 'test.sqlite3')
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Cached counts and dashboard fragments would outlive each test's rolled back rows
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def post_webhook(settings):
+    """
+    Post a delivery to /webhooks/shopify/ signed with WEBHOOK_SECRET.
+
+    Called as post_webhook(payload, topic='orders/create', webhook_id='',
+    hmac=None, **extra); hmac overrides the computed signature header.
+    """
+    settings.SHOPIFY_WEBHOOK_SECRET = WEBHOOK_SECRET
+    client = Client()
+
+    def post(payload, topic='orders/create', webhook_id='', hmac=None, **extra):
+        body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+        return client.post(
+            '/webhooks/shopify/', body, content_type='application/json',
+            HTTP_X_SHOPIFY_TOPIC=topic, HTTP_X_SHOPIFY_WEBHOOK_ID=webhook_id,
+            HTTP_X_SHOPIFY_HMAC_SHA256=sign(body) if hmac is None else hmac, **extra,
+        )
+    return post
@@ -0,0 +1,10 @@
+import base64
+import hashlib
+import hmac
+
+WEBHOOK_SECRET = 'test-secret'
+
+
+def sign(body, secret=WEBHOOK_SECRET):
+    """X-Shopify-Hmac-Sha256 header value for body."""
+    return base64.b64encode(hmac.new(secret.encode(), body, hashlib.sha256).digest()).decode()
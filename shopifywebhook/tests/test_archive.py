@@ -0,0 +1,109 @@
+import os
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from shopifywebhook.archive import archive_chunk, archive_name, find_archived_order, iter_archive
+from shopifywebhook.models import ArchivedOrder, OrderLineItem, ShopifyWebhookOrder, ShopifyWebhookOrderQuerySet
+from shopifywebhook.processing import save_orders, validate_order_data
+
+STORED_AT = datetime(2024, 1, 15, tzinfo=timezone.utc)
+CUTOFF = datetime(2024, 6, 1, tzinfo=timezone.utc)
+
+
+class DeleteFailed(Exception):
+    pass
+
+
+def order(order_id, version=0, price='10.00'):
+    return validate_order_data({
+        'id': order_id,
+        'order_number': 1000 + order_id,
+        'email': 'buyer@example.com',
+        'total_price': price,
+        'updated_at': f'2024-01-01T00:0{version}:00Z',
+        'line_items': [{'sku': f'SKU-{order_id}', 'title': 'Shirt', 'quantity': 1, 'price': price}],
+    })
+
+
+@pytest.fixture
+def old_orders(db):
+    save_orders([order(order_id) for order_id in range(1, 6)])
+    ShopifyWebhookOrder.objects.update(created_at=STORED_AT)
+
+
+def archived_ids(directory):
+    return Counter(record['order_id'] for record in iter_archive(archive_name(STORED_AT), str(directory)))
+
+
+def test_chunk_is_written_before_its_orders_are_deleted(old_orders, tmp_path, monkeypatch):
+    delete = ShopifyWebhookOrderQuerySet.delete
+    seen_at_delete = []
+
+    def checked_delete(queryset):
+        seen_at_delete.append(archived_ids(tmp_path))
+        return delete(queryset)
+
+    monkeypatch.setattr(ShopifyWebhookOrderQuerySet, 'delete', checked_delete)
+    moved, written, files = archive_chunk(CUTOFF, chunk_size=3, directory=str(tmp_path))
+
+    assert (moved, files) == (3, {'orders-2024-01.ndjson.gz'})
+    assert written == os.path.getsize(tmp_path / 'orders-2024-01.ndjson.gz')
+    assert seen_at_delete == [Counter({'1': 1, '2': 1, '3': 1})]
+    assert sorted(ShopifyWebhookOrder.objects.values_list('order_id', flat=True)) == ['4', '5']
+    assert sorted(ArchivedOrder.objects.values_list('order_id', flat=True)) == ['1', '2', '3']
+    assert not OrderLineItem.objects.filter(order__order_id__in=['1', '2', '3']).exists()
+
+    record = find_archived_order('2', directory=str(tmp_path))
+    assert record['total_price'] == '10.00'
+    assert record['raw_data']['line_items'][0]['sku'] == 'SKU-2'
+
+
+def test_rerunning_after_a_failed_chunk_loses_and_duplicates_nothing(old_orders, tmp_path, monkeypatch):
+    def failing_delete(queryset):
+        raise DeleteFailed()
+
+    with monkeypatch.context() as patch:
+        patch.setattr(ShopifyWebhookOrderQuerySet, 'delete', failing_delete)
+        with pytest.raises(DeleteFailed):
+            archive_chunk(CUTOFF, chunk_size=3, directory=str(tmp_path))
+    # Written, but the orders are still stored and have no tombstones
+    assert archived_ids(tmp_path) == Counter({'1': 1, '2': 1, '3': 1})
+    assert ShopifyWebhookOrder.objects.count() == 5
+    assert not ArchivedOrder.objects.exists()
+
+    while archive_chunk(CUTOFF, chunk_size=3, directory=str(tmp_path))[0]:
+        pass
+    assert archive_chunk(CUTOFF, chunk_size=3, directory=str(tmp_path)) == (0, 0, set())
+
+    assert not ShopifyWebhookOrder.objects.exists()
+    assert set(ArchivedOrder.objects.values_list('order_id', flat=True)) == {'1', '2', '3', '4', '5'}
+    # Every order is in the file; the failed chunk's are there twice, and readers take the last copy
+    assert archived_ids(tmp_path) == Counter({'1': 2, '2': 2, '3': 2, '4': 1, '5': 1})
+    assert find_archived_order('1', directory=str(tmp_path))['order_id'] == '1'
+
+
+def test_stale_webhook_for_an_archived_order_is_dropped(old_orders, tmp_path):
+    archive_chunk(CUTOFF, directory=str(tmp_path))
+
+    saved = save_orders([order(1, version=0, price='99.00')])[0]
+    assert saved.stale and saved.pk is None
+    assert not ShopifyWebhookOrder.objects.exists()
+    assert ArchivedOrder.objects.filter(order_id='1').exists()
+
+
+def test_newer_webhook_restores_an_archived_order(old_orders, tmp_path):
+    archive_chunk(CUTOFF, directory=str(tmp_path))
+
+    saved = save_orders([order(1, version=1, price='12.00')])[0]
+    assert not saved.stale
+    restored = ShopifyWebhookOrder.objects.get(order_id='1')
+    assert str(restored.total_price) == '12.00'
+    assert restored.line_items.count() == 1
+    assert not ArchivedOrder.objects.filter(order_id='1').exists()
+    assert ArchivedOrder.objects.count() == 4
+
+    # Stored again just now, so the next run leaves it alone
+    assert archive_chunk(CUTOFF, directory=str(tmp_path)) == (0, 0, set())
+    assert ShopifyWebhookOrder.objects.filter(order_id='1').exists()
@@ -0,0 +1,108 @@
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+import requests
+from django.core.management import call_command
+
+from shopifywebhook.backfill import AdminApiClient, Checkpoint, backfill_from_api
+from shopifywebhook.models import ShopifyWebhookOrder
+from shopifywebhook.tests.admin_api_stub import AdminApiStub
+
+
+class Interrupted(Exception):
+    pass
+
+
+def client_for(stub, **options):
+    return AdminApiClient('stub.myshopify.com', 'token', '2024-07', base_url=stub.url,
+                          rate=1000, burst=1000, **options)
+
+
+def run_command(stub, *args):
+    out = StringIO()
+    call_command(
+        'backfill_orders', '--api-url', stub.url,
+        '--since', stub.start.isoformat(), '--until', (stub.start + stub.spacing * stub.orders).isoformat(),
+        '--rate', '1000', *args, stdout=out,
+    )
+    return out.getvalue()
+
+
+@pytest.mark.django_db
+def test_command_follows_link_header_pages():
+    with AdminApiStub(orders=120, line_items=1) as stub:
+        output = run_command(stub, '--windows', '1', '--page-size', '50')
+
+    # 50 + 50 + 20, each page found through the previous page's Link header
+    assert stub.requests == 3
+    assert "Backfilled 120 orders" in output
+    assert ShopifyWebhookOrder.objects.count() == 120
+
+
+@pytest.mark.django_db
+def test_windows_fetched_concurrently_import_every_order_once():
+    with AdminApiStub(orders=200, line_items=1) as stub:
+        output = run_command(stub, '--windows', '4', '--concurrency', '4', '--page-size', '25')
+
+    assert "Backfilled 200 orders" in output
+    assert ShopifyWebhookOrder.objects.count() == 200
+
+
+@pytest.mark.django_db
+def test_interrupted_backfill_resumes_from_checkpoint(tmp_path):
+    path = str(tmp_path / 'backfill.json')
+    with AdminApiStub(orders=100, line_items=1) as stub:
+        until = stub.start + stub.spacing * stub.orders
+
+        def stop_after_two_pages(result):
+            if result.pages == 2:
+                raise Interrupted
+
+        with pytest.raises(Interrupted):
+            backfill_from_api(client_for(stub), stub.start, until, Checkpoint(path),
+                              windows=1, page_size=20, progress=stop_after_two_pages)
+        assert ShopifyWebhookOrder.objects.count() == 40
+        assert Checkpoint(path).state['progress']['0']['next_url']
+
+        requests_before = stub.requests
+        result = backfill_from_api(client_for(stub), stub.start, until, Checkpoint(path),
+                                   windows=1, page_size=20)
+
+    # Only the three pages not yet saved are fetched again
+    assert stub.requests - requests_before == 3
+    assert (result.pages, result.saved) == (3, 60)
+    assert ShopifyWebhookOrder.objects.count() == 100
+    assert Checkpoint(path).state['progress']['0']['done']
+
+
+@pytest.mark.django_db
+def test_checkpoint_for_another_range_is_refused(tmp_path):
+    path = str(tmp_path / 'backfill.json')
+    with AdminApiStub(orders=10, line_items=1) as stub:
+        backfill_from_api(client_for(stub), stub.start, stub.start + timedelta(hours=1), Checkpoint(path), windows=1)
+        with pytest.raises(ValueError):
+            backfill_from_api(client_for(stub), stub.start, stub.start + timedelta(hours=2), Checkpoint(path), windows=1)
+
+
+@pytest.mark.django_db
+def test_throttled_requests_are_retried_after_retry_after():
+    with AdminApiStub(orders=100, line_items=1, throttle_every=2) as stub:
+        result = backfill_from_api(client_for(stub), stub.start, stub.start + stub.spacing * stub.orders,
+                                   Checkpoint(None), windows=1, page_size=25)
+
+    # Every second request got a 429 and was sent again
+    assert result.pages == 4
+    assert stub.requests == 7
+    assert ShopifyWebhookOrder.objects.count() == 100
+
+
+@pytest.mark.django_db
+def test_gives_up_when_throttled_past_max_retries():
+    with AdminApiStub(orders=10, line_items=1, throttle_every=1) as stub:
+        with pytest.raises(requests.HTTPError):
+            backfill_from_api(client_for(stub, max_retries=2), stub.start, stub.start + stub.spacing * stub.orders,
+                              Checkpoint(None), windows=1)
+
+    assert stub.requests == 3
+    assert not ShopifyWebhookOrder.objects.exists()
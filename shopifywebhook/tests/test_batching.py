@@ -0,0 +1,54 @@
+import threading
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+
+from shopifywebhook.batching import OrderBatcher
+from shopifywebhook.models import ShopifyWebhookOrder
+from shopifywebhook.processing import save_orders, validate_order_data
+
+
+def order_data(order_id, version):
+    return validate_order_data({
+        'id': order_id,
+        'order_number': 1000 + order_id,
+        'email': f'v{version}@example.com',
+        'total_price': f'{version}.00',
+        'updated_at': f'2025-01-01T00:0{version}:00Z',
+    })
+
+
+def submit_together(batcher, deliveries):
+    """Submit each delivery from its own thread and return the results in input order."""
+    results = [None] * len(deliveries)
+
+    def submit(index, data):
+        try:
+            results[index] = batcher.submit(data)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=submit, args=item) for item in enumerate(deliveries)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+@pytest.mark.django_db(transaction=True)
+def test_older_delivery_in_the_same_batch_is_superseded():
+    # The batch is flushed as soon as it is full, so the window never runs out
+    batcher = OrderBatcher(30, max_batch_size=3, save_many=save_orders)
+    newer, older, other = submit_together(batcher, [order_data(1, 3), order_data(1, 2), order_data(2, 1)])
+
+    assert not newer.stale and newer.pk is not None
+    assert older.stale and older.pk is None
+    # The stale result describes the delivery that lost, not the stored row
+    assert (older.email, older.total_price) == ('v2@example.com', Decimal('2.00'))
+    assert not other.stale and other.pk is not None
+
+    stored = dict(ShopifyWebhookOrder.objects.values_list('order_id', 'email'))
+    assert stored == {'1': 'v3@example.com', '2': 'v1@example.com'}
+    assert ShopifyWebhookOrder.objects.get(order_id='1').pk == newer.pk
@@ -0,0 +1,25 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+BENCHMARKS = Path(__file__).resolve().parents[2] / 'benchmarks'
+
+# Keep in step with the command that wrote benchmarks/baseline.json (see README)
+GATE_OPTIONS = ['--iterations', '50', '--warmup', '5', '--repeat', '2', '--index-sizes', '1000']
+
+
+@pytest.mark.benchmark
+def test_request_path_has_not_regressed():
+    # Query count growth always fails; latency and allocation only beyond the
+    # threshold, which is wide because short runs on shared hosts are noisy
+    threshold = os.environ.get('SHOPIFY_BENCH_THRESHOLD', '1.0')
+    result = subprocess.run(
+        [sys.executable, 'bench_suite.py', *GATE_OPTIONS,
+         '--compare', 'baseline.json', '--threshold', threshold],
+        cwd=BENCHMARKS, env={**os.environ, 'SHOPIFY_WEBHOOK_LOG_LEVEL': 'WARNING'},
+        capture_output=True, text=True,
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
@@ -0,0 +1,131 @@
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from shopifywebhook import dedup
+from shopifywebhook.dedup import DeliveryCache, expire_deliveries, is_duplicate
+from shopifywebhook.models import ShopifyWebhookOrder, WebhookDelivery
+from shopifywebhook.synthetic import make_order_payload
+from shopifywebhook.tests.signing import sign
+from shopifywebhook.webhooks import webhook_dispatch_async
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    dedup._cache.clear()
+    yield
+    dedup._cache.clear()
+
+
+@pytest.mark.django_db
+def test_retry_of_accepted_delivery_is_dropped(post_webhook):
+    payload = make_order_payload(1)
+    assert post_webhook(payload, webhook_id='w-1').json()['status'] == 'success'
+
+    assert post_webhook(payload, webhook_id='w-1').json()['status'] == 'duplicate'
+    assert post_webhook(make_order_payload(2), webhook_id='w-2').json()['status'] == 'success'
+    assert ShopifyWebhookOrder.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_unsigned_request_cannot_probe_delivered_ids(post_webhook):
+    payload = make_order_payload(1)
+    post_webhook(payload, webhook_id='w-1')
+
+    # Same answer for an accepted id as for any other, and no lookup is made
+    with CaptureQueriesContext(connection) as queries:
+        seen = post_webhook(payload, webhook_id='w-1', hmac='bm90IGEgc2lnbmF0dXJl')
+    unseen = post_webhook(payload, webhook_id='w-unknown', hmac='bm90IGEgc2lnbmF0dXJl')
+    assert seen.status_code == unseen.status_code == 401
+    assert seen.content == unseen.content
+    assert len(queries) == 0
+
+    dedup._cache.clear()
+    with CaptureQueriesContext(connection) as queries:
+        assert post_webhook(payload, webhook_id='w-1', hmac='').status_code == 401
+    assert len(queries) == 0
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_view_checks_signature_before_duplicates(post_webhook):
+    payload = make_order_payload(1)
+    post_webhook(payload, webhook_id='w-1')
+
+    def request(signature):
+        return RequestFactory().post(
+            '/webhooks/shopify/', data=b'{"id": 1}', content_type='application/json',
+            HTTP_X_SHOPIFY_TOPIC='orders/create', HTTP_X_SHOPIFY_WEBHOOK_ID='w-1',
+            HTTP_X_SHOPIFY_HMAC_SHA256=signature,
+        )
+
+    assert async_to_sync(webhook_dispatch_async)(request('bm90IGEgc2lnbmF0dXJl')).status_code == 401
+    response = async_to_sync(webhook_dispatch_async)(request(sign(b'{"id": 1}')))
+    assert response.status_code == 200 and b'duplicate' in response.content
+
+
+@pytest.mark.django_db
+def test_duplicate_is_found_in_the_database_after_a_restart(post_webhook):
+    payload = make_order_payload(1)
+    post_webhook(payload, webhook_id='w-1')
+    dedup._cache.clear()
+
+    assert post_webhook(payload, webhook_id='w-1').json()['status'] == 'duplicate'
+    # The database hit warms the cache again
+    with CaptureQueriesContext(connection) as queries:
+        assert is_duplicate('w-1')
+    assert len(queries) == 0
+
+
+def test_delivery_cache_evicts_the_least_recently_used_id(monkeypatch):
+    monkeypatch.setattr(dedup, 'time', Clock())
+    cache = DeliveryCache(max_size=2, ttl_seconds=60)
+    cache.add('a')
+    cache.add('b')
+    assert 'a' in cache  # now the most recently used
+    cache.add('c')
+
+    assert 'b' not in cache
+    assert 'a' in cache and 'c' in cache
+    assert len(cache) == 2
+
+
+def test_delivery_cache_forgets_ids_after_the_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(dedup, 'time', clock)
+    cache = DeliveryCache(max_size=10, ttl_seconds=60)
+    cache.add('a')
+    clock.now += 59
+    assert 'a' in cache
+    clock.now += 2
+
+    assert 'a' not in cache
+    assert len(cache) == 0
+
+
+@pytest.mark.django_db
+def test_expired_ids_are_deleted_by_the_worker_not_the_request(post_webhook):
+    old = timezone.now() - timedelta(seconds=dedup._cache.ttl_seconds + 60)
+    WebhookDelivery.objects.create(webhook_id='w-old', seen_at=old)
+    assert not is_duplicate('w-old')
+
+    post_webhook(make_order_payload(1), webhook_id='w-new')
+    assert WebhookDelivery.objects.filter(webhook_id='w-old').exists()
+
+    call_command('drain_webhook_inbox', '--expire-deliveries', stdout=StringIO())
+    assert list(WebhookDelivery.objects.values_list('webhook_id', flat=True)) == ['w-new']
+    assert expire_deliveries() == 0
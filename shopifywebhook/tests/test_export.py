@@ -0,0 +1,93 @@
+import asyncio
+import csv
+import io
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.handlers.asgi import ASGIHandler
+from django.test import Client
+
+from shopifywebhook import export
+from shopifywebhook.processing import save_orders, validate_order_data
+from shopifywebhook.synthetic import make_order_payload
+
+ORDERS = 1200  # export chunks hold 500 rows
+
+
+@pytest.fixture
+def rows_read(monkeypatch):
+    """Count the rows the export has read so far."""
+    read = []
+    iter_rows = export.iter_rows
+
+    def counting(spec):
+        for row in iter_rows(spec):
+            read.append(row)
+            yield row
+
+    monkeypatch.setattr(export, 'iter_rows', counting)
+    return read
+
+
+def get_over_asgi(path, cookie, on_body):
+    """GET path through Django's ASGI handler; on_body is called with each body message."""
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'format=csv',
+        'headers': [(b'host', b'testserver'), (b'cookie', cookie.encode())],
+        'server': ('testserver', 80), 'client': ('127.0.0.1', 50000),
+    }
+    received = False
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # The client stays connected until the response is complete
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            assert message['status'] == 200
+        elif message['type'] == 'http.response.body':
+            on_body(message)
+
+    async_to_sync(ASGIHandler())(scope, receive, send)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_export_streams_under_asgi(admin_user, rows_read):
+    save_orders([validate_order_data(make_order_payload(order_id, line_items=1)) for order_id in range(1, ORDERS + 1)])
+    client = Client()
+    client.force_login(admin_user)
+    cookie = f"sessionid={client.cookies['sessionid'].value}"
+
+    bodies = []
+    read_at_first_body = []
+
+    def on_body(message):
+        if not read_at_first_body:
+            read_at_first_body.append(len(rows_read))
+        bodies.append(message)
+
+    get_over_asgi('/api/orders/export/', cookie, on_body)
+
+    # The first chunk went out before the rest of the orders were read
+    assert read_at_first_body[0] < ORDERS
+    assert sum(1 for message in bodies if message.get('body')) >= 3
+    rows = list(csv.reader(io.StringIO(b''.join(message.get('body', b'') for message in bodies).decode())))
+    assert len(rows) == ORDERS + 1
+    assert rows[0][0] == 'order_id'
+
+
+@pytest.mark.django_db
+def test_export_streams_under_wsgi(admin_client, rows_read):
+    save_orders([validate_order_data(make_order_payload(order_id, line_items=1)) for order_id in range(1, ORDERS + 1)])
+
+    response = admin_client.get('/api/orders/export/', {'format': 'ndjson'})
+    assert response.streaming and not response.is_async
+    chunks = iter(response.streaming_content)
+    next(chunks)
+    assert len(rows_read) < ORDERS
+    assert sum(chunk.count(b'\n') for chunk in chunks) + 500 == ORDERS
@@ -0,0 +1,35 @@
+import pytest
+from django.test import Client
+
+from shopifywebhook.processing import save_orders, validate_order_data
+from shopifywebhook.synthetic import make_order_payload
+
+
+@pytest.mark.django_db
+def test_polling_pages_through_a_burst_larger_than_one_page(settings, django_capture_on_commit_callbacks):
+    settings.SHOPIFY_DASHBOARD_PAGE_SIZE = 2
+    client = Client()
+    response = client.get('/api/orders/', {'after': 0})
+    assert response.json()['orders'] == []
+    etag, cursor = response['ETag'], response.json()['cursor']
+
+    with django_capture_on_commit_callbacks(execute=True):
+        save_orders([validate_order_data(make_order_payload(order_id)) for order_id in range(1, 6)])
+
+    # Follow has_more the way the dashboard does, re-sending the last ETag
+    seen, pages = [], 0
+    while True:
+        response = client.get('/api/orders/', {'after': cursor}, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        data = response.json()
+        seen += [order['id'] for order in data['orders']]
+        etag, cursor, pages = response['ETag'], data['cursor'], pages + 1
+        if not data['has_more']:
+            break
+
+    assert seen == ['1', '2', '3', '4', '5']
+    assert pages == 3
+    # Polls at the new cursor are answered 304 until another order arrives
+    response = client.get('/api/orders/', {'after': cursor}, HTTP_IF_NONE_MATCH=etag)
+    assert response.json()['orders'] == []
+    assert client.get('/api/orders/', {'after': cursor}, HTTP_IF_NONE_MATCH=response['ETag']).status_code == 304
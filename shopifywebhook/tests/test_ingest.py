@@ -0,0 +1,93 @@
+import json
+
+import pytest
+from django.db import IntegrityError
+
+from shopifywebhook.ingest import drain_batch, enqueue_delivery
+from shopifywebhook.models import ShopifyWebhookEvent, ShopifyWebhookOrder, WebhookInboxItem
+from shopifywebhook.synthetic import make_order_payload
+from shopifywebhook.topics import TOPIC_HANDLERS, TopicHandler, register_topic, save_events, summarize_event
+
+TEST_TOPIC = 'tests/events'
+
+
+class WorkerKilled(BaseException):
+    """Stands in for a drain worker dying mid-batch; not caught like an Exception."""
+
+
+@pytest.fixture
+def test_topic():
+    """Register a topic whose save fails for payloads with an 'error' key."""
+    def validate(data):
+        return {'topic': TEST_TOPIC, 'resource_id': str(data['id']), 'order_id': '', 'raw_data': data}
+
+    def save_many(batch):
+        for data in batch:
+            error = data['raw_data'].get('error')
+            if error == 'poison':
+                raise IntegrityError(f"cannot save {data['resource_id']}")
+            if error == 'kill':
+                raise WorkerKilled()
+        return save_events(batch)
+
+    register_topic(TopicHandler(topic=TEST_TOPIC, resource='event', validate=validate,
+                                save_many=save_many, summarize=summarize_event))
+    yield
+    TOPIC_HANDLERS.pop(TEST_TOPIC)
+
+
+def enqueue(topic, payload):
+    return enqueue_delivery(json.dumps(payload).encode(), {'X-Shopify-Topic': topic})
+
+
+@pytest.mark.django_db
+def test_poison_item_is_failed_and_its_neighbours_are_saved(test_topic):
+    orders = [enqueue('orders/create', make_order_payload(order_id)) for order_id in range(1, 5)]
+    events = [enqueue(TEST_TOPIC, {'id': 1}), enqueue(TEST_TOPIC, {'id': 2, 'error': 'poison'}),
+              enqueue(TEST_TOPIC, {'id': 3})]
+    orders += [enqueue('orders/create', make_order_payload(order_id)) for order_id in range(5, 9)]
+    poison = events[1]
+
+    result = drain_batch(max_attempts=2)
+    assert (result.claimed, result.processed, result.retried, result.failed) == (11, 10, 1, 0)
+    assert ShopifyWebhookOrder.objects.count() == 8
+    assert sorted(ShopifyWebhookEvent.objects.values_list('resource_id', flat=True)) == ['1', '3']
+    poison.refresh_from_db()
+    assert (poison.status, poison.attempts) == (WebhookInboxItem.STATUS_PENDING, 1)
+    assert 'cannot save 2' in poison.last_error
+
+    # Only the poison item is claimed again, and it is failed once out of attempts
+    result = drain_batch(max_attempts=2)
+    assert (result.claimed, result.processed, result.failed) == (1, 0, 1)
+    poison.refresh_from_db()
+    assert (poison.status, poison.attempts) == (WebhookInboxItem.STATUS_FAILED, 2)
+    assert poison.processed_at is not None
+    assert WebhookInboxItem.objects.filter(status=WebhookInboxItem.STATUS_DONE).count() == 10
+
+
+@pytest.mark.django_db
+def test_undecodable_item_fails_without_retrying():
+    bad = enqueue_delivery(b'{not json', {'X-Shopify-Topic': 'orders/create'})
+    unknown = enqueue('tests/unknown', {'id': 1})
+    good = enqueue('orders/create', make_order_payload(1))
+
+    result = drain_batch()
+    assert (result.processed, result.failed, result.retried) == (1, 2, 0)
+    statuses = dict(WebhookInboxItem.objects.values_list('pk', 'status'))
+    assert statuses == {bad.pk: 'failed', unknown.pk: 'failed', good.pk: 'done'}
+
+
+@pytest.mark.django_db
+def test_batch_left_by_a_dead_worker_is_claimed_again(test_topic):
+    items = [enqueue(TEST_TOPIC, {'id': 1}), enqueue(TEST_TOPIC, {'id': 2, 'error': 'kill'})]
+
+    with pytest.raises(WorkerKilled):
+        drain_batch()
+    # The claim and attempt count rolled back with the worker's transaction
+    assert list(WebhookInboxItem.objects.values_list('status', 'attempts')) == [('pending', 0)] * 2
+    assert not ShopifyWebhookEvent.objects.exists()
+
+    WebhookInboxItem.objects.filter(pk=items[1].pk).update(body=json.dumps({'id': 2}).encode())
+    result = drain_batch()
+    assert (result.claimed, result.processed) == (2, 2)
+    assert list(WebhookInboxItem.objects.values_list('status', 'attempts')) == [('done', 1)] * 2
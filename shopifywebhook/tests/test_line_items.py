@@ -0,0 +1,69 @@
+from decimal import Decimal
+
+import pytest
+
+from shopifywebhook.models import OrderLineItem, ShopifyWebhookOrder
+from shopifywebhook.processing import save_orders, validate_order_data
+
+
+def item(sku, quantity=1, price='10.00', **fields):
+    return {'sku': sku, 'title': f'Product {sku}', 'quantity': quantity, 'price': price, **fields}
+
+
+def order(order_id, line_items, version=0):
+    return validate_order_data({
+        'id': order_id,
+        'order_number': 1000 + order_id,
+        'email': 'buyer@example.com',
+        'total_price': '10.00',
+        'updated_at': f'2025-01-01T00:0{version}:00Z',
+        'line_items': line_items,
+    })
+
+
+def stored(order_id):
+    return list(
+        OrderLineItem.objects.filter(order__order_id=order_id).order_by('position')
+        .values_list('position', 'sku', 'quantity', 'price', 'total_discount')
+    )
+
+
+@pytest.mark.django_db
+def test_line_items_are_stored_in_payload_order():
+    save_orders([order(1, [item('A', 2, '5.50', total_discount='1.00'), item('B'), item('C', 3)])])
+
+    assert stored('1') == [
+        (0, 'A', 2, Decimal('5.50'), Decimal('1.00')),
+        (1, 'B', 1, Decimal('10.00'), Decimal('0.00')),
+        (2, 'C', 3, Decimal('10.00'), Decimal('0.00')),
+    ]
+    assert ShopifyWebhookOrder.objects.get(order_id='1').line_item_count == 3
+
+
+@pytest.mark.django_db
+def test_newer_version_replaces_only_its_orders_rows():
+    save_orders([order(1, [item('A'), item('B'), item('C')]), order(2, [item('X'), item('Y')])])
+
+    save_orders([order(1, [item('D', 4)], version=1)])
+    assert stored('1') == [(0, 'D', 4, Decimal('10.00'), Decimal('0.00'))]
+    assert [row[1] for row in stored('2')] == ['X', 'Y']
+    assert ShopifyWebhookOrder.objects.get(order_id='1').line_item_count == 1
+
+    # A stale version leaves the rows of the newer one
+    assert save_orders([order(1, [item('OLD')], version=0)])[0].stale
+    assert [row[1] for row in stored('1')] == ['D']
+
+    # Removing every line item removes every row
+    save_orders([order(1, [], version=2)])
+    assert stored('1') == []
+    assert OrderLineItem.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_malformed_line_item_values_are_stored_as_defaults():
+    save_orders([order(1, [item('A', quantity='lots', price='n/a'), 'not an item', item('B')])])
+
+    assert stored('1') == [
+        (0, 'A', 0, Decimal('0.00'), Decimal('0.00')),
+        (1, 'B', 1, Decimal('10.00'), Decimal('0.00')),
+    ]
@@ -0,0 +1,155 @@
+import base64
+import hashlib
+import hmac
+import json
+import threading
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from django.test import Client
+from django.utils import timezone
+
+from shopifywebhook.models import DeadLetterEvent, OutboxEvent
+from shopifywebhook.outbox import Destination, DestinationSender, backoff_seconds, claim_events
+
+
+class EventSink:
+    """Local endpoint that answers each path with a fixed status and records the requests."""
+
+    def __init__(self, statuses):
+        self.statuses = statuses
+        self.received = []
+        sink = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                sink.received.append((self.path, dict(self.headers), json.loads(body)))
+                self.send_response(sink.statuses.get(self.path, 404))
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+
+    def destination(self, path, **options):
+        host, port = self._server.server_address[:2]
+        return Destination(name=path.strip('/'), url=f"http://{host}:{port}{path}", **options)
+
+    def __enter__(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def make_events(destination, count):
+    return [
+        OutboxEvent.objects.create(destination=destination, event_type='order.created',
+                                   order_id=str(i), data={'id': i})
+        for i in range(1, count + 1)
+    ]
+
+
+def dispatch(destination, **options):
+    sender = DestinationSender(destination)
+    try:
+        return sender.dispatch_once(**options)
+    finally:
+        sender.close()
+
+
+@pytest.mark.django_db
+def test_claim_leases_events_until_the_lease_runs_out():
+    events = make_events('erp', 3)
+    make_events('email', 1)
+
+    claimed = claim_events('erp', 2, lease_seconds=60)
+    assert [event.id for event in claimed] == [event.id for event in events[:2]]
+    # Leased events are skipped by the next claim; the third is still due
+    assert [event.id for event in claim_events('erp', 10, lease_seconds=60)] == [events[2].id]
+    assert claim_events('erp', 10, lease_seconds=60) == []
+
+    # A dispatcher that died leaves its events to be claimed again after the lease
+    OutboxEvent.objects.filter(id=events[0].id).update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+    assert [event.id for event in claim_events('erp', 10, lease_seconds=60)] == [events[0].id]
+
+
+def test_backoff_doubles_up_to_the_cap():
+    for attempts, low, high in ((1, 1, 2), (2, 2, 4), (4, 8, 16), (30, 300, 600)):
+        assert low <= backoff_seconds(attempts, base=2, cap=600) <= high
+
+
+@pytest.mark.django_db
+def test_delivered_batch_is_signed_and_marked_done():
+    events = make_events('erp', 3)
+    with EventSink({'/erp': 200}) as sink:
+        result = dispatch(sink.destination('/erp', secret='s3cret', batch_size=2))
+
+    assert (result.claimed, result.delivered) == (3, 3)
+    assert len(sink.received) == 2
+    for _, headers, body in sink.received:
+        digest = hmac.new(b's3cret', json.dumps(body, separators=(',', ':')).encode(), hashlib.sha256).digest()
+        assert headers['X-Outbox-Hmac-Sha256'] == base64.b64encode(digest).decode()
+    assert sorted(event['id'] for _, _, body in sink.received for event in body['events']) == [e.id for e in events]
+    assert not OutboxEvent.objects.exclude(status=OutboxEvent.STATUS_DONE).exists()
+
+
+@pytest.mark.django_db
+def test_failed_delivery_is_retried_with_backoff(settings):
+    settings.SHOPIFY_OUTBOX_BACKOFF_SECONDS = 10
+    make_events('fulfilment', 1)
+    with EventSink({'/fulfilment': 503}) as sink:
+        before = timezone.now()
+        result = dispatch(sink.destination('/fulfilment'), max_attempts=5)
+
+    assert (result.retried, result.dead) == (1, 0)
+    event = OutboxEvent.objects.get()
+    assert event.status == OutboxEvent.STATUS_PENDING
+    assert event.attempts == 1
+    assert event.last_error.startswith('HTTP 503')
+    assert before + timedelta(seconds=5) <= event.next_attempt_at <= timezone.now() + timedelta(seconds=10)
+    # Not due again until the backoff has passed
+    assert claim_events('fulfilment', 10, lease_seconds=60) == []
+
+
+@pytest.mark.django_db
+def test_event_is_dead_lettered_after_max_attempts():
+    make_events('fulfilment', 1)
+    with EventSink({'/fulfilment': 503}) as sink:
+        destination = sink.destination('/fulfilment')
+        for attempt in range(3):
+            OutboxEvent.objects.update(next_attempt_at=timezone.now())
+            result = dispatch(destination, max_attempts=3)
+
+    assert (result.retried, result.dead) == (0, 1)
+    assert len(sink.received) == 3
+    assert not OutboxEvent.objects.exists()
+    dead = DeadLetterEvent.objects.get()
+    assert (dead.destination, dead.order_id, dead.attempts) == ('fulfilment', '1', 3)
+    assert dead.last_error.startswith('HTTP 503')
+
+
+@pytest.mark.django_db
+def test_rejected_event_is_dead_lettered_without_retrying():
+    make_events('email', 2)
+    with EventSink({'/email': 400}) as sink:
+        result = dispatch(sink.destination('/email'), max_attempts=5)
+
+    assert (result.retried, result.dead) == (0, 2)
+    assert DeadLetterEvent.objects.filter(attempts=1).count() == 2
+
+
+@pytest.mark.django_db
+def test_outbox_status_needs_staff_or_status_token(settings):
+    settings.SHOPIFY_STATUS_TOKEN = 'status-token'
+    url = '/webhooks/shopify/outbox/status/'
+
+    assert Client().get(url).status_code == 403
+    assert Client(HTTP_AUTHORIZATION='Bearer wrong').get(url).status_code == 403
+    assert Client(HTTP_AUTHORIZATION='Bearer status-token').get(url).status_code == 200
@@ -0,0 +1,97 @@
+import pytest
+from django.test import Client
+
+from shopifywebhook.models import OrderSearchToken, ShopifyWebhookOrder
+from shopifywebhook.processing import save_orders, validate_order_data
+from shopifywebhook.search import rebuild_search_index, search_orders
+
+
+def order(order_id, sku, tags='', first_name='Ann', version=0, **fields):
+    return validate_order_data({
+        'id': order_id,
+        'order_number': 1000 + order_id,
+        'email': f'buyer{order_id}@example.com',
+        'total_price': '10.00',
+        'updated_at': f'2025-01-01T00:0{version}:00Z',
+        'customer': {'first_name': first_name, 'last_name': 'Smith'},
+        'tags': tags,
+        'line_items': [{'sku': sku, 'title': 'Blue Shirt', 'quantity': 1, 'price': '10.00'}],
+        **fields,
+    })
+
+
+def found(query):
+    orders, _ = search_orders(query, limit=100)
+    return sorted(order.order_id for order in orders)
+
+
+@pytest.fixture
+def orders(db):
+    save_orders([
+        order(1, 'ABC-12', tags='vip, wholesale'),
+        order(2, 'ABC-13', tags='vip', first_name='Bob'),
+        order(3, 'XYZ-1'),
+    ])
+
+
+def test_terms_match_stored_tokens(orders):
+    assert found('sku:abc-12') == ['1']
+    assert found('ABC-1*') == ['1', '2']
+    assert found('tag:vip') == ['1', '2']
+    assert found('tag:vip bob') == ['2']
+    assert found('smi*') == ['1', '2', '3']
+    assert found('buyer3@example.com') == ['3']
+    assert found('1002') == ['2']
+    assert found('shirt sku:xyz-1') == ['3']
+    assert found('nothing') == []
+    with pytest.raises(ValueError):
+        search_orders('*')
+
+
+def test_newer_version_replaces_tokens_and_stale_one_does_not(orders):
+    save_orders([order(1, 'NEW-1', tags='returned', version=1)])
+    assert found('sku:abc-12') == []
+    assert found('sku:new-1') == ['1']
+    assert found('tag:vip') == ['2']
+    assert found('tag:returned') == ['1']
+
+    assert save_orders([order(1, 'OLD-1', version=0)])[0].stale
+    assert found('sku:old-1') == []
+    assert found('sku:new-1') == ['1']
+
+
+def test_rebuild_restores_the_index(orders):
+    OrderSearchToken.objects.all().delete()
+    assert found('tag:vip') == []
+
+    assert rebuild_search_index(batch_size=2) == 3
+    assert found('tag:vip') == ['1', '2']
+    assert found('sku:xyz-1') == ['3']
+
+
+def test_search_endpoint_is_staff_only_and_pages(orders, admin_client):
+    url = '/api/orders/search/'
+    assert Client().get(url, {'q': 'smith'}).status_code == 302
+
+    first = admin_client.get(url, {'q': 'smith', 'limit': 2}).json()
+    second = admin_client.get(url, {'q': 'smith', 'limit': 2, 'before': first['next_cursor']}).json()
+    assert len(first['orders']) == 2 and first['next_cursor']
+    assert len(second['orders']) == 1 and second['next_cursor'] is None
+    ids = {o['id'] for o in first['orders'] + second['orders']}
+    assert ids == {'1', '2', '3'}
+    assert admin_client.get(url, {'q': 'sku:'}).status_code == 400
+
+
+def test_admin_search_matches_substrings_and_tokens(orders, admin_client):
+    def admin_search(query):
+        response = admin_client.get('/admin/shopifywebhook/shopifywebhookorder/', {'q': query})
+        assert response.status_code == 200
+        return sorted(order.order_id for order in response.context['cl'].result_list)
+
+    # Substrings of search_fields, which the token index does not hold
+    assert admin_search('uyer2@exam') == ['2']
+    assert admin_search('100') == ['1', '2', '3']
+    # Token syntax
+    assert admin_search('sku:abc-12') == ['1']
+    assert admin_search('tag:vip') == ['1', '2']
+    assert ShopifyWebhookOrder.objects.count() == 3
@@ -0,0 +1,111 @@
+import base64
+import json
+import os
+import time
+
+import pytest
+
+from shopifywebhook.models import ShopifyWebhookOrder
+from shopifywebhook.shop_secrets import ShopSecretRegistry, shop_secrets, signing_key, verify_hmac
+from shopifywebhook.synthetic import make_order_payload
+from shopifywebhook.tests.signing import sign
+
+BODY = b'{"id": 1}'
+
+
+def test_signature_is_checked_against_the_raw_body():
+    keys = (signing_key('s3cret'),)
+    assert verify_hmac(BODY, sign(BODY, 's3cret'), keys)
+    assert not verify_hmac(BODY + b' ', sign(BODY, 's3cret'), keys)
+    assert not verify_hmac(BODY, sign(BODY, 'other'), keys)
+    assert not verify_hmac(BODY, sign(BODY, 's3cret'), ())
+
+
+@pytest.mark.parametrize('header', [
+    '',
+    'not base64 at all!',
+    'YWJj',  # valid base64, 3 bytes
+    base64.b64encode(b'x' * 31).decode(),
+    base64.b64encode(b'x' * 33).decode(),
+])
+def test_malformed_or_wrong_length_header_is_rejected(header):
+    assert not verify_hmac(BODY, header, (signing_key('s3cret'),))
+
+
+def test_previous_secret_is_accepted_only_until_it_expires():
+    registry = ShopSecretRegistry()
+    registry.load({'shop.myshopify.com': {
+        'secret': 'new', 'previous': 'old', 'previous_expires': '2025-07-01T00:00:00Z',
+    }})
+    keys = registry.keys_for('shop.myshopify.com')
+    expires = keys[1][1]
+
+    assert verify_hmac(BODY, sign(BODY, 'new'), keys, now=expires + 1)
+    assert verify_hmac(BODY, sign(BODY, 'old'), keys, now=expires - 1)
+    assert not verify_hmac(BODY, sign(BODY, 'old'), keys, now=expires)
+
+
+def test_keys_are_looked_up_per_shop_with_the_default_as_fallback():
+    registry = ShopSecretRegistry()
+    registry.load({'A.myshopify.com': 'secret-a', 'b.myshopify.com': {'secret': 'secret-b'}},
+                  default=(signing_key('default'),))
+
+    assert verify_hmac(BODY, sign(BODY, 'secret-a'), registry.keys_for('a.myshopify.com'))
+    assert verify_hmac(BODY, sign(BODY, 'secret-a'), registry.keys_for(' A.myshopify.com '))
+    assert not verify_hmac(BODY, sign(BODY, 'secret-b'), registry.keys_for('a.myshopify.com'))
+    assert verify_hmac(BODY, sign(BODY, 'default'), registry.keys_for('other.myshopify.com'))
+    assert verify_hmac(BODY, sign(BODY, 'default'), registry.keys_for(''))
+    assert not verify_hmac(BODY, sign(BODY, 'default'), registry.keys_for('a.myshopify.com'))
+
+
+@pytest.mark.parametrize('shops', [
+    {'shop.myshopify.com': {'previous': 'old'}},
+    {'shop.myshopify.com': ''},
+    {'shop.myshopify.com': {'secret': 'new', 'previous': 'old', 'previous_expires': 'next week'}},
+])
+def test_bad_entries_are_rejected(shops):
+    with pytest.raises(ValueError):
+        ShopSecretRegistry().load(shops)
+
+
+@pytest.mark.django_db
+def test_requests_are_verified_with_their_shops_secret(post_webhook, settings):
+    settings.SHOPIFY_SHOP_SECRETS = {'shop.myshopify.com': 'shop-secret'}
+    payload = make_order_payload(1)
+    body = json.dumps(payload).encode()
+
+    def post(secret, shop):
+        return post_webhook(body, hmac=sign(body, secret), HTTP_X_SHOPIFY_SHOP_DOMAIN=shop)
+
+    assert post('test-secret', 'shop.myshopify.com').status_code == 401
+    assert post('shop-secret', 'other.myshopify.com').status_code == 401
+    assert post('shop-secret', 'shop.myshopify.com').status_code == 200
+    assert ShopifyWebhookOrder.objects.get().shop_domain == 'shop.myshopify.com'
+
+
+def test_secrets_file_is_reloaded_when_it_changes(settings, tmp_path):
+    path = tmp_path / 'secrets.json'
+    path.write_text(json.dumps({'shop.myshopify.com': 'first'}))
+    settings.SHOPIFY_SHOP_SECRETS_RELOAD_SECONDS = 0
+    settings.SHOPIFY_SHOP_SECRETS_FILE = str(path)
+
+    assert verify_hmac(BODY, sign(BODY, 'first'), shop_secrets.keys_for('shop.myshopify.com'))
+
+    path.write_text(json.dumps({'shop.myshopify.com': 'second'}))
+    os.utime(path, (time.time() + 10, time.time() + 10))
+    keys = shop_secrets.keys_for('shop.myshopify.com')
+    assert verify_hmac(BODY, sign(BODY, 'second'), keys)
+    assert not verify_hmac(BODY, sign(BODY, 'first'), keys)
+
+    # A broken file keeps the keys already loaded
+    path.write_text('{not json')
+    os.utime(path, (time.time() + 20, time.time() + 20))
+    assert verify_hmac(BODY, sign(BODY, 'second'), shop_secrets.keys_for('shop.myshopify.com'))
+
+
+def test_changing_the_secret_setting_reloads_the_keys(settings):
+    settings.SHOPIFY_WEBHOOK_SECRET = 'first'
+    assert verify_hmac(BODY, sign(BODY, 'first'), shop_secrets.keys_for(''))
+    settings.SHOPIFY_WEBHOOK_SECRET = 'second'
+    assert not verify_hmac(BODY, sign(BODY, 'first'), shop_secrets.keys_for(''))
+    assert verify_hmac(BODY, sign(BODY, 'second'), shop_secrets.keys_for(''))
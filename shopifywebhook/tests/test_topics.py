@@ -0,0 +1,60 @@
+import pytest
+
+from shopifywebhook.models import ShopifyWebhookEvent, ShopifyWebhookOrder, WebhookDelivery, WebhookInboxItem
+from shopifywebhook.synthetic import make_order_payload
+from shopifywebhook.topics import TOPIC_REQUESTS, UNHANDLED_TOPIC
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('ingest_mode', ['sync', 'queue'])
+def test_unknown_topic_is_acknowledged_and_not_stored(post_webhook, settings, ingest_mode):
+    settings.SHOPIFY_WEBHOOK_INGEST_MODE = ingest_mode
+    before = TOPIC_REQUESTS.value(topic=UNHANDLED_TOPIC, status=200)
+
+    for topic in ('customers/create', ''):
+        response = post_webhook({'id': 1}, topic=topic, webhook_id=f'w-{topic}')
+        assert response.status_code == 200
+        assert response.json()['status'] == 'ignored'
+
+    assert not ShopifyWebhookOrder.objects.exists()
+    assert not ShopifyWebhookEvent.objects.exists()
+    assert not WebhookInboxItem.objects.exists()
+    assert not WebhookDelivery.objects.exists()
+    assert TOPIC_REQUESTS.value(topic=UNHANDLED_TOPIC, status=200) == before + 2
+    assert TOPIC_REQUESTS.value(topic='customers/create', status=200) == 0
+
+
+@pytest.mark.django_db
+def test_event_topics_are_stored_as_events(post_webhook):
+    refund = {'id': 77, 'order_id': 5, 'note': 'damaged'}
+    response = post_webhook(refund, topic='refunds/create')
+    assert response.json() == {
+        'status': 'success', 'message': 'Refund saved successfully', 'refund': {'id': '77', 'order_id': '5'},
+    }
+    post_webhook({'id': 88, 'title': 'Shirt'}, topic='products/update')
+
+    events = {event.topic: event for event in ShopifyWebhookEvent.objects.all()}
+    assert set(events) == {'refunds/create', 'products/update'}
+    assert (events['refunds/create'].resource_id, events['refunds/create'].order_id) == ('77', '5')
+    assert events['refunds/create'].raw_data == refund
+    assert events['products/update'].order_id == ''
+    assert not ShopifyWebhookOrder.objects.exists()
+
+
+@pytest.mark.django_db
+def test_event_missing_required_fields_is_rejected(post_webhook):
+    response = post_webhook({'id': 77}, topic='refunds/create')
+    assert response.status_code == 400
+    assert 'order_id' in response.json()['details']
+    assert not ShopifyWebhookEvent.objects.exists()
+
+
+@pytest.mark.django_db
+def test_every_order_topic_upserts_the_order(post_webhook):
+    payload = make_order_payload(1)
+    for minute, topic in enumerate(('orders/create', 'orders/updated', 'orders/paid', 'orders/cancelled')):
+        payload = {**payload, 'email': f'{minute}@example.com', 'updated_at': f'2025-02-01T00:0{minute}:00Z'}
+        assert post_webhook(payload, topic=topic).json()['status'] == 'success'
+
+    assert list(ShopifyWebhookOrder.objects.values_list('order_id', 'email')) == [('1', '3@example.com')]
+    assert not ShopifyWebhookEvent.objects.exists()
@@ -0,0 +1,85 @@
+import random
+import threading
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+
+from shopifywebhook.models import ShopifyWebhookOrder
+from shopifywebhook.topics import get_handler
+
+BASE_TIME = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def delivery(order_id, version, triggered_offset=1):
+    """Version `version` of an order: updated a minute after the previous one, total version + 1."""
+    updated_at = BASE_TIME + timedelta(minutes=version)
+    payload = {
+        'id': order_id,
+        'order_number': 1000 + order_id,
+        'email': f'customer{order_id}@example.com',
+        'total_price': f'{version + 1}.00',
+        'updated_at': updated_at.isoformat(),
+        'line_items': [{'id': 1, 'sku': 'SKU-1', 'title': 'Shirt', 'quantity': 1, 'price': '1.00'}],
+    }
+    headers = {'X-Shopify-Triggered-At': (updated_at + timedelta(seconds=triggered_offset)).isoformat()}
+    return payload, headers
+
+
+def save(payload, headers):
+    handler = get_handler('orders/updated')
+    return handler.save_many([handler.clean(payload, headers)])[0]
+
+
+@pytest.mark.django_db
+def test_older_delivery_after_newer_is_stale():
+    assert not save(*delivery(1, 2)).stale
+    late = save(*delivery(1, 1))
+
+    assert late.stale and late.pk is None
+    order = ShopifyWebhookOrder.objects.get(order_id='1')
+    assert order.total_price == Decimal('3.00')
+    assert order.shopify_updated_at == BASE_TIME + timedelta(minutes=2)
+
+
+@pytest.mark.django_db
+def test_same_version_triggered_later_wins():
+    save(*delivery(1, 0, triggered_offset=1))
+    payload, headers = delivery(1, 0, triggered_offset=5)
+    payload['total_price'] = '9.00'
+
+    assert not save(payload, headers).stale
+    assert save(*delivery(1, 0, triggered_offset=3)).stale
+    assert ShopifyWebhookOrder.objects.get(order_id='1').total_price == Decimal('9.00')
+
+
+@pytest.mark.django_db(transaction=True)
+def test_shuffled_concurrent_deliveries_keep_newest_version():
+    orders, versions, threads = 40, 5, 8
+    deliveries = [delivery(order_id, version) for order_id in range(1, orders + 1) for version in range(versions)]
+    random.Random(1).shuffle(deliveries)
+    errors = []
+
+    def replay(share):
+        try:
+            for payload, headers in share:
+                try:
+                    save(payload, headers)
+                except Exception as e:
+                    errors.append(e)
+        finally:
+            connection.close()
+
+    workers = [threading.Thread(target=replay, args=(deliveries[i::threads],)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert not errors
+    assert ShopifyWebhookOrder.objects.count() == orders
+    not_newest = ShopifyWebhookOrder.objects.exclude(
+        total_price=versions, shopify_updated_at=BASE_TIME + timedelta(minutes=versions - 1),
+    )
+    assert list(not_newest.values_list('order_id', flat=True)) == []
@@ -0,0 +1,212 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+from django.conf import settings
+from .batching import OrderBatcher
+from .instrumentation import REGISTRY
+from .models import ShopifyWebhookEvent
+from .payloads import compress_payload, parse_shopify_datetime
+from .processing import validate_order_data, save_orders
+
+# Label used for deliveries whose topic has no handler, so unknown topics
+# cannot blow up metric cardinality
+UNHANDLED_TOPIC = 'unhandled'
+
+TOPIC_REQUESTS = REGISTRY.counter(
+    'shopify_webhook_topic_requests_total',
+    'Webhook requests by topic and HTTP status',
+    ['topic', 'status'],
+)
+TOPIC_SECONDS = REGISTRY.histogram(
+    'shopify_webhook_topic_seconds',
+    'Time to handle a webhook request, by topic',
+    ['topic'],
+)
+
+
+@dataclass(eq=False)
+class TopicHandler:
+    """
+    How deliveries for one Shopify webhook topic are validated and persisted.
+
+    Attributes:
+        topic (str): The X-Shopify-Topic value, e.g. 'orders/create'
+        resource (str): Name used in responses and log events, e.g. 'order'
+        validate (callable): Payload dict in, cleaned dict out; raises ValueError
+        save_many (callable): Persists a list of cleaned dicts, returns the saved objects
+        summarize (callable): Saved object in, small JSON-safe dict out
+        batchable (bool): Whether concurrent saves may be micro-batched
+    """
+    topic: str
+    resource: str
+    validate: Callable
+    save_many: Callable
+    summarize: Callable
+    batchable: bool = False
+    _batcher: OrderBatcher = field(default=None, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    @property
+    def batch_window_ms(self):
+        """Micro-batch window for this topic; 0 saves every delivery on its own."""
+        if not self.batchable:
+            return 0
+        overrides = getattr(settings, 'SHOPIFY_WEBHOOK_TOPIC_BATCH_WINDOW_MS', {})
+        return overrides.get(self.topic, getattr(settings, 'SHOPIFY_WEBHOOK_BATCH_WINDOW_MS', 0))
+
+    def clean(self, data, headers):
+        """
+        Validate a decoded payload and attach delivery metadata.
+
+        Args:
+            data: The decoded webhook body
+            headers: The delivery's headers (request headers or an inbox item's)
+
+        Returns:
+            dict: Output of self.validate plus webhook_triggered_at and shop_domain
+
+        Raises:
+            ValueError: If the payload is invalid
+        """
+        cleaned = self.validate(data)
+        cleaned['webhook_triggered_at'] = parse_shopify_datetime(headers.get('X-Shopify-Triggered-At'))
+        cleaned['shop_domain'] = (headers.get('X-Shopify-Shop-Domain') or '').strip().lower()[:255]
+        return cleaned
+
+    def save(self, data):
+        """
+        Persist one validated payload, micro-batched when the topic allows it.
+
+        Args:
+            data (dict): Output of self.clean
+
+        Returns:
+            The saved object
+        """
+        window_ms = self.batch_window_ms
+        if not window_ms:
+            return self.save_many([data])[0]
+        with self._lock:
+            if self._batcher is None:
+                self._batcher = OrderBatcher(
+                    window_ms / 1000.0,
+                    max_batch_size=getattr(settings, 'SHOPIFY_WEBHOOK_BATCH_MAX_SIZE', 100),
+                    save_many=self.save_many,
+                )
+        return self._batcher.submit(data)
+
+
+# Precomputed topic -> handler lookup used by the dispatch view and the drain worker
+TOPIC_HANDLERS = {}
+
+
+def register_topic(handler):
+    """
+    Add a handler to the registry, replacing any existing one for its topic.
+
+    Args:
+        handler (TopicHandler): The handler to register
+
+    Returns:
+        TopicHandler: The same handler
+    """
+    TOPIC_HANDLERS[handler.topic] = handler
+    return handler
+
+
+def get_handler(topic):
+    """Return the handler registered for topic, or None."""
+    return TOPIC_HANDLERS.get(topic)
+
+
+def observe_topic(topic, status, started_at):
+    """
+    Record one handled request in the per-topic counters.
+
+    Args:
+        topic (str): The delivery's topic; unregistered topics are counted as 'unhandled'
+        status (int): HTTP status of the response
+        started_at (float): perf_counter() value taken when the request arrived
+    """
+    label = topic if topic in TOPIC_HANDLERS else UNHANDLED_TOPIC
+    TOPIC_REQUESTS.inc(topic=label, status=status)
+    TOPIC_SECONDS.observe(time.perf_counter() - started_at, topic=label)
+
+
+def summarize_order(order):
+    return {
+        "id": order.order_id,
+        "number": order.order_number,
+        "email": order.email,
+        "total_price": str(order.total_price),
+    }
+
+
+def summarize_event(event):
+    return {"id": event.resource_id, "order_id": event.order_id or None}
+
+
+def _event_validator(topic, required_fields):
+    def validate(data):
+        if not isinstance(data, dict):
+            raise ValueError(f"Expected dictionary, got {type(data)}")
+        missing_fields = [name for name in required_fields if data.get(name) in (None, '')]
+        if missing_fields:
+            raise ValueError(f"Missing required fields: {', '.join(missing_fields)}")
+        return {
+            'topic': topic,
+            'resource_id': str(data['id']).strip(),
+            'order_id': str(data.get('order_id') or '').strip(),
+            'raw_data': data,
+        }
+    return validate
+
+
+def save_events(event_dicts):
+    """
+    Append validated non-order payloads with one bulk insert.
+
+    Args:
+        event_dicts (iterable): Dicts as returned by an event validator
+
+    Returns:
+        list: The saved ShopifyWebhookEvent instances, in input order
+    """
+    events = [
+        ShopifyWebhookEvent(
+            topic=event_data['topic'],
+            resource_id=event_data['resource_id'],
+            order_id=event_data['order_id'],
+            data=compress_payload(event_data['raw_data']),
+        )
+        for event_data in event_dicts
+    ]
+    return ShopifyWebhookEvent.objects.bulk_create(events)
+
+
+# Every order topic carries a full order payload, so they share one upsert
+for _topic in ('orders/create', 'orders/updated', 'orders/paid', 'orders/cancelled'):
+    register_topic(TopicHandler(
+        topic=_topic,
+        resource='order',
+        validate=validate_order_data,
+        save_many=save_orders,
+        summarize=summarize_order,
+        batchable=True,
+    ))
+
+register_topic(TopicHandler(
+    topic='refunds/create',
+    resource='refund',
+    validate=_event_validator('refunds/create', ('id', 'order_id')),
+    save_many=save_events,
+    summarize=summarize_event,
+))
+register_topic(TopicHandler(
+    topic='products/update',
+    resource='product',
+    validate=_event_validator('products/update', ('id',)),
+    save_many=save_events,
+    summarize=summarize_event,
+))
@@ -1,9 +1,15 @@
 from django.urls import path
-from . import views
+from . import views, webhook_urls
 
 app_name = 'shopifywebhook'
 
 urlpatterns = [
     path('', views.index, name='index'),
-    path('webhooks/shopify/order/create/', views.webhook_order_created, name='webhook_order_created'),
+    path('api/orders/', views.orders_feed, name='orders_feed'),
+    path('api/orders/stream/', views.orders_stream, name='orders_stream'),
+    path('api/stats/', views.sales_stats, name='sales_stats'),
+    path('api/orders/search/', views.order_search, name='order_search'),
+    path('api/orders/export/', views.export_orders, name='export_orders'),
+    path('webhooks/shopify/outbox/status/', views.outbox_status, name='outbox_status'),
+    *webhook_urls.urlpatterns,
 ]
@@ -1,119 +1,61 @@
-import json
-import hmac
-import hashlib
-import base64
-from decimal import Decimal
+import asyncio
+import logging
 from datetime import datetime
-from django.http import HttpResponse, JsonResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
-from django.views.decorators.csrf import csrf_exempt
+from django.template.loader import render_to_string
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition, require_GET
 from django.conf import settings
-from django.core.exceptions import ValidationError
-from .models import ShopifyWebhookOrder
-
-def validate_order_data(data):
-    """
-    Validate and clean order data from Shopify webhook.
-    
-    Args:
-        data (dict): Raw order data from Shopify webhook
-        
-    Returns:
-        dict: Cleaned and validated order data
-        
-    Raises:
-        ValueError: If required fields are missing or invalid
-    """
-    if not isinstance(data, dict):
-        raise ValueError(f"Expected dictionary, got {type(data)}")
-
-    required_fields = ['id', 'order_number', 'total_price']
-    missing_fields = [field for field in required_fields if not data.get(field)]
-    
-    if missing_fields:
-        raise ValueError(f"Missing required fields: {', '.join(missing_fields)}")
-        
-    try:
-        # Clean and validate order ID
-        try:
-            order_id = str(data['id']).strip()
-            if not order_id:
-                raise ValueError("Order ID cannot be empty")
-        except (TypeError, ValueError) as e:
-            raise ValueError(f"Invalid order ID: {str(e)}")
-            
-        # Clean and validate order number
-        try:
-            order_number = str(data['order_number']).strip()
-            if not order_number:
-                raise ValueError("Order number cannot be empty")
-        except (TypeError, ValueError) as e:
-            raise ValueError(f"Invalid order number: {str(e)}")
-            
-        # Clean and validate total price
-        try:
-            total_price = Decimal(str(data['total_price']))
-            if total_price < 0:
-                raise ValueError("Total price cannot be negative")
-        except (TypeError, ValueError, DecimalException) as e:
-            raise ValueError(f"Invalid total price: {str(e)}")
-            
-        # Clean and validate email (optional)
-        email = data.get('email')
-        if email:
-            email = str(email).strip()
-            if not '@' in email:
-                raise ValueError("Invalid email format")
-                
-        order_data = {
-            'order_id': order_id,
-            'order_number': order_number,
-            'email': email or None,
-            'total_price': total_price,
-            'raw_data': data
-        }
-        
-        print("\n=== Validated Order Data ===")
-        for key, value in order_data.items():
-            if key != 'raw_data':  # Skip printing raw data
-                print(f"{key}: {value}")
-        print("==========================")
-        
-        return order_data
-        
-    except Exception as e:
-        print(f"\nValidation Error: {str(e)}")
-        print(f"Input data: {json.dumps(data, indent=2)}")
-        raise ValueError(f"Data validation failed: {str(e)}")
+from django.contrib.admin.views.decorators import staff_member_required
+from .outbox import outbox_stats
+from .queries import (
+    recent_orders_page, list_orders, cached_order_count, orders_high_water, orders_after,
+    order_summary,
+)
+from .pubsub import order_events, SubscriberDropped
+from .rollups import dashboard_stats
+from .dashboard_cache import cached
+from .search import search_orders
+from .export import ExportSpec, aiter_export, iter_export, parse_moment
+from .webhooks import status_endpoint
+from .instrumentation import log_event, logger
 
 def index(request):
     """
     View to display all orders in a nice HTML interface
     """
     try:
-        print("\n=== Dashboard Request ===")
-        print(f"Request Method: {request.method}")
-        print(f"Host: {request.get_host()}")
-        print(f"User Agent: {request.headers.get('User-Agent', 'Unknown')}")
-        
-        # Get all orders with debug logging
+        # Get one page of orders, starting after the ?before= cursor if given.
+        # The first page and the summary figures are cached per data version,
+        # so viewers share one render until the next order is saved
+        before = request.GET.get('before') or None
         try:
-            orders = ShopifyWebhookOrder.objects.all().order_by('-created_at')
-            order_count = orders.count()
-            print(f"Found {order_count} orders in database")
+            try:
+                order_cards = _order_cards(before)
+            except ValueError:
+                before = None
+                order_cards = _order_cards(None)
+            order_count = cached_order_count()
         except Exception as e:
-            print(f"Error fetching orders: {str(e)}")
-            orders = []
+            log_event(logging.ERROR, 'dashboard.orders_failed', error=str(e))
+            order_cards = ''
             order_count = 0
         
         # Get the latest order if any exists
         try:
-            latest_order = orders.first() if orders.exists() else None
-            if latest_order:
-                print(f"Latest order: {latest_order.order_number} - {latest_order.email} - {latest_order.created_at}")
+            latest_order = cached('latest_order', lambda: list_orders().first())
         except Exception as e:
-            print(f"Error getting latest order: {str(e)}")
+            log_event(logging.ERROR, 'dashboard.latest_order_failed', error=str(e))
             latest_order = None
+
+        # Sales figures come from the rollup tables, never from scanning orders
+        try:
+            stats = cached('stats', dashboard_stats)
+        except Exception as e:
+            log_event(logging.ERROR, 'dashboard.stats_failed', error=str(e))
+            stats = None
         
         # Get the webhook URL from request
         try:
@@ -132,31 +74,29 @@ def index(request):
                 scheme = request.scheme
                 webhook_url = f"{scheme}://{host}/webhooks/shopify/order/create/"
             
-            print(f"Webhook URL: {webhook_url}")
-            print(f"Host: {host}")
-            print(f"Environment: {'ngrok' if 'ngrok' in host else 'PythonAnywhere' if 'pythonanywhere.com' in host else 'other'}")
-            
             # Validate the URL matches expected format
             if not webhook_url.startswith(('http://', 'https://')):
                 raise ValueError("Invalid URL scheme")
                 
         except Exception as e:
-            print(f"Error constructing webhook URL: {str(e)}")
+            log_event(logging.WARNING, 'dashboard.webhook_url_failed', error=str(e))
             webhook_url = "https://315995d12acc.ngrok-free.app/webhooks/shopify/order/create/"
         
         # Build context for template
         context = {
-            'orders': orders,
+            'order_cards': order_cards,
+            'is_first_page': before is None,
             'latest_order': latest_order,
             'webhook_url': webhook_url,
             'order_count': order_count,
+            'stats': stats,
             'last_checked': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
         }
         
         return render(request, 'shopifywebhook/orders.html', context)
         
     except Exception as e:
-        print(f"Unexpected error in dashboard view: {str(e)}")
+        logger.exception("Unexpected error in dashboard view")
         error_context = {
             'error_message': "An error occurred while loading the dashboard.",
             'webhook_url': f"https://{request.get_host()}/webhooks/shopify/order/create/",
@@ -164,171 +104,176 @@ def index(request):
         }
         return render(request, 'shopifywebhook/orders.html', error_context, status=500)
 
-@csrf_exempt
-def webhook_order_created(request):
-    print("\n=== Webhook Request Received ===")
-    print(f"Method: {request.method}")
-    print(f"Content Type: {request.content_type}")
-    print(f"Request Path: {request.path}")
-    print(f"Query String: {request.META.get('QUERY_STRING', '')}")
-    print("Headers:")
-    for key, value in request.headers.items():
-        print(f"  {key}: {value}")
-    
-    if request.method == 'GET':
-        return JsonResponse({
-            "status": "ok",
-            "message": "Webhook endpoint is live (GET request)",
-            "timestamp": datetime.now().isoformat()
-        })
+def _order_cards(before):
+    # Only the first page is cached: the cursor comes from the query string, so
+    # caching every page would let anyone add cache entries without limit
+    if before is None:
+        return cached('order_cards', lambda: _render_order_cards(None))
+    return _render_order_cards(before)
 
-    if request.method != 'POST':
-        return HttpResponse("Method Not Allowed", status=405)
+def _render_order_cards(before):
+    """
+    Render one page of order cards with its pagination links.
 
-    print("Received webhook request")
-    print(f"Request headers: {dict(request.headers)}")
-    
-    # Verify Shopify webhook
-    hmac_header = request.META.get('HTTP_X_SHOPIFY_HMAC_SHA256', '')
-    webhook_secret = settings.SHOPIFY_WEBHOOK_SECRET
-    print(f"Webhook Secret from settings: {webhook_secret}")
-    
-    print(f"Verifying webhook with HMAC: {hmac_header}")
-    
-    if not webhook_secret:
-        print("Warning: SHOPIFY_WEBHOOK_SECRET is not set!")
-        return HttpResponse("Webhook secret not configured", status=500)
-    
-    if not verify_webhook(request.body, hmac_header, webhook_secret):
-        print("Webhook verification failed!")
-        return HttpResponse("Invalid webhook signature", status=401)
+    Returns:
+        str: The HTML, empty when there are no orders
 
+    Raises:
+        ValueError: If before is not a valid cursor
+    """
+    orders, next_cursor = recent_orders_page(before, limit=settings.SHOPIFY_DASHBOARD_PAGE_SIZE)
+    if not orders:
+        return ''
+    return render_to_string('shopifywebhook/_order_cards.html', {
+        'orders': orders,
+        'next_cursor': next_cursor,
+        'is_first_page': before is None,
+    })
+
+def _orders_feed_etag(request):
+    # The cursor is part of the ETag: a client following has_more sends the
+    # previous page's ETag, which must not match the next page
     try:
-        # Log raw request body for debugging
-        print("\n=== Raw Request Body ===")
-        try:
-            print(request.body.decode('utf-8'))
-        except UnicodeDecodeError:
-            print("(Could not decode request body as UTF-8)")
-        print("=====================")
+        after = int(request.GET.get('after', 0))
+    except ValueError:
+        after = 'invalid'
+    return f"orders-{after}-{orders_high_water()[0]}"
 
-        # Parse webhook data
-        try:
-            data = json.loads(request.body)
-        except json.JSONDecodeError as e:
-            print(f"JSON Decode Error: {str(e)}")
-            print(f"Request Body (first 1000 chars): {request.body[:1000]}")
-            return JsonResponse({
-                "status": "error",
-                "message": "Invalid JSON data",
-                "details": str(e)
-            }, status=400)
+def _orders_feed_last_modified(request):
+    return orders_high_water()[1]
 
-        # Log parsed data
-        print("\n=== Parsed Order Data ===")
-        print(json.dumps(data, indent=2))
-        print("=====================")
-        
-        # Extract and validate important fields
-        print("\n=== Order Details ===")
-        for field in ['id', 'order_number', 'email', 'total_price']:
-            value = data.get(field)
-            print(f"{field}: {value} (type: {type(value)})")
-        print("=====================")
-        
-        # Validate and process the order
+@require_GET
+@condition(etag_func=_orders_feed_etag, last_modified_func=_orders_feed_last_modified)
+def orders_feed(request):
+    """
+    Return orders newer than the client's ?after=<pk> cursor as JSON.
+
+    The ETag and Last-Modified headers come from the cached newest-order marker,
+    so a poll with nothing new is answered 304 without querying the orders table.
+    """
+    try:
+        after = int(request.GET.get('after', 0))
+    except ValueError:
+        return JsonResponse({"status": "error", "message": "Invalid cursor"}, status=400)
+
+    high_water_id, _ = orders_high_water()
+    if after >= high_water_id:
+        orders, has_more = [], False
+    else:
+        orders, has_more = orders_after(after, limit=settings.SHOPIFY_DASHBOARD_PAGE_SIZE)
+
+    response = JsonResponse({
+        "orders": [order_summary(order) for order in orders],
+        "cursor": orders[-1].pk if orders else after,
+        "has_more": has_more,
+        "order_count": cached_order_count(),
+    })
+    patch_cache_control(response, no_cache=True)
+    return response
+
+@require_GET
+@staff_member_required
+def order_search(request):
+    """
+    Search orders by number, email, customer name, SKU, product word, tag or
+    discount code, e.g. ?q=sku:ABC-12 tag:vip, newest first, for staff users.
+
+    Pages with ?before=<cursor> like the dashboard; at most 100 orders per page.
+    """
+    try:
+        limit = min(max(int(request.GET.get('limit', settings.SHOPIFY_DASHBOARD_PAGE_SIZE)), 1), 100)
+        orders, next_cursor = search_orders(
+            request.GET.get('q', ''), before=request.GET.get('before') or None, limit=limit,
+        )
+    except ValueError as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=400)
+    return JsonResponse({
+        "orders": [order_summary(order) for order in orders],
+        "next_cursor": next_cursor,
+    })
+
+@require_GET
+@staff_member_required
+def export_orders(request):
+    """
+    Stream orders as CSV or NDJSON, optionally gzipped, for staff users.
+
+    Query parameters: format=csv|ndjson, gzip=1, since/until (ISO 8601 date
+    or date/time), shop, fields (comma-separated payload paths such as
+    customer.first_name) and line_items=1 for one row per line item. Rows
+    are streamed as they are read, so memory stays flat however many
+    orders match.
+    """
+    try:
+        spec = ExportSpec(
+            fmt=request.GET.get('format', 'csv'),
+            since=parse_moment(request.GET.get('since')),
+            until=parse_moment(request.GET.get('until')),
+            shop_domain=request.GET.get('shop') or None,
+            raw_fields=[path.strip() for path in request.GET.get('fields', '').split(',') if path.strip()],
+            line_items=request.GET.get('line_items') == '1',
+            compress=request.GET.get('gzip') == '1',
+        )
+    except ValueError as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=400)
+    # Under ASGI a sync iterator would be read to the end before the first byte is sent
+    chunks = aiter_export(spec) if isinstance(request, ASGIRequest) else iter_export(spec)
+    response = StreamingHttpResponse(chunks, content_type=spec.content_type)
+    response['Content-Disposition'] = f'attachment; filename="{spec.filename}"'
+    patch_cache_control(response, no_cache=True)
+    return response
+
+async def orders_stream(request):
+    """
+    Push newly saved orders to the dashboard as Server-Sent Events.
+
+    Needs the ASGI server: each viewer is a coroutine waiting on its own bounded
+    queue rather than a worker thread. Clients that fall behind are sent a
+    'dropped' event and disconnected, and catch up through /api/orders/.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse("Live feed requires the ASGI server", status=501)
+
+    subscription = order_events.subscribe()
+    heartbeat = settings.SHOPIFY_LIVE_FEED_HEARTBEAT_SECONDS
+
+    async def stream():
         try:
-            # Clean and validate the data
-            order_data = validate_order_data(data)
-            
-            # Create or update the order
-            order, created = ShopifyWebhookOrder.objects.update_or_create(
-                order_id=order_data['order_id'],
-                defaults={
-                    'order_number': order_data['order_number'],
-                    'email': order_data['email'],
-                    'total_price': order_data['total_price'],
-                    'raw_data': order_data['raw_data']
-                }
-            )
-            
-            # Log success
-            action = "created" if created else "updated"
-            print(f"Successfully {action} order {order.order_number}")
-            print(f"Order details - ID: {order.order_id}, Number: {order.order_number}, "
-                  f"Email: {order.email}, Price: {order.total_price}")
-            
-            # Return success response with order details
-            return JsonResponse({
-                "status": "success",
-                "message": f"Order {action} successfully",
-                "order": {
-                    "id": order.order_id,
-                    "number": order.order_number,
-                    "email": order.email,
-                    "total_price": str(order.total_price),
-                    "created_at": order.created_at.isoformat()
-                }
-            }, status=200)
-            
-        except ValueError as e:
-            print(f"Data validation error: {str(e)}")
-            return JsonResponse({
-                "status": "error",
-                "message": "Invalid data format",
-                "details": str(e)
-            }, status=400)
-        except Exception as e:
-            print(f"Error processing order: {str(e)}")
-            return JsonResponse({
-                "status": "error",
-                "message": "Internal server error",
-                "details": str(e)
-            }, status=500)
-        
-    except json.JSONDecodeError as e:
-        print(f"Error decoding JSON: {e}")
-        print(f"Raw request body: {request.body}")
-        return HttpResponse("Invalid JSON data", status=400)
-    except KeyError as e:
-        print(f"Missing required field: {e}")
-        return HttpResponse(f"Missing required field: {e}", status=400)
-    except Exception as e:
-        print(f"Unexpected error processing webhook: {e}")
-        return HttpResponse("Internal server error", status=500)
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    yield await subscription.get(timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                except SubscriberDropped:
+                    yield "event: dropped\ndata: {}\n\n"
+                    return
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
-def verify_webhook(data, hmac_header, webhook_secret):
+@require_GET
+def sales_stats(request):
     """
-    Verify that the webhook request came from Shopify using HMAC-SHA256.
-    
-    Args:
-        data: The raw request body
-        hmac_header: The X-Shopify-Hmac-SHA256 header value
-        webhook_secret: The webhook secret key from Shopify
-    
-    Returns:
-        bool: True if verification passes, False otherwise
+    Return order count, revenue, average order value and top customers for
+    the last ?hours= hours (default 24, at most 31 days) as JSON.
     """
     try:
-        if not webhook_secret or not hmac_header:
-            print("Missing webhook secret or HMAC header")
-            return False
-            
-        digest = hmac.new(
-            webhook_secret.encode('utf-8'),
-            data,
-            hashlib.sha256
-        ).digest()
-        computed_hmac = base64.b64encode(digest).decode('utf-8')
-        
-        # Use hmac.compare_digest for timing-attack safe comparison
-        is_valid = hmac.compare_digest(computed_hmac, hmac_header)
-        
-        if not is_valid:
-            print("HMAC verification failed - signatures don't match")
-        
-        return is_valid
-        
-    except Exception as e:
-        print(f"Error verifying webhook: {str(e)}")
-        return False
+        hours = int(request.GET.get('hours', 24))
+    except ValueError:
+        return JsonResponse({"status": "error", "message": "Invalid hours"}, status=400)
+    response = JsonResponse(dashboard_stats(hours=min(max(hours, 1), 31 * 24)))
+    patch_cache_control(response, no_cache=True)
+    return response
+
+@status_endpoint
+def outbox_status(request):
+    """
+    Report pending, delivered and dead-lettered outbound events per destination as JSON.
+    """
+    return JsonResponse(outbox_stats())
+
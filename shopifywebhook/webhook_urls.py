@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.urls import path
+from . import webhooks
+
+app_name = 'shopifywebhook'
+
+# Only the webhook endpoints, so a webhook-only process (webhooktest/settings_ingest.py)
+# never imports the dashboard views; shopifywebhook/urls.py serves them alongside it
+
+# The ASGI entry point switches the webhooks to the async views (see webhooktest/asgi.py)
+if settings.SHOPIFY_WEBHOOK_ASYNC:
+    dispatch_view = webhooks.webhook_dispatch_async
+    order_created_view = webhooks.webhook_order_created_async
+else:
+    dispatch_view = webhooks.webhook_dispatch
+    order_created_view = webhooks.webhook_order_created
+
+urlpatterns = [
+    path('webhooks/shopify/', dispatch_view, name='webhook_dispatch'),
+    path('webhooks/shopify/order/create/', order_created_view, name='webhook_order_created'),
+    path('webhooks/shopify/inbox/status/', webhooks.inbox_status, name='inbox_status'),
+    path('webhooks/shopify/dedup/status/', webhooks.dedup_status, name='dedup_status'),
+    path('metrics/', webhooks.metrics, name='metrics'),
+]
@@ -0,0 +1,353 @@
+import hmac
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import wraps
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from .decoding import PayloadDecodeError, loads as decode_json
+from .dedup import dedup_stats, is_duplicate, mark_seen
+from .ingest import enqueue_delivery, inbox_stats
+from .instrumentation import REGISTRY, WEBHOOK_REQUESTS, log_event, logger, stage_timer
+from .shop_secrets import shop_secrets, signing_key, verify_hmac
+from .topics import get_handler, observe_topic
+
+def _webhook_response(outcome, response):
+    """Count the request outcome and return the response."""
+    WEBHOOK_REQUESTS.inc(outcome=outcome)
+    return response
+
+def _method_response(request):
+    """Answer GET health checks and reject anything but POST; None for POST."""
+    if request.method == 'GET':
+        return JsonResponse({
+            "status": "ok",
+            "message": "Webhook endpoint is live (GET request)",
+            "timestamp": datetime.now().isoformat()
+        })
+    if request.method != 'POST':
+        return HttpResponse("Method Not Allowed", status=405)
+    return None
+
+def _log_received(request):
+    if logger.isEnabledFor(logging.DEBUG):
+        log_event(
+            logging.DEBUG, 'webhook.received',
+            method=request.method, path=request.path,
+            content_type=request.content_type, headers=dict(request.headers),
+        )
+
+def _duplicate_response():
+    return _webhook_response('duplicate', JsonResponse({
+        "status": "duplicate",
+        "message": "Webhook already processed"
+    }, status=200))
+
+def _verify_request(request, webhook_id):
+    """Check the HMAC signature against the shop's keys; returns an error response or None."""
+    if not shop_secrets.configured:
+        log_event(logging.ERROR, 'webhook.secret_missing')
+        return _webhook_response('error', HttpResponse("Webhook secret not configured", status=500))
+
+    shop_domain = request.headers.get('X-Shopify-Shop-Domain', '')
+    with stage_timer('verify'):
+        verified = verify_hmac(
+            request.body,
+            request.headers.get('X-Shopify-Hmac-Sha256', ''),
+            shop_secrets.keys_for(shop_domain),
+        )
+    if not verified:
+        log_event(logging.WARNING, 'webhook.verification_failed', webhook_id=webhook_id, shop_domain=shop_domain)
+        return _webhook_response('unauthorized', HttpResponse("Invalid webhook signature", status=401))
+    return None
+
+def _enqueue(request, webhook_id, started_at, topic):
+    with stage_timer('enqueue'):
+        item = enqueue_delivery(request.body, request.headers, started_at=started_at, topic=topic)
+        mark_seen(webhook_id)
+    return item
+
+def _queued_response(item):
+    return _webhook_response('queued', JsonResponse({
+        "status": "accepted",
+        "message": "Webhook queued for processing",
+        "delivery_id": item.pk
+    }, status=200))
+
+def _unhandled_response(topic, webhook_id):
+    # Acknowledge so Shopify does not keep retrying a topic we do not process
+    log_event(logging.INFO, 'webhook.unhandled_topic', topic=topic, webhook_id=webhook_id)
+    return _webhook_response('unhandled', JsonResponse({
+        "status": "ignored",
+        "message": f"No handler for topic {topic or '(missing)'}"
+    }, status=200))
+
+def _parse_payload(request, webhook_id, handler):
+    """
+    Decode the payload and validate it with the topic's handler.
+
+    Returns:
+        tuple: (cleaned_data, None) on success or (None, error_response)
+    """
+    try:
+        with stage_timer('parse'):
+            data = decode_json(request.body)
+    except PayloadDecodeError as e:
+        log_event(logging.WARNING, 'webhook.invalid_json', error=str(e), webhook_id=webhook_id)
+        return None, _webhook_response('invalid', JsonResponse({
+            "status": "error",
+            "message": "Invalid JSON data",
+            "details": str(e)
+        }, status=400))
+
+    if logger.isEnabledFor(logging.DEBUG):
+        log_event(logging.DEBUG, 'webhook.parsed', body=request.body.decode('utf-8', 'replace'))
+
+    try:
+        with stage_timer('validate'):
+            return handler.clean(data, request.headers), None
+    except ValueError as e:
+        log_event(
+            logging.WARNING, f'webhook.invalid_{handler.resource}',
+            error=str(e), topic=handler.topic, webhook_id=webhook_id,
+        )
+        return None, _webhook_response('invalid', JsonResponse({
+            "status": "error",
+            "message": "Invalid data format",
+            "details": str(e)
+        }, status=400))
+
+def _persist(handler, data, webhook_id):
+    with stage_timer('persist'):
+        saved = handler.save(data)
+        mark_seen(webhook_id)
+    return saved
+
+def _stale_response(handler, saved):
+    # A newer version is already stored; nothing was written
+    log_event(logging.INFO, f'webhook.{handler.resource}_stale', topic=handler.topic, **handler.summarize(saved))
+    return _webhook_response('stale', JsonResponse({
+        "status": "stale",
+        "message": f"A newer version of this {handler.resource} is already stored"
+    }, status=200))
+
+def _saved_response(handler, saved, started_at):
+    if getattr(saved, 'stale', False):
+        return _stale_response(handler, saved)
+    summary = handler.summarize(saved)
+    log_event(
+        logging.INFO, f'webhook.{handler.resource}_saved',
+        topic=handler.topic, **summary,
+        duration_ms=round((time.perf_counter() - started_at) * 1000, 2),
+    )
+    with stage_timer('respond'):
+        response = JsonResponse({
+            "status": "success",
+            "message": f"{handler.resource.capitalize()} saved successfully",
+            handler.resource: summary,
+        }, status=200)
+    return _webhook_response('saved', response)
+
+def _error_response(message, error):
+    logger.exception(message)
+    return _webhook_response('error', JsonResponse({
+        "status": "error",
+        "message": "Internal server error",
+        "details": str(error)
+    }, status=500))
+
+def _handle_delivery(request, topic, started_at):
+    # Shopify retries deliveries it thinks failed; drop ones we already accepted.
+    # Only after the signature checks out, so unsigned requests cannot probe
+    # which webhook ids were delivered.
+    webhook_id = request.headers.get('X-Shopify-Webhook-Id', '')
+    try:
+        response = _verify_request(request, webhook_id)
+        if response is not None:
+            return response
+
+        if is_duplicate(webhook_id):
+            return _duplicate_response()
+
+        handler = get_handler(topic)
+        if handler is None:
+            return _unhandled_response(topic, webhook_id)
+
+        if settings.SHOPIFY_WEBHOOK_INGEST_MODE == 'queue':
+            # Acknowledge now; drain_webhook_inbox validates and persists later
+            return _queued_response(_enqueue(request, webhook_id, started_at, topic))
+
+        data, response = _parse_payload(request, webhook_id, handler)
+        if response is not None:
+            return response
+
+        saved = _persist(handler, data, webhook_id)
+        return _saved_response(handler, saved, started_at)
+    except Exception as e:
+        return _error_response("Error processing webhook", e)
+
+def _handle_webhook(request, topic):
+    started_at = time.perf_counter()
+    _log_received(request)
+
+    response = _method_response(request)
+    if response is not None:
+        return response
+
+    response = _handle_delivery(request, topic, started_at)
+    observe_topic(topic, response.status_code, started_at)
+    return response
+
+@csrf_exempt
+def webhook_dispatch(request):
+    """
+    Single webhook endpoint for every subscribed topic.
+
+    Signature and duplicate checks run once here; the X-Shopify-Topic header
+    then selects the registered TopicHandler that validates and persists the
+    payload. Topics without a handler are acknowledged and ignored.
+    """
+    return _handle_webhook(request, request.headers.get('X-Shopify-Topic', ''))
+
+@csrf_exempt
+def webhook_order_created(request):
+    return _handle_webhook(request, 'orders/create')
+
+_db_executor = ThreadPoolExecutor(
+    max_workers=settings.SHOPIFY_WEBHOOK_ASYNC_DB_THREADS,
+    thread_name_prefix='webhook-db',
+)
+
+def _in_db_thread(func, *args):
+    # The pool threads never see request_started/finished, so close connections
+    # that are broken or past CONN_MAX_AGE around each call the way those do
+    close_old_connections()
+    try:
+        return func(*args)
+    finally:
+        close_old_connections()
+
+def _run_db(func, *args):
+    """Run blocking ORM work on the bounded webhook DB thread pool."""
+    return sync_to_async(_in_db_thread, thread_sensitive=False, executor=_db_executor)(func, *args)
+
+async def _handle_delivery_async(request, topic, started_at):
+    webhook_id = request.headers.get('X-Shopify-Webhook-Id', '')
+    try:
+        response = _verify_request(request, webhook_id)
+        if response is not None:
+            return response
+
+        if await _run_db(is_duplicate, webhook_id):
+            return _duplicate_response()
+
+        handler = get_handler(topic)
+        if handler is None:
+            return _unhandled_response(topic, webhook_id)
+
+        if settings.SHOPIFY_WEBHOOK_INGEST_MODE == 'queue':
+            return _queued_response(await _run_db(_enqueue, request, webhook_id, started_at, topic))
+
+        data, response = _parse_payload(request, webhook_id, handler)
+        if response is not None:
+            return response
+
+        saved = await _run_db(_persist, handler, data, webhook_id)
+        return _saved_response(handler, saved, started_at)
+    except Exception as e:
+        return _error_response("Error processing webhook", e)
+
+async def _handle_webhook_async(request, topic):
+    started_at = time.perf_counter()
+    _log_received(request)
+
+    response = _method_response(request)
+    if response is not None:
+        return response
+
+    response = await _handle_delivery_async(request, topic, started_at)
+    observe_topic(topic, response.status_code, started_at)
+    return response
+
+@csrf_exempt
+async def webhook_dispatch_async(request):
+    """
+    Async variant of webhook_dispatch for the ASGI server.
+
+    HMAC verification, decoding and validation run inline on the event loop;
+    only database work is handed to a small bounded thread pool, so hundreds
+    of deliveries can be in flight without one worker thread each.
+    """
+    return await _handle_webhook_async(request, request.headers.get('X-Shopify-Topic', ''))
+
+@csrf_exempt
+async def webhook_order_created_async(request):
+    return await _handle_webhook_async(request, 'orders/create')
+
+def status_endpoint(view):
+    """
+    Restrict an operational view to SHOPIFY_STATUS_TOKEN holders and staff users.
+
+    The webhook-only process has no users or sessions, so there the bearer
+    token is the only way in; without a token configured it answers 403.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        token = settings.SHOPIFY_STATUS_TOKEN
+        authorization = request.headers.get('Authorization', '')
+        if token and hmac.compare_digest(authorization.encode(), f'Bearer {token}'.encode()):
+            return view(request, *args, **kwargs)
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_active and user.is_staff:
+            return view(request, *args, **kwargs)
+        return HttpResponse("Forbidden", status=403)
+    return wrapper
+
+@status_endpoint
+def inbox_status(request):
+    """
+    Report webhook inbox depth, enqueue latency and drain throughput as JSON.
+    """
+    return JsonResponse(inbox_stats())
+
+@status_endpoint
+def dedup_status(request):
+    """
+    Report duplicate-delivery cache hit and miss counters as JSON.
+    """
+    return JsonResponse(dedup_stats())
+
+@status_endpoint
+def metrics(request):
+    """
+    Expose webhook counters and stage timings in Prometheus text format.
+    """
+    return HttpResponse(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def verify_webhook(data, hmac_header, webhook_secret):
+    """
+    Verify that the webhook request came from Shopify using HMAC-SHA256.
+    
+    Args:
+        data: The raw request body
+        hmac_header: The X-Shopify-Hmac-SHA256 header value
+        webhook_secret: The webhook secret key from Shopify
+    
+    Returns:
+        bool: True if verification passes, False otherwise
+    """
+    try:
+        if not webhook_secret or not hmac_header:
+            log_event(logging.DEBUG, 'webhook.hmac_missing')
+            return False
+
+        # The request path uses the preloaded per-shop keys; this encodes on every call
+        return verify_hmac(data, hmac_header, (signing_key(webhook_secret),))
+        
+    except Exception as e:
+        log_event(logging.WARNING, 'webhook.hmac_error', error=str(e))
+        return False
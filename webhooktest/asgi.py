@@ -0,0 +1,17 @@
+"""
+ASGI config for webhooktest project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'webhooktest.settings')
+os.environ.setdefault('SHOPIFY_WEBHOOK_ASYNC', 'True')
+
+application = get_asgi_application()
@@ -0,0 +1,15 @@
+"""
+ASGI config for a webhook-only process.
+
+Loads webhooktest.settings_ingest with the async webhook views. See
+webhooktest/asgi.py for the full site.
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'webhooktest.settings_ingest')
+os.environ.setdefault('SHOPIFY_WEBHOOK_ASYNC', 'True')
+
+application = get_asgi_application()
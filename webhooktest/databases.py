@@ -0,0 +1,127 @@
+"""
+Database profiles, selected with SHOPIFY_DB_PROFILE:
+
+- 'sqlite' (default): a local SQLite file tuned for concurrent webhook writers
+- 'sqlite-untuned': Django's stock SQLite settings, for comparison
+- 'postgres': PostgreSQL with persistent, health-checked connections
+"""
+import os
+from urllib.parse import unquote, urlparse
+
+PROFILES = ('sqlite', 'sqlite-untuned', 'postgres')
+
+# Applied on every new SQLite connection. WAL lets readers run alongside the single
+# writer, synchronous=NORMAL only fsyncs at checkpoints (safe in WAL mode; a power
+# loss can drop the last commits but never corrupts the file), and mmap serves
+# reads from the page cache without copying.
+SQLITE_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA mmap_size={mmap_size}',
+    'PRAGMA cache_size=-{cache_kib}',
+)
+
+
+def _env_int(environ, name, default):
+    return int(environ.get(name, default))
+
+
+def sqlite_config(path, environ=os.environ):
+    """
+    SQLite tuned for many writers: WAL, synchronous=NORMAL, mmap, a busy timeout
+    and BEGIN IMMEDIATE.
+
+    Write transactions start with BEGIN IMMEDIATE, so a writer that has to wait
+    waits on busy_timeout up front. It never fails half way with "database is
+    locked" when another connection wrote after it read.
+
+    Args:
+        path: Database file
+        environ (dict): Source of the SHOPIFY_SQLITE_* overrides
+
+    Returns:
+        dict: A DATABASES entry
+    """
+    pragmas = '; '.join(SQLITE_PRAGMAS).format(
+        mmap_size=_env_int(environ, 'SHOPIFY_SQLITE_MMAP_BYTES', 256 * 1024 * 1024),
+        cache_kib=_env_int(environ, 'SHOPIFY_SQLITE_CACHE_KIB', 64 * 1024),
+    )
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': path,
+        'OPTIONS': {
+            # Seconds a writer waits for the lock (sqlite3's busy_timeout)
+            'timeout': _env_int(environ, 'SHOPIFY_SQLITE_BUSY_TIMEOUT', 20),
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': pragmas,
+        },
+    }
+
+
+def postgres_config(environ=os.environ):
+    """
+    PostgreSQL settings from DATABASE_URL or the POSTGRES_* variables.
+
+    Connections persist for SHOPIFY_DB_CONN_MAX_AGE seconds and are checked
+    before each request reuses them, so a restarted server or dropped
+    connection costs one reconnect instead of a failed webhook. Set
+    SHOPIFY_DB_PGBOUNCER=True when connecting through PgBouncer in transaction
+    pooling mode, which cannot keep server-side cursors open.
+
+    Returns:
+        dict: A DATABASES entry
+    """
+    url = environ.get('DATABASE_URL')
+    if url:
+        parsed = urlparse(url)
+        connection = {
+            'NAME': unquote(parsed.path.lstrip('/')),
+            'USER': unquote(parsed.username or ''),
+            'PASSWORD': unquote(parsed.password or ''),
+            'HOST': parsed.hostname or '',
+            'PORT': str(parsed.port or ''),
+        }
+    else:
+        connection = {
+            'NAME': environ.get('POSTGRES_DB', 'shopifywebhook'),
+            'USER': environ.get('POSTGRES_USER', ''),
+            'PASSWORD': environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': environ.get('POSTGRES_PORT', '5432'),
+        }
+    return {
+        'ENGINE': 'django.db.backends.postgresql',
+        **connection,
+        'CONN_MAX_AGE': _env_int(environ, 'SHOPIFY_DB_CONN_MAX_AGE', 600),
+        'CONN_HEALTH_CHECKS': True,
+        'DISABLE_SERVER_SIDE_CURSORS': environ.get('SHOPIFY_DB_PGBOUNCER', 'False') == 'True',
+        'OPTIONS': {
+            'connect_timeout': _env_int(environ, 'SHOPIFY_DB_CONNECT_TIMEOUT', 5),
+            'application_name': environ.get('SHOPIFY_DB_APPLICATION_NAME', 'shopifywebhook'),
+        },
+    }
+
+
+def database_config(profile, sqlite_path, environ=os.environ):
+    """
+    Build the default DATABASES entry for a profile.
+
+    Args:
+        profile (str): One of PROFILES
+        sqlite_path: Database file for the SQLite profiles
+        environ (dict): Environment to read connection settings from
+
+    Returns:
+        dict: A DATABASES entry
+
+    Raises:
+        ValueError: If the profile is unknown
+    """
+    if profile == 'sqlite':
+        return sqlite_config(sqlite_path, environ)
+    if profile == 'sqlite-untuned':
+        return {'ENGINE': 'django.db.backends.sqlite3', 'NAME': sqlite_path}
+    if profile == 'postgres':
+        return postgres_config(environ)
+    raise ValueError(f"Unknown SHOPIFY_DB_PROFILE {profile!r}; expected one of {', '.join(PROFILES)}")
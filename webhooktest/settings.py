@@ -1,6 +1,8 @@
 from pathlib import Path
+import json
 import os
 from dotenv import load_dotenv
+from .databases import database_config
 
 # Load environment variables from .env file
 load_dotenv()
@@ -57,28 +59,27 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'webhooktest.wsgi.application'
+ASGI_APPLICATION = 'webhooktest.asgi.application'
 
 import sys
 
 # Check if we're running on PythonAnywhere
 ON_PYTHONANYWHERE = 'PYTHONANYWHERE_DOMAIN' in os.environ
 
+# Database profile: 'sqlite' (WAL, tuned for concurrent webhook writes), 'postgres'
+# (DATABASE_URL or POSTGRES_*; see webhooktest/databases.py) or 'sqlite-untuned'
+SHOPIFY_DB_PROFILE = os.environ.get('SHOPIFY_DB_PROFILE', 'sqlite')
+
 if ON_PYTHONANYWHERE:
     # Use a specific path for the database on PythonAnywhere
-    DATABASES = {
-        'default': {
-            'ENGINE': 'django.db.backends.sqlite3',
-            'NAME': os.path.join(os.path.expanduser('~'), 'shopify-webhook-django', 'db.sqlite3'),
-        }
-    }
+    SQLITE_PATH = os.path.join(os.path.expanduser('~'), 'shopify-webhook-django', 'db.sqlite3')
 else:
-    # Local development database settings
-    DATABASES = {
-        'default': {
-            'ENGINE': 'django.db.backends.sqlite3',
-            'NAME': BASE_DIR / 'db.sqlite3',
-        }
-    }
+    # Local development database
+    SQLITE_PATH = BASE_DIR / 'db.sqlite3'
+
+DATABASES = {
+    'default': database_config(SHOPIFY_DB_PROFILE, SQLITE_PATH),
+}
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -115,8 +116,50 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Shopify Settings
 SHOPIFY_SHOP_DOMAIN = os.environ.get('SHOPIFY_SHOP_DOMAIN')  # Get from Railway environment variables
 SHOPIFY_ACCESS_TOKEN = os.environ.get('SHOPIFY_ACCESS_TOKEN')  # Get from Railway environment variables
+SHOPIFY_API_VERSION = os.environ.get('SHOPIFY_API_VERSION', '2024-07')  # Admin API version used by backfill_orders
 SHOPIFY_WEBHOOK_SECRET = os.environ.get('SHOPIFY_WEBHOOK_SECRET')  # Get from Railway environment variables
 
+# Secret rotation: the previous secret is still accepted until the ISO 8601 expiry
+SHOPIFY_WEBHOOK_PREVIOUS_SECRET = os.environ.get('SHOPIFY_WEBHOOK_PREVIOUS_SECRET')
+SHOPIFY_WEBHOOK_PREVIOUS_SECRET_EXPIRES = os.environ.get('SHOPIFY_WEBHOOK_PREVIOUS_SECRET_EXPIRES')
+
+# Per-shop secrets keyed by X-Shopify-Shop-Domain; shops not listed use the secret above.
+# Entries are a secret string or {"secret": ..., "previous": ..., "previous_expires": ...}.
+# SHOPIFY_SHOP_SECRETS_FILE holds the same mapping as JSON and is re-read when it changes.
+SHOPIFY_SHOP_SECRETS = {}
+SHOPIFY_SHOP_SECRETS_FILE = os.environ.get('SHOPIFY_SHOP_SECRETS_FILE')
+SHOPIFY_SHOP_SECRETS_RELOAD_SECONDS = int(os.environ.get('SHOPIFY_SHOP_SECRETS_RELOAD_SECONDS', 30))
+
+# Webhook ingest mode: 'sync' saves orders inside the request, 'queue' stores the
+# verified delivery in the inbox and returns at once (run manage.py drain_webhook_inbox)
+SHOPIFY_WEBHOOK_INGEST_MODE = os.environ.get('SHOPIFY_WEBHOOK_INGEST_MODE', 'sync')
+
+# Serve the webhook with the async view (set by webhooktest/asgi.py) and the number
+# of threads it may use for database work
+SHOPIFY_WEBHOOK_ASYNC = os.environ.get('SHOPIFY_WEBHOOK_ASYNC', 'False') == 'True'
+SHOPIFY_WEBHOOK_ASYNC_DB_THREADS = int(os.environ.get('SHOPIFY_WEBHOOK_ASYNC_DB_THREADS', 8))
+
+# JSON decoder for webhook bodies: 'auto' uses orjson or msgspec when installed and
+# falls back to the standard library; 'json', 'orjson' or 'msgspec' force one
+SHOPIFY_JSON_DECODER = os.environ.get('SHOPIFY_JSON_DECODER', 'auto')
+
+# Micro-batching for synchronous ingest: orders arriving on other request threads
+# within this many milliseconds are saved with one bulk upsert (0 disables it)
+SHOPIFY_WEBHOOK_BATCH_WINDOW_MS = int(os.environ.get('SHOPIFY_WEBHOOK_BATCH_WINDOW_MS', 0))
+SHOPIFY_WEBHOOK_BATCH_MAX_SIZE = int(os.environ.get('SHOPIFY_WEBHOOK_BATCH_MAX_SIZE', 100))
+# Per-topic overrides of the window for the order topics, e.g. {'orders/updated': 50}
+SHOPIFY_WEBHOOK_TOPIC_BATCH_WINDOW_MS = {}
+
+# Duplicate delivery detection keyed on X-Shopify-Webhook-Id (Shopify retries for up to 48 hours)
+SHOPIFY_WEBHOOK_DEDUP_TTL_SECONDS = int(os.environ.get('SHOPIFY_WEBHOOK_DEDUP_TTL_SECONDS', 48 * 3600))
+SHOPIFY_WEBHOOK_DEDUP_CACHE_SIZE = int(os.environ.get('SHOPIFY_WEBHOOK_DEDUP_CACHE_SIZE', 10000))
+# Seconds between deletions of expired webhook ids by the drain_webhook_inbox worker
+SHOPIFY_WEBHOOK_DEDUP_EXPIRY_INTERVAL_SECONDS = 300
+
+# Bearer token for the status and /metrics/ endpoints (scrapers send
+# "Authorization: Bearer <token>"); staff users can read them without it
+SHOPIFY_STATUS_TOKEN = os.environ.get('SHOPIFY_STATUS_TOKEN')
+
 # Allowed Hosts
 ALLOWED_HOSTS = [
     'localhost', 
@@ -132,5 +175,81 @@ if DEBUG:
         '315995d12acc.ngrok-free.app',  # Your specific ngrok domain
     ])
 
+# Orders shown per dashboard page
+SHOPIFY_DASHBOARD_PAGE_SIZE = int(os.environ.get('SHOPIFY_DASHBOARD_PAGE_SIZE', 50))
+
+# Outbound order events (see shopifywebhook/outbox.py). JSON object of destination
+# name -> options, e.g. {"erp": {"url": "https://erp.example.com/hooks/orders",
+# "secret": "...", "batch_size": 50, "concurrency": 2, "timeout": 10}}. Each saved
+# order queues one event per destination; run `manage.py dispatch_outbox` to send them
+SHOPIFY_OUTBOX_DESTINATIONS = json.loads(os.environ.get('SHOPIFY_OUTBOX_DESTINATIONS') or '{}')
+SHOPIFY_OUTBOX_MAX_ATTEMPTS = int(os.environ.get('SHOPIFY_OUTBOX_MAX_ATTEMPTS', 10))
+# First retry delay in seconds; doubles per attempt up to SHOPIFY_OUTBOX_MAX_BACKOFF_SECONDS
+SHOPIFY_OUTBOX_BACKOFF_SECONDS = float(os.environ.get('SHOPIFY_OUTBOX_BACKOFF_SECONDS', 2))
+SHOPIFY_OUTBOX_MAX_BACKOFF_SECONDS = float(os.environ.get('SHOPIFY_OUTBOX_MAX_BACKOFF_SECONDS', 600))
+
+# Cache for dashboard fragments, order counts and the newest-order marker. Local
+# memory by default; set SHOPIFY_CACHE_DIR to share one file cache between processes
+# (e.g. web workers and the inbox drain worker) so their writes invalidate it at once
+SHOPIFY_CACHE_DIR = os.environ.get('SHOPIFY_CACHE_DIR')
+if SHOPIFY_CACHE_DIR:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': SHOPIFY_CACHE_DIR,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 1000},
+        }
+    }
+
+# Seconds rendered dashboard fragments and summary figures are reused; a saved or
+# deleted order retires them immediately, this only bounds staleness from writes in
+# other processes without a shared cache (0 disables the cache)
+SHOPIFY_DASHBOARD_CACHE_TTL = int(os.environ.get('SHOPIFY_DASHBOARD_CACHE_TTL', 30))
+
+# Seconds the newest-order marker used by /api/orders/ is cached per process; saves
+# in the same process refresh it immediately
+SHOPIFY_ORDERS_HIGH_WATER_TTL = int(os.environ.get('SHOPIFY_ORDERS_HIGH_WATER_TTL', 5))
+
+# Retention: archive_orders moves orders stored more than SHOPIFY_RETENTION_DAYS ago
+# (0 keeps everything) into monthly gzip NDJSON files under SHOPIFY_ARCHIVE_DIR
+SHOPIFY_RETENTION_DAYS = int(os.environ.get('SHOPIFY_RETENTION_DAYS', 0))
+SHOPIFY_ARCHIVE_DIR = os.environ.get('SHOPIFY_ARCHIVE_DIR', str(BASE_DIR / 'archive'))
+
+# Live order feed (ASGI only): per-viewer buffered events before a slow client is
+# dropped, and seconds between keepalive comments
+SHOPIFY_LIVE_FEED_BUFFER_SIZE = int(os.environ.get('SHOPIFY_LIVE_FEED_BUFFER_SIZE', 100))
+SHOPIFY_LIVE_FEED_HEARTBEAT_SECONDS = 15
+
+# Logging: the shopifywebhook logger is silent below SHOPIFY_WEBHOOK_LOG_LEVEL, so
+# disabled levels cost nothing on the webhook path (set DEBUG to trace payloads)
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'simple': {
+            'format': '%(asctime)s %(levelname)s %(name)s %(message)s',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'simple',
+        },
+    },
+    'loggers': {
+        'shopifywebhook': {
+            'handlers': ['console'],
+            'level': os.environ.get('SHOPIFY_WEBHOOK_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
 # Server Port
 PORT = int(os.environ.get('PORT', 5000))
@@ -0,0 +1,31 @@
+from .settings import *
+
+# Webhook-only process: serves /webhooks/shopify/ and its status views and nothing
+# else, for fast cold starts on autoscaled or PythonAnywhere workers. Run the
+# dashboard, admin, migrations and management commands with webhooktest.settings.
+
+# Never inherit DEBUG from a developer's environment: it records every query
+# and serves tracebacks to anyone who sends a malformed delivery
+DEBUG = False
+
+# Shopify deliveries are authenticated by their HMAC signature, not by sessions,
+# users or CSRF tokens, so none of those apps or middleware are loaded
+INSTALLED_APPS = [
+    'shopifywebhook',
+]
+
+MIDDLEWARE = []
+
+ROOT_URLCONF = 'webhooktest.urls_ingest'
+
+# No templates, static files or translations are rendered
+TEMPLATES = []
+USE_I18N = False
+
+WSGI_APPLICATION = 'webhooktest.wsgi_ingest.application'
+ASGI_APPLICATION = 'webhooktest.asgi_ingest.application'
+
+# Reuse database connections across deliveries; reconnecting (for SQLite: open the
+# file, register functions, run the tuning pragmas) costs more than the rest of a
+# rejected delivery. The postgres profile already sets its own CONN_MAX_AGE.
+DATABASES['default'].setdefault('CONN_MAX_AGE', int(os.environ.get('SHOPIFY_DB_CONN_MAX_AGE', 600)))
@@ -24,10 +24,5 @@ STATIC_URL = '/static/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
 
-# Database - Use SQLite for simplicity
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
-}
+# Database: DATABASES comes from SHOPIFY_DB_PROFILE in settings.py; set it to
+# 'postgres' for multi-worker deployments, the default tuned SQLite suits one server
@@ -0,0 +1,14 @@
+"""
+WSGI config for a webhook-only process.
+
+Loads webhooktest.settings_ingest: the webhook endpoints without the dashboard,
+admin or their middleware. See webhooktest/wsgi.py for the full site.
+"""
+
+import os
+
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'webhooktest.settings_ingest')
+
+application = get_wsgi_application()